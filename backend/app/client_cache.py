@@ -0,0 +1,137 @@
+"""
+Cache read-through dos clientes por ID (na frente de db_helpers.get_client_by_id)
+TTL limita por quanto tempo um cliente pode ser servido sem reler o banco;
+cada escrita no cliente (dados, saldo, remoção) registra o instante (relógio
+lógico) da invalidação e derruba a entrada. Uma leitura que começou antes da
+escrita não grava o resultado, então o cache não volta a um valor antigo
+O cache é por processo: com vários workers, escritas feitas em outro worker
+só aparecem aqui depois do TTL. Por isso só atende leituras de nome/exibição;
+saldo vem sempre do banco (get_client_by_id(..., fresh=True))
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Configuração (variáveis de ambiente)
+CLIENT_CACHE_TTL = float(os.getenv("CLIENT_CACHE_TTL", "30"))
+CLIENT_CACHE_MAX_ENTRIES = int(os.getenv("CLIENT_CACHE_MAX_ENTRIES", "1000"))
+
+# Ausência de cliente também fica em cache (até a próxima escrita ou o TTL)
+_MISSING = object()
+
+
+class ClientCache:
+    """
+    LRU de clientes com TTL e relógio de invalidações
+    - get(): (True, cliente ou None) se houver entrada válida, senão (False, None)
+    - begin_fill()/fill(): grava o resultado de uma leitura só se nenhuma
+      escrita aconteceu desde begin_fill
+    - invalidate(): chamada em toda escrita no cliente
+    As últimas invalidações por ID ficam num LRU do mesmo tamanho do cache;
+    a mais antiga descartada sobe o piso (_floor), e leituras que começaram
+    antes do piso também não gravam (descarte conservador, nunca valor antigo)
+    """
+
+    def __init__(self, ttl: float = CLIENT_CACHE_TTL, max_entries: int = CLIENT_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, Tuple[Any, float]]" = OrderedDict()
+        self._clock = 0
+        self._floor = 0
+        self._invalidated: "OrderedDict[int, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.discarded_fills = 0
+        self.evictions = 0
+        self._hit_age_total = 0.0
+        self.max_hit_age = 0.0
+
+    def get(self, client_id: int) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """(encontrado, cópia do cliente ou None se o cliente não existe)"""
+        with self._lock:
+            entry = self._entries.get(client_id)
+            if entry is not None:
+                value, fetched_at = entry
+                age = time.monotonic() - fetched_at
+                if age <= self.ttl:
+                    self._entries.move_to_end(client_id)
+                    self.hits += 1
+                    self._hit_age_total += age
+                    self.max_hit_age = max(self.max_hit_age, age)
+                    return True, (None if value is _MISSING else dict(value))
+                del self._entries[client_id]
+                self.expirations += 1
+            self.misses += 1
+            return False, None
+
+    def begin_fill(self, client_id: int) -> int:
+        """Instante atual do relógio, a ser passado para fill() depois da leitura no banco"""
+        with self._lock:
+            return self._clock
+
+    def fill(self, client_id: int, client: Optional[Dict[str, Any]], started_at: int):
+        """Grava o resultado da leitura, a menos que o cliente tenha sido alterado durante ela"""
+        with self._lock:
+            if max(self._invalidated.get(client_id, 0), self._floor) > started_at:
+                self.discarded_fills += 1
+                return
+            self._entries[client_id] = (_MISSING if client is None else dict(client), time.monotonic())
+            self._entries.move_to_end(client_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, client_id: int):
+        """Derruba a entrada e registra a invalidação (leituras em andamento não gravam)"""
+        with self._lock:
+            self._clock += 1
+            self._invalidated[client_id] = self._clock
+            self._invalidated.move_to_end(client_id)
+            while len(self._invalidated) > self.max_entries:
+                _, invalidated_at = self._invalidated.popitem(last=False)
+                self._floor = max(self._floor, invalidated_at)
+            self._entries.pop(client_id, None)
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._clock += 1
+            self._floor = self._clock
+            self._invalidated.clear()
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit ratio e idade (staleness) dos clientes servidos do cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "discarded_fills": self.discarded_fills,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "avg_hit_age_seconds": self._hit_age_total / self.hits if self.hits else 0.0,
+                "max_hit_age_seconds": self.max_hit_age,
+            }
+
+
+# Global cache instance
+_cache: Optional[ClientCache] = None
+
+def get_client_cache() -> ClientCache:
+    """Get or create the client cache"""
+    global _cache
+    if _cache is None:
+        _cache = ClientCache()
+    return _cache
@@ -3,8 +3,9 @@ Database configuration for Supabase PostgreSQL
 Using httpx directly for REST API calls
 """
 import os
+import asyncio
 import httpx
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple, Callable, Iterator, AsyncIterator, Sequence
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -16,8 +17,12 @@ load_dotenv(dotenv_path=env_path)
 SUPABASE_URL = os.getenv("SUPABASE_URL", "")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY", "")
 
+# Backend do banco: "supabase" (PostgREST pela rede) ou "sqlite" (arquivo local
+# em SQLITE_PATH, mesma API; ver app/sqlite_backend.py)
+DATABASE_BACKEND = os.getenv("DATABASE_BACKEND", "supabase").lower()
+
 # REST API URL
-REST_URL = f"{SUPABASE_URL}/rest/v1"
+REST_URL = "http://sqlite.local/rest/v1" if DATABASE_BACKEND == "sqlite" else f"{SUPABASE_URL}/rest/v1"
 
 # Headers para autenticação
 HEADERS = {
@@ -27,51 +32,276 @@ HEADERS = {
     "Prefer": "return=representation"
 }
 
+# Linhas por requisição nas operações em lote (insert_many/upsert_many/delete_many)
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "500"))
+
+# Linhas por página nas leituras em streaming (iter_select/iter_rows); o PostgREST
+# do Supabase limita cada resposta a 1000 linhas (max-rows) por padrão
+SCAN_PAGE_SIZE = int(os.getenv("SCAN_PAGE_SIZE", "1000"))
+
+# Escritas em lote não precisam das linhas de volta
+RETURN_MINIMAL = {"Prefer": "return=minimal"}
+UPSERT_MINIMAL = {"Prefer": "resolution=merge-duplicates,return=minimal"}
+
+# on_progress(feitas, total) das operações em lote
+ProgressCallback = Optional[Callable[[int, int], None]]
+
+def chunked(items: Sequence, size: int) -> Iterator[Sequence]:
+    """Fatias consecutivas de items com até size elementos"""
+    size = max(1, size)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def in_filter(values) -> str:
+    """Filtro PostgREST 'in' para uma lista de valores: in.(1,2,3)"""
+    return f"in.({','.join(str(v) for v in values)})"
+
+def select_list(*columns) -> str:
+    """
+    Parâmetro select do PostgREST: nomes, listas/tuplas de nomes ou relações
+    embutidas (embed), na ordem dada; sem colunas, '*'
+    """
+    names = []
+    for column in columns:
+        if isinstance(column, (list, tuple)):
+            names.extend(column)
+        else:
+            names.append(column)
+    return ",".join(names) or "*"
+
+def embed(relation: str, *columns) -> str:
+    """Relação embutida pela chave estrangeira: embed('clients', 'name') -> 'clients(name)'"""
+    return f"{relation}({select_list(*columns)})"
+
+def _filter_value(value) -> str:
+    """Valor num filtro lógico do PostgREST: texto entre aspas (datas têm ':' e '.')"""
+    return f'"{value}"' if isinstance(value, str) else str(value)
+
+def order_terms(order: Sequence[str]) -> List[Tuple[str, bool, bool]]:
+    """
+    Termos do order ('created_at.desc', 'name.asc.nullsfirst') como
+    (coluna, desc, nulos primeiro); sem modificador, nulos como no Postgres:
+    por último em asc, primeiro em desc
+    """
+    terms = []
+    for part in order:
+        column, *modifiers = part.split(".")
+        desc = "desc" in modifiers
+        nulls_first = "nullsfirst" in modifiers or (desc and "nullslast" not in modifiers)
+        terms.append((column, desc, nulls_first))
+    return terms
+
+def keyset_filter(terms: Sequence[Tuple[str, bool, bool]], row: Dict[str, Any]) -> Optional[str]:
+    """
+    Filtro 'or' do PostgREST com as linhas que vêm depois de row na ordem
+    terms (ver order_terms): (c1 depois) ou (c1 igual e c2 depois) ou ...
+    None quando nenhuma linha pode vir depois
+    """
+    branches, equal = [], []
+    for column, desc, nulls_first in terms:
+        value = row[column]
+        if value is None:
+            after = f"{column}.not.is.null" if nulls_first else None
+        else:
+            after = f"{column}.{'lt' if desc else 'gt'}.{_filter_value(value)}"
+            if not nulls_first and column != "id":
+                after = f"or({after},{column}.is.null)"
+        if after:
+            branches.append(f"and({','.join(equal + [after])})" if equal else after)
+        equal.append(f"{column}.is.null" if value is None else f"{column}.eq.{_filter_value(value)}")
+    return f"({','.join(branches)})" if branches else None
+
+def content_range_count(response: httpx.Response) -> Optional[int]:
+    """Total de linhas do Content-Range do PostgREST (Prefer: count=exact): 0-49/1234"""
+    total = response.headers.get("content-range", "").rpartition("/")[2]
+    return int(total) if total.isdigit() else None
+
+class QueryResponse:
+    """Resultado de TableQuery.execute() (compatível com o cliente supabase-py: .data, .count)"""
+    def __init__(self, data, count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
 class TableQuery:
     """Helper class para compatibilidade com sintaxe antiga"""
     def __init__(self, client, table_name):
         self.client = client
         self.table_name = table_name
-        self._filters = {}
+        self._filters = []  # (coluna, condição); a mesma coluna pode repetir (gte + lt)
         self._columns = "*"
-        self._order_by = None
-        self._order_desc = False
+        self._count = None
+        self._order = []
+        self._limit = None
     
-    def select(self, columns="*"):
-        self._columns = columns
+    def select(self, *columns, count=None):
+        """
+        Colunas a buscar (ver select_list): select('id', 'amount', embed('clients', 'name'))
+        count='exact' pede o total de linhas do filtro (QueryResponse.count)
+        """
+        self._columns = select_list(*columns)
+        self._count = count
         return self
     
     def eq(self, column, value):
-        self._filters[column] = f"eq.{value}"
+        self._filters.append((column, f"eq.{value}"))
+        return self
+    
+    def gte(self, column, value):
+        self._filters.append((column, f"gte.{value}"))
+        return self
+    
+    def lt(self, column, value):
+        self._filters.append((column, f"lt.{value}"))
+        return self
+    
+    def in_(self, column, values):
+        self._filters.append((column, in_filter(values)))
+        return self
+    
+    def where(self, filters: Optional[Dict[str, Any]]):
+        """Filtros no formato do select(): {'type': 'eq.WITHDRAWAL'}"""
+        self._filters.extend((filters or {}).items())
+        return self
+    
+    def or_(self, filters):
+        """Filtro 'or' do PostgREST: or_('a.eq.1,b.lt.2')"""
+        self._filters.append(("or", f"({filters})"))
         return self
     
     def order(self, column, desc=False):
-        self._order_by = column
-        self._order_desc = desc
+        """Ordenação; chamadas seguidas desempatam pela coluna seguinte"""
+        self._order.append(f"{column}.{'desc' if desc else 'asc'}")
+        return self
+    
+    def limit(self, count):
+        self._limit = count
+        return self
+    
+    def keyset(self, after=None, desc=True):
+        """
+        Paginação por keyset em (created_at, id): ordena pelas duas colunas e,
+        com after=(created_at, id) da última linha entregue, busca só as
+        linhas seguintes (usa o índice idx_transactions_created_at)
+        """
+        self.order("created_at", desc=desc).order("id", desc=desc)
+        if after:
+            created_at, row_id = after
+            self._filters.append(("or", keyset_filter(order_terms(self._order), {"created_at": created_at, "id": row_id})))
         return self
     
+    def _params(self) -> List[Tuple[str, Any]]:
+        """Parâmetros PostgREST da consulta (lista de pares: filtros podem repetir a coluna)"""
+        params = [("select", self._columns)]
+        params.extend(self._filters)
+        if self._order:
+            params.append(("order", ",".join(self._order)))
+        if self._limit is not None:
+            params.append(("limit", self._limit))
+        return params
+    
+    def _headers(self) -> Dict[str, str]:
+        return {"Prefer": f"count={self._count}"} if self._count else {}
+    
+    def _scan_page(self, size: int, last_row: Optional[Dict[str, Any]]) -> Optional[List[Tuple[str, Any]]]:
+        """
+        Parâmetros de uma página do iter_rows, sempre por keyset (cada página
+        custa o mesmo do início ao fim e não pula nem repete linhas quando há
+        escritas entre as páginas):
+        - sem order: id crescente (id=gt.<último id>), pela chave primária
+        - com order (ex.: keyset()): as colunas do order + id como desempate,
+          com filtro 'or' a partir da última linha (ver keyset_filter)
+        None quando não há mais páginas
+        """
+        order = self._order or ["id.asc"]
+        terms = order_terms(order)
+        if "id" not in (column for column, _, _ in terms):
+            order = order + [f"id.{'desc' if terms[-1][1] else 'asc'}"]
+            terms = order_terms(order)
+        columns = self._columns
+        if columns != "*":
+            selected = set(columns.split(","))
+            missing = [column for column, _, _ in terms if column not in selected]
+            columns = ",".join(missing + [columns])
+        params = [("select", columns)] + self._filters
+        if last_row is not None:
+            if self._order:
+                after = keyset_filter(terms, last_row)
+                if after is None:
+                    return None
+                params.append(("or", after))
+            else:
+                params.append(("id", f"gt.{last_row['id']}"))
+        params.extend([("order", ",".join(order)), ("limit", size)])
+        return params
+    
+    def _scan_size(self, page_size: Optional[int], remaining: Optional[int]) -> int:
+        page_size = max(1, page_size or SCAN_PAGE_SIZE)
+        return page_size if remaining is None else min(page_size, remaining)
+    
+    def iter_rows(self, page_size: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Executa a consulta em páginas de page_size linhas e gera as linhas uma a
+        uma: a memória fica limitada a uma página, qualquer que seja o total
+        limit() vale como total máximo. Termina na primeira página vazia (uma
+        página menor que page_size pode ser só o max-rows do servidor)
+        As linhas incluem id e as colunas do order (chave do keyset)
+        """
+        remaining, last_row = self._limit, None
+        while remaining is None or remaining > 0:
+            params = self._scan_page(self._scan_size(page_size, remaining), last_row)
+            if params is None:
+                return
+            response = self.client.client.get(f"/{self.table_name}", params=params)
+            response.raise_for_status()
+            page = response.json()
+            if not page:
+                return
+            yield from page
+            last_row = page[-1]
+            if remaining is not None:
+                remaining -= len(page)
+    
     def execute(self):
         """Execute query"""
-        params = {"select": self._columns}
-        params.update(self._filters)
-        if self._order_by:
-            params["order"] = f"{self._order_by}.{'desc' if self._order_desc else 'asc'}"
-        
-        response = self.client.client.get(f"/{self.table_name}", params=params)
+        response = self.client.client.get(f"/{self.table_name}", params=self._params(), headers=self._headers())
         response.raise_for_status()
         
         # Retornar objeto com .data
-        class Response:
-            def __init__(self, data):
-                self.data = data
-        
-        return Response(response.json())
+        return QueryResponse(response.json(), content_range_count(response))
+
+class AsyncTableQuery(TableQuery):
+    """TableQuery do AsyncSupabaseClient: execute() é uma corrotina"""
+    
+    async def execute(self):
+        """Execute query"""
+        response = await self.client.client.get(f"/{self.table_name}", params=self._params(), headers=self._headers())
+        response.raise_for_status()
+        return QueryResponse(response.json(), content_range_count(response))
+    
+    async def iter_rows(self, page_size: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Versão assíncrona do TableQuery.iter_rows (async for row in query.iter_rows())"""
+        remaining, last_row = self._limit, None
+        while remaining is None or remaining > 0:
+            params = self._scan_page(self._scan_size(page_size, remaining), last_row)
+            if params is None:
+                return
+            response = await self.client.client.get(f"/{self.table_name}", params=params)
+            response.raise_for_status()
+            page = response.json()
+            if not page:
+                return
+            for row in page:
+                yield row
+            last_row = page[-1]
+            if remaining is not None:
+                remaining -= len(page)
 
 class SupabaseClient:
     """Cliente simples para Supabase usando httpx"""
     
-    def __init__(self):
-        self.client = httpx.Client(base_url=REST_URL, headers=HEADERS, timeout=30.0)
+    def __init__(self, transport: Optional[httpx.BaseTransport] = None):
+        # transport: permite apontar para um PostgREST simulado (benchmarks)
+        self.client = httpx.Client(base_url=REST_URL, headers=HEADERS, timeout=30.0, transport=transport)
         print(f"✅ SupabaseClient inicializado com método .table()")
     
     def table(self, table_name: str):
@@ -79,15 +309,24 @@ class SupabaseClient:
         print(f"🔍 Chamando .table('{table_name}')")
         return TableQuery(self, table_name)
     
-    def select(self, table: str, columns: str = "*", filters: Dict[str, Any] = None) -> List[Dict]:
-        """SELECT query"""
-        params = {"select": columns}
+    def select(self, table: str, columns="*", filters: Dict[str, Any] = None) -> List[Dict]:
+        """SELECT query (columns: texto ou lista de colunas)"""
+        params = {"select": select_list(columns)}
         if filters:
             params.update(filters)
         response = self.client.get(f"/{table}", params=params)
         response.raise_for_status()
         return response.json()
     
+    def iter_select(self, table: str, columns="*", filters: Dict[str, Any] = None,
+                    page_size: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        SELECT em streaming: mesmos argumentos do select(), mas gera as linhas
+        página a página (keyset em id, ver TableQuery.iter_rows) em vez de
+        carregar a tabela inteira. As linhas sempre incluem id
+        """
+        return TableQuery(self, table).select(columns).where(filters).iter_rows(page_size)
+    
     def insert(self, table: str, data: Dict[str, Any]) -> Dict:
         """INSERT query"""
         response = self.client.post(f"/{table}", json=data)
@@ -110,10 +349,150 @@ class SupabaseClient:
         response.raise_for_status()
         return True
     
+    def insert_many(self, table: str, rows: Sequence[Dict[str, Any]], batch_size: Optional[int] = None,
+                    on_progress: ProgressCallback = None) -> int:
+        """
+        INSERT em lote: um POST com array JSON por lote de batch_size linhas
+        (as linhas de um lote devem ter as mesmas colunas). Sem retorno das
+        linhas (return=minimal); retorna quantas linhas foram gravadas
+        """
+        return self._run_batches(rows, batch_size, on_progress, lambda batch: self.client.post(
+            f"/{table}", json=list(batch), headers=RETURN_MINIMAL))
+    
+    def upsert_many(self, table: str, rows: Sequence[Dict[str, Any]], on_conflict: str = "id",
+                    batch_size: Optional[int] = None, on_progress: ProgressCallback = None) -> int:
+        """UPSERT em lote: como insert_many, atualizando as linhas que já existem (on_conflict)"""
+        return self._run_batches(rows, batch_size, on_progress, lambda batch: self.client.post(
+            f"/{table}", json=list(batch), params={"on_conflict": on_conflict}, headers=UPSERT_MINIMAL))
+    
+    def delete_many(self, table: str, values: Sequence[Any], column: str = "id",
+                    batch_size: Optional[int] = None, on_progress: ProgressCallback = None) -> int:
+        """
+        DELETE em lote: um DELETE com column=in.(...) por lote de batch_size valores
+        Retorna quantos valores foram enviados
+        """
+        return self._run_batches(values, batch_size, on_progress, lambda batch: self.client.delete(
+            f"/{table}", params={column: in_filter(batch)}, headers=RETURN_MINIMAL))
+    
+    def _run_batches(self, items: Sequence, batch_size: Optional[int], on_progress: ProgressCallback, send) -> int:
+        """
+        Envia items em lotes, um após o outro; para no primeiro erro (os lotes
+        anteriores já ficaram gravados, cada lote é uma transação no banco)
+        """
+        done = 0
+        for batch in chunked(items, batch_size or BULK_BATCH_SIZE):
+            send(batch).raise_for_status()
+            done += len(batch)
+            if on_progress:
+                on_progress(done, len(items))
+        return done
+    
+    def rpc(self, function: str, params: Dict[str, Any] = None) -> Any:
+        """Chama uma função SQL do banco (POST /rpc/<function>)"""
+        response = self.client.post(f"/rpc/{function}", json=params or {})
+        response.raise_for_status()
+        return response.json()
+    
     def close(self):
         """Close connection"""
         self.client.close()
 
+class AsyncSupabaseClient:
+    """
+    Mesma interface do SupabaseClient sobre httpx.AsyncClient
+    Usado pelas rotas: as chamadas ao PostgREST não bloqueiam o event loop
+    """
+    
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        # transport: permite apontar para um PostgREST simulado (benchmarks)
+        self.client = httpx.AsyncClient(base_url=REST_URL, headers=HEADERS, timeout=30.0, transport=transport)
+    
+    def table(self, table_name: str):
+        """Retorna AsyncTableQuery (await query.execute())"""
+        return AsyncTableQuery(self, table_name)
+    
+    async def select(self, table: str, columns="*", filters: Dict[str, Any] = None) -> List[Dict]:
+        """SELECT query (columns: texto ou lista de colunas)"""
+        params = {"select": select_list(columns)}
+        if filters:
+            params.update(filters)
+        response = await self.client.get(f"/{table}", params=params)
+        response.raise_for_status()
+        return response.json()
+    
+    def iter_select(self, table: str, columns="*", filters: Dict[str, Any] = None,
+                    page_size: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        """SELECT em streaming (async for row in client.iter_select(...)); ver SupabaseClient.iter_select"""
+        return AsyncTableQuery(self, table).select(columns).where(filters).iter_rows(page_size)
+    
+    async def insert(self, table: str, data: Dict[str, Any]) -> Dict:
+        """INSERT query"""
+        response = await self.client.post(f"/{table}", json=data)
+        response.raise_for_status()
+        result = response.json()
+        return result[0] if isinstance(result, list) else result
+    
+    async def update(self, table: str, data: Dict[str, Any], filters: Dict[str, Any]) -> Dict:
+        """UPDATE query"""
+        response = await self.client.patch(f"/{table}", json=data, params=filters)
+        response.raise_for_status()
+        result = response.json()
+        return result[0] if isinstance(result, list) and result else {}
+    
+    async def delete(self, table: str, filters: Dict[str, Any]) -> bool:
+        """DELETE query"""
+        response = await self.client.delete(f"/{table}", params=filters)
+        response.raise_for_status()
+        return True
+    
+    async def insert_many(self, table: str, rows: Sequence[Dict[str, Any]], batch_size: Optional[int] = None,
+                          on_progress: ProgressCallback = None) -> int:
+        """INSERT em lote (ver SupabaseClient.insert_many)"""
+        return await self._run_batches(rows, batch_size, on_progress, lambda batch: self.client.post(
+            f"/{table}", json=list(batch), headers=RETURN_MINIMAL))
+    
+    async def upsert_many(self, table: str, rows: Sequence[Dict[str, Any]], on_conflict: str = "id",
+                          batch_size: Optional[int] = None, on_progress: ProgressCallback = None) -> int:
+        """UPSERT em lote (ver SupabaseClient.upsert_many)"""
+        return await self._run_batches(rows, batch_size, on_progress, lambda batch: self.client.post(
+            f"/{table}", json=list(batch), params={"on_conflict": on_conflict}, headers=UPSERT_MINIMAL))
+    
+    async def delete_many(self, table: str, values: Sequence[Any], column: str = "id",
+                          batch_size: Optional[int] = None, on_progress: ProgressCallback = None) -> int:
+        """DELETE em lote (ver SupabaseClient.delete_many)"""
+        return await self._run_batches(values, batch_size, on_progress, lambda batch: self.client.delete(
+            f"/{table}", params={column: in_filter(batch)}, headers=RETURN_MINIMAL))
+    
+    async def _run_batches(self, items: Sequence, batch_size: Optional[int], on_progress: ProgressCallback, send) -> int:
+        done = 0
+        for batch in chunked(items, batch_size or BULK_BATCH_SIZE):
+            (await send(batch)).raise_for_status()
+            done += len(batch)
+            if on_progress:
+                on_progress(done, len(items))
+        return done
+    
+    async def rpc(self, function: str, params: Dict[str, Any] = None) -> Any:
+        """Chama uma função SQL do banco (POST /rpc/<function>)"""
+        response = await self.client.post(f"/rpc/{function}", json=params or {})
+        response.raise_for_status()
+        return response.json()
+    
+    async def close(self):
+        """Close connection"""
+        await self.client.aclose()
+
+def _backend_transport(asynchronous: bool = False):
+    """Transport do backend configurado: SQLite local, ou None (rede, Supabase)"""
+    if DATABASE_BACKEND == "sqlite":
+        from .sqlite_backend import AsyncSQLiteTransport, SQLiteTransport
+        return AsyncSQLiteTransport() if asynchronous else SQLiteTransport()
+    if DATABASE_BACKEND != "supabase":
+        raise ValueError(f"DATABASE_BACKEND inválido: {DATABASE_BACKEND} (use supabase ou sqlite)")
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set")
+    return None
+
 # Global client instance
 _client: Optional[SupabaseClient] = None
 
@@ -121,11 +500,30 @@ def get_supabase_client() -> SupabaseClient:
     """Get or create Supabase client"""
     global _client
     if _client is None:
-        if not SUPABASE_URL or not SUPABASE_KEY:
-            raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set")
-        _client = SupabaseClient()
+        _client = SupabaseClient(transport=_backend_transport())
     return _client
 
+# Global async client instance (o pool de conexões pertence ao event loop que o criou)
+_async_client: Optional[AsyncSupabaseClient] = None
+_async_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def get_async_supabase_client() -> AsyncSupabaseClient:
+    """Get or create the async Supabase client for the running event loop"""
+    global _async_client, _async_client_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client_loop is not loop:
+        _async_client = AsyncSupabaseClient(transport=_backend_transport(asynchronous=True))
+        _async_client_loop = loop
+    return _async_client
+
+async def close_async_supabase_client():
+    """Close the async client (shutdown do app)"""
+    global _async_client, _async_client_loop
+    if _async_client is not None and _async_client_loop is asyncio.get_running_loop():
+        await _async_client.close()
+    _async_client = None
+    _async_client_loop = None
+
 def init_database():
     """Initialize database connection"""
     try:
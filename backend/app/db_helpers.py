@@ -1,27 +1,81 @@
 """
 Database helper functions for Supabase using httpx
+Assíncronas (httpx.AsyncClient): as rotas fazem await sem bloquear o event loop
 """
+import os
+from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Any, Optional
-from .database import get_supabase_client
+from .database import get_async_supabase_client, embed
+from .client_cache import get_client_cache
+from .single_flight import single_flight
+from .models import ProofStatus, EXTRACTION_FALLBACK_VALUE, EXTRACTION_FALLBACK_CONFIDENCE
+
+# Colunas pedidas ao PostgREST: só o que as telas e as rotas usam
+# (file_path, file_hash, admin_notes, updated_at... ficam no banco)
+CLIENT_COLUMNS = (
+    'id', 'name', 'email', 'phone', 'document', 'notes',
+    'saldo', 'total_deposits', 'total_withdrawals', 'created_at',
+)
+PROOF_LIST_COLUMNS = (
+    'id', 'client_id', 'filename', 'file_type', 'file_size', 'extracted_value',
+    'extraction_confidence', 'extraction_status', 'beneficiary', 'endtoend',
+    'is_duplicate', 'deposited', 'uploaded_at',
+)
+PROOF_DETAIL_COLUMNS = PROOF_LIST_COLUMNS + ('description', 'original_proof_id')
+TRANSACTION_LIST_COLUMNS = ('id', 'client_id', 'amount', 'type', 'status', 'description', 'created_at')
+WITHDRAWAL_COLUMNS = TRANSACTION_LIST_COLUMNS + ('admin_notes',)
+# Listagens globais: o nome do cliente vem embutido na mesma consulta (clients.name)
+TRANSACTION_WITH_CLIENT_COLUMNS = TRANSACTION_LIST_COLUMNS + (embed('clients', 'name'),)
+
+# Extração roda em segundo plano no processo que recebeu o upload: se ele morre,
+# reinicia ou é congelado (serverless), o comprovante fica em EXTRACTING para
+# sempre. Depois deste prazo (segundos desde o upload) ele passa a
+# EXTRACTED_WITH_ERROR com o valor de fallback, como uma extração que falhou
+EXTRACTION_STALE_AFTER = float(os.getenv("EXTRACTION_STALE_AFTER", "600"))
+STALE_EXTRACTION_UPDATE = {
+    'extraction_status': ProofStatus.EXTRACTED_WITH_ERROR.value,
+    'extracted_value': EXTRACTION_FALLBACK_VALUE,
+    'extraction_confidence': EXTRACTION_FALLBACK_CONFIDENCE,
+}
 
 # ============================================
 # CLIENTS
 # ============================================
 
-def get_all_clients() -> List[Dict[str, Any]]:
-    """Get all clients"""
-    client = get_supabase_client()
-    return client.select('clients', columns='*')
+@single_flight
+async def get_all_clients() -> List[Dict[str, Any]]:
+    """
+    Get all clients
+    Chamadas concorrentes (várias telas abrindo juntas) compartilham uma consulta
+    """
+    client = get_async_supabase_client()
+    return await client.select('clients', columns=CLIENT_COLUMNS)
 
-def get_client_by_id(client_id: int) -> Optional[Dict[str, Any]]:
-    """Get client by ID"""
-    client = get_supabase_client()
-    results = client.select('clients', columns='*', filters={'id': f'eq.{client_id}'})
-    return results[0] if results else None
+async def get_client_by_id(client_id: int, fresh: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Get client by ID
+    Read-through no cache de clientes (TTL + relógio de invalidações): as
+    escritas abaixo invalidam a entrada do cliente. O cache é por processo e
+    pode estar atrasado em relação a escritas de outros workers: serve para
+    nome e exibição; saldo e checagens que dependem dele usam fresh=True (lê
+    do banco e atualiza o cache)
+    """
+    cache = get_client_cache()
+    if not fresh:
+        found, cached = cache.get(client_id)
+        if found:
+            return cached
 
-def create_client(name: str, email: str = "", phone: str = "", document: str = "", notes: str = "") -> Dict[str, Any]:
+    started_at = cache.begin_fill(client_id)
+    client = get_async_supabase_client()
+    results = await client.select('clients', columns=CLIENT_COLUMNS, filters={'id': f'eq.{client_id}'})
+    result = results[0] if results else None
+    cache.fill(client_id, result, started_at)
+    return result
+
+async def create_client(name: str, email: str = "", phone: str = "", document: str = "", notes: str = "") -> Dict[str, Any]:
     """Create new client"""
-    client = get_supabase_client()
+    client = get_async_supabase_client()
     data = {
         "name": name,
         "email": email,
@@ -32,154 +86,245 @@ def create_client(name: str, email: str = "", phone: str = "", document: str = "
         "total_deposits": 0.0,
         "total_withdrawals": 0.0
     }
-    return client.insert('clients', data)
+    created = await client.insert('clients', data)
+    if created and created.get('id') is not None:
+        get_client_cache().invalidate(created['id'])
+    return created
 
-def update_client(client_id: int, **kwargs) -> Dict[str, Any]:
+async def update_client(client_id: int, **kwargs) -> Dict[str, Any]:
     """Update client"""
-    client = get_supabase_client()
-    return client.update('clients', kwargs, filters={'id': f'eq.{client_id}'})
+    client = get_async_supabase_client()
+    try:
+        return await client.update('clients', kwargs, filters={'id': f'eq.{client_id}'})
+    finally:
+        get_client_cache().invalidate(client_id)
 
-def delete_client(client_id: int) -> bool:
+async def delete_client(client_id: int) -> bool:
     """Delete client"""
-    client = get_supabase_client()
-    return client.delete('clients', filters={'id': f'eq.{client_id}'})
-
-def update_client_balance(client_id: int, amount: float, operation: str = 'add'):
-    """Update client balance"""
-    current_client = get_client_by_id(client_id)
-    if not current_client:
-        return None
-    
-    new_saldo = current_client['saldo'] + amount if operation == 'add' else current_client['saldo'] - amount
-    
-    update_data = {'saldo': new_saldo}
-    if operation == 'add':
-        update_data['total_deposits'] = current_client['total_deposits'] + amount
-    else:
-        update_data['total_withdrawals'] = current_client['total_withdrawals'] + amount
-    
-    return update_client(client_id, **update_data)
+    client = get_async_supabase_client()
+    try:
+        return await client.delete('clients', filters={'id': f'eq.{client_id}'})
+    finally:
+        get_client_cache().invalidate(client_id)
+
+async def update_client_balance(client_id: int, amount: float, operation: str = 'add'):
+    """
+    Update client balance
+    Ajuste atômico no banco (função adjust_client_balance): uma chamada, sem
+    ler-calcular-gravar, então depósitos/saques concorrentes não se perdem
+    Retorna o cliente atualizado (ou None se não existir)
+    """
+    client = get_async_supabase_client()
+    try:
+        result = await client.rpc('adjust_client_balance', {
+            'p_client_id': client_id,
+            'p_amount': amount,
+            'p_operation': operation
+        })
+    finally:
+        get_client_cache().invalidate(client_id)
+    return result[0] if result else None
 
 # ============================================
 # PROOFS
 # ============================================
 
-def get_client_proofs(client_id: int) -> List[Dict[str, Any]]:
-    """Get all proofs for a client"""
-    client = get_supabase_client()
-    return client.select('proofs', columns='*', filters={'client_id': f'eq.{client_id}'})
+async def get_client_proofs(client_id: int) -> List[Dict[str, Any]]:
+    """Get all proofs for a client (extrações abandonadas já aparecem como EXTRACTED_WITH_ERROR)"""
+    client = get_async_supabase_client()
+    proofs = await client.select('proofs', columns=PROOF_LIST_COLUMNS, filters={'client_id': f'eq.{client_id}'})
+    return await expire_stale_extractions(proofs, client_id)
 
-def create_proof(client_id: int, filename: str, file_hash: str, **kwargs) -> Dict[str, Any]:
+def _extraction_cutoff() -> str:
+    """uploaded_at (TIMESTAMP em UTC, sem fuso) antes do qual EXTRACTING é abandonado"""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=EXTRACTION_STALE_AFTER)
+    return cutoff.replace(tzinfo=None).isoformat()
+
+async def fail_stale_extractions(client_id: Optional[int] = None) -> bool:
+    """
+    Marca como EXTRACTED_WITH_ERROR (valor de fallback) os comprovantes em
+    EXTRACTING há mais de EXTRACTION_STALE_AFTER
+    (de um cliente ou de todos); True se algum foi marcado
+    O filtro de status vai no UPDATE: uma extração que terminou no meio tempo não é sobrescrita
+    """
+    client = get_async_supabase_client()
+    filters = {'extraction_status': 'eq.EXTRACTING', 'uploaded_at': f'lt.{_extraction_cutoff()}'}
+    if client_id is not None:
+        filters['client_id'] = f'eq.{client_id}'
+    return bool(await client.update('proofs', STALE_EXTRACTION_UPDATE, filters=filters))
+
+async def expire_stale_extractions(proofs: List[Dict[str, Any]], client_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Na leitura: se algum comprovante da lista está em EXTRACTING além do prazo,
+    marca no banco e na própria lista (sem consulta extra no caso comum)
+    """
+    cutoff = _extraction_cutoff()[:19]
+    stale = [p for p in proofs if p.get('extraction_status') == 'EXTRACTING'
+             and (p.get('uploaded_at') or cutoff)[:19] < cutoff]
+    if stale:
+        await fail_stale_extractions(client_id)
+        for proof in stale:
+            proof.update(STALE_EXTRACTION_UPDATE)
+    return proofs
+
+async def create_proof(client_id: int, filename: str, file_hash: str, **kwargs) -> Dict[str, Any]:
     """Create new proof"""
-    client = get_supabase_client()
+    client = get_async_supabase_client()
     data = {
         "client_id": client_id,
         "filename": filename,
         "file_hash": file_hash,
         **kwargs
     }
-    return client.insert('proofs', data)
+    return await client.insert('proofs', data)
 
-def check_duplicate_proof(file_hash: str, client_id: int) -> bool:
+async def check_duplicate_proof(file_hash: str, client_id: int) -> bool:
     """Check if proof is duplicate"""
-    client = get_supabase_client()
-    results = client.select('proofs', columns='id', filters={
+    client = get_async_supabase_client()
+    results = await client.select('proofs', columns='id', filters={
         'file_hash': f'eq.{file_hash}',
         'client_id': f'eq.{client_id}'
     })
     return len(results) > 0
 
-def mark_proof_as_deposited(proof_id: int) -> Dict[str, Any]:
+async def update_proof(proof_id: int, **kwargs) -> Dict[str, Any]:
+    """Update proof"""
+    client = get_async_supabase_client()
+    return await client.update('proofs', kwargs, filters={'id': f'eq.{proof_id}'})
+
+async def mark_proof_as_deposited(proof_id: int) -> Dict[str, Any]:
     """Mark proof as deposited"""
-    client = get_supabase_client()
-    return client.update('proofs', {'deposited': True}, filters={'id': f'eq.{proof_id}'})
+    client = get_async_supabase_client()
+    return await client.update('proofs', {'deposited': True}, filters={'id': f'eq.{proof_id}'})
 
-def delete_proof(proof_id: int) -> bool:
+async def credit_proof(proof_id: int) -> Dict[str, Any]:
+    """
+    Credita o comprovante numa única transação no banco (função credit_proof):
+    valida, cria o depósito, ajusta o saldo e marca o comprovante como depositado
+    Retorna {transaction_id, client_id, amount, client_saldo} ou {error, status}
+    """
+    client = get_async_supabase_client()
+    result = await client.rpc('credit_proof', {'p_proof_id': proof_id})
+    if result and result.get('client_id') is not None:
+        get_client_cache().invalidate(result['client_id'])
+    return result
+
+async def delete_proof(proof_id: int) -> bool:
     """Delete proof"""
-    client = get_supabase_client()
-    return client.delete('proofs', filters={'id': f'eq.{proof_id}'})
+    client = get_async_supabase_client()
+    return await client.delete('proofs', filters={'id': f'eq.{proof_id}'})
 
 # ============================================
 # TRANSACTIONS
 # ============================================
 
-def get_all_transactions(transaction_type: Optional[str] = None) -> List[Dict[str, Any]]:
+async def get_all_transactions(transaction_type: Optional[str] = None) -> List[Dict[str, Any]]:
     """Get all transactions, optionally filtered by type"""
-    client = get_supabase_client()
+    client = get_async_supabase_client()
     filters = {'type': f'eq.{transaction_type}'} if transaction_type else {}
-    return client.select('transactions', columns='*', filters=filters)
+    return await client.select('transactions', columns=TRANSACTION_LIST_COLUMNS, filters=filters)
 
-def get_client_transactions(client_id: int) -> List[Dict[str, Any]]:
+async def get_client_transactions(client_id: int) -> List[Dict[str, Any]]:
     """Get all transactions for a client"""
-    client = get_supabase_client()
-    return client.select('transactions', columns='*', filters={'client_id': f'eq.{client_id}'})
+    client = get_async_supabase_client()
+    return await client.select('transactions', columns=TRANSACTION_LIST_COLUMNS, filters={'client_id': f'eq.{client_id}'})
 
-def create_transaction(client_id: int, amount: float, trans_type: str, **kwargs) -> Dict[str, Any]:
+async def create_transaction(client_id: int, amount: float, trans_type: str, **kwargs) -> Dict[str, Any]:
     """Create new transaction"""
-    client = get_supabase_client()
+    client = get_async_supabase_client()
     data = {
         "client_id": client_id,
         "amount": amount,
         "type": trans_type,
         **kwargs
     }
-    return client.insert('transactions', data)
+    return await client.insert('transactions', data)
 
-def update_transaction(transaction_id: int, **kwargs) -> Dict[str, Any]:
+async def update_transaction(transaction_id: int, **kwargs) -> Dict[str, Any]:
     """Update transaction"""
-    client = get_supabase_client()
-    return client.update('transactions', kwargs, filters={'id': f'eq.{transaction_id}'})
+    client = get_async_supabase_client()
+    return await client.update('transactions', kwargs, filters={'id': f'eq.{transaction_id}'})
 
-def delete_transaction(transaction_id: int) -> bool:
+async def delete_transaction(transaction_id: int) -> bool:
     """Delete transaction"""
-    client = get_supabase_client()
-    return client.delete('transactions', filters={'id': f'eq.{transaction_id}'})
+    client = get_async_supabase_client()
+    return await client.delete('transactions', filters={'id': f'eq.{transaction_id}'})
+
+async def reverse_deposit(transaction_id: int) -> Dict[str, Any]:
+    """
+    Reverte um depósito numa única transação no banco (função reverse_deposit)
+    Retorna {client_id, amount, client_saldo} ou {error, status}
+    """
+    client = get_async_supabase_client()
+    result = await client.rpc('reverse_deposit', {'p_transaction_id': transaction_id})
+    if result and result.get('client_id') is not None:
+        get_client_cache().invalidate(result['client_id'])
+    return result
+
+async def approve_withdrawal(withdrawal_id: int, client_id: int, admin_notes: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Conclui um saque pendente numa única transação no banco (função
+    approve_withdrawal): PENDING -> COMPLETED e desconto do saldo juntos, então
+    duas aprovações simultâneas descontam uma vez só
+    Retorna {withdrawal, client_saldo} ou {error, status}
+    """
+    client = get_async_supabase_client()
+    try:
+        return await client.rpc('approve_withdrawal', {
+            'p_withdrawal_id': withdrawal_id,
+            'p_client_id': client_id,
+            'p_admin_notes': admin_notes
+        })
+    finally:
+        get_client_cache().invalidate(client_id)
 
 # ============================================
 # STATISTICS
 # ============================================
 
-def get_global_statistics() -> Dict[str, Any]:
-    """Get global system statistics"""
-    client = get_supabase_client()
+@single_flight
+async def get_global_statistics() -> Dict[str, Any]:
+    """
+    Get global system statistics
+    Contagens e somas feitas no banco (função get_global_statistics): uma chamada
+    com poucos bytes, em vez de baixar todos os clientes e transações
+    """
+    client = get_async_supabase_client()
+    stats = await client.rpc('get_global_statistics')
     
-    # Total clients
-    all_clients = client.select('clients', columns='*')
-    total_clients = len(all_clients)
-    
-    # Clients with negative balance
-    clientes_negativo = len([c for c in all_clients if c['saldo'] < 0])
-    
-    # Total deposits
-    deposits = client.select('transactions', columns='amount', filters={
-        'type': 'eq.DEPOSIT',
-        'status': 'eq.COMPLETED'
-    })
-    total_deposits = sum([t['amount'] for t in deposits]) if deposits else 0
-    
-    # Total withdrawals
-    withdrawals = client.select('transactions', columns='amount', filters={
-        'type': 'eq.WITHDRAWAL',
-        'status': 'eq.COMPLETED'
-    })
-    total_withdrawals = sum([t['amount'] for t in withdrawals]) if withdrawals else 0
-    
-    # Total proofs
-    all_proofs = client.select('proofs', columns='id')
-    total_proofs = len(all_proofs)
-    
-    # Total transactions
-    all_transactions = client.select('transactions', columns='id')
-    total_operations = len(all_transactions)
+    total_deposits = float(stats.get('total_depositos') or 0)
+    total_withdrawals = float(stats.get('total_saques') or 0)
     
     return {
-        "total_clients": total_clients,
-        "clientes_em_negativo": clientes_negativo,
+        "total_clients": stats.get('total_clients', 0),
+        "clientes_em_negativo": stats.get('clientes_em_negativo', 0),
         "total_depositos": total_deposits,
         "total_saques": total_withdrawals,
         "saldo_geral": total_deposits - total_withdrawals,
-        "total_comprovantes": total_proofs,
-        "total_operations": total_operations,
+        "total_comprovantes": stats.get('total_comprovantes', 0),
+        "total_operations": stats.get('total_operations', 0),
         "total_buy_brl": total_deposits,
         "total_sell_brl": total_withdrawals
     }
+
+async def get_history_totals(client_id: Optional[int] = None, date_from: Optional[str] = None,
+                             date_to: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Totais do histórico (transações COMPLETED) de um cliente ou de todos no
+    período [date_from, date_to), somados no banco (função get_history_totals):
+    não dependem da página de transações retornada pela listagem
+    """
+    client = get_async_supabase_client()
+    totals = await client.rpc('get_history_totals', {
+        'p_client_id': client_id, 'p_date_from': date_from, 'p_date_to': date_to
+    })
+    
+    total_deposits = float(totals.get('total_deposits') or 0)
+    total_withdrawals = float(totals.get('total_withdrawals') or 0)
+    
+    return {
+        "total_deposits": total_deposits,
+        "total_withdrawals": total_withdrawals,
+        "saldo_periodo": total_deposits - total_withdrawals,
+        "total": totals.get('total', 0)
+    }
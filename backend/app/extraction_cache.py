@@ -0,0 +1,168 @@
+"""
+Cache de resultados de extração endereçado por conteúdo
+Chave: SHA-256 do arquivo + versão do extrator
+LRU em memória na frente de um armazenamento SQLite em disco
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .extractors import EXTRACTOR_VERSION
+
+logger = logging.getLogger(__name__)
+
+# Configuração (variáveis de ambiente)
+CACHE_PATH = os.getenv(
+    "EXTRACTION_CACHE_PATH",
+    str(Path(tempfile.gettempdir()) / "fluxo_extraction_cache.sqlite3")
+)
+CACHE_MEMORY_SIZE = int(os.getenv("EXTRACTION_CACHE_MEMORY_SIZE", "256"))
+CACHE_MAX_ENTRIES = int(os.getenv("EXTRACTION_CACHE_MAX_ENTRIES", "10000"))
+
+
+class ExtractionCache:
+    """
+    Cache de dois níveis para resultados de extract_proof_data
+    - Memória: OrderedDict LRU com no máximo memory_size entradas
+    - Disco: SQLite com no máximo max_entries entradas (remove as menos acessadas)
+    Sem caminho em disco (ou com falha ao abrir), funciona só em memória
+    """
+
+    def __init__(self, path: Optional[str] = CACHE_PATH, memory_size: int = CACHE_MEMORY_SIZE,
+                 max_entries: int = CACHE_MAX_ENTRIES, version: str = EXTRACTOR_VERSION):
+        self.memory_size = memory_size
+        self.max_entries = max_entries
+        self.version = version
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if path:
+            try:
+                self._conn = sqlite3.connect(path, check_same_thread=False)
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS extraction_cache ("
+                    "key TEXT PRIMARY KEY, result TEXT NOT NULL, accessed_at REAL NOT NULL)"
+                )
+                self._conn.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_extraction_cache_accessed_at "
+                    "ON extraction_cache(accessed_at)"
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ Cache de extração em disco indisponível ({e}), usando só memória")
+                self._conn = None
+
+    def _key(self, file_hash: str) -> str:
+        return f"{self.version}:{file_hash}"
+
+    def _remember(self, key: str, result: Dict[str, Any]):
+        """Insere no LRU em memória (chamar com o lock)"""
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get(self, file_hash: str) -> Optional[Dict[str, Any]]:
+        """Retorna o resultado em cache ou None"""
+        key = self._key(file_hash)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return dict(self._memory[key])
+
+            if self._conn is not None:
+                try:
+                    row = self._conn.execute(
+                        "SELECT result FROM extraction_cache WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row:
+                        self._conn.execute(
+                            "UPDATE extraction_cache SET accessed_at = ? WHERE key = ?",
+                            (time.time(), key)
+                        )
+                        self._conn.commit()
+                        result = json.loads(row[0])
+                        self._remember(key, result)
+                        self.disk_hits += 1
+                        return dict(result)
+                except sqlite3.Error as e:
+                    logger.warning(f"Erro ao ler cache de extração: {e}")
+
+            self.misses += 1
+            return None
+
+    def set(self, file_hash: str, result: Dict[str, Any]):
+        """Armazena o resultado nos dois níveis"""
+        key = self._key(file_hash)
+        with self._lock:
+            self._remember(key, dict(result))
+
+            if self._conn is None:
+                return
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO extraction_cache (key, result, accessed_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(result), time.time())
+                )
+                # Eviction por tamanho: remove as entradas acessadas há mais tempo
+                count = self._conn.execute("SELECT COUNT(*) FROM extraction_cache").fetchone()[0]
+                excess = count - self.max_entries
+                if excess > 0:
+                    self._conn.execute(
+                        "DELETE FROM extraction_cache WHERE key IN ("
+                        "SELECT key FROM extraction_cache ORDER BY accessed_at LIMIT ?)",
+                        (excess,)
+                    )
+                    self.evictions += excess
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Erro ao gravar cache de extração: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de hit/miss e tamanho do cache"""
+        with self._lock:
+            disk_entries = 0
+            if self._conn is not None:
+                try:
+                    disk_entries = self._conn.execute("SELECT COUNT(*) FROM extraction_cache").fetchone()[0]
+                except sqlite3.Error:
+                    pass
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "version": self.version,
+                "hits": hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+            }
+
+
+# Global cache instance
+_cache: Optional[ExtractionCache] = None
+
+def get_extraction_cache() -> ExtractionCache:
+    """Get or create the extraction cache"""
+    global _cache
+    if _cache is None:
+        _cache = ExtractionCache()
+    return _cache
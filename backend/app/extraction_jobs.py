@@ -0,0 +1,141 @@
+"""
+Pipeline assíncrono de extração de comprovantes
+O upload grava o comprovante como EXTRACTING e retorna na hora;
+a extração (OCR/PDF) roda num pool de processos e atualiza o comprovante depois
+O conteúdo do arquivo vai em memória para o worker, sem arquivo temporário
+"""
+
+import os
+import asyncio
+import logging
+from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional
+
+from .extractors import extract_proof_data_from_bytes, configure_ocr_threads, OCR_TIER_LIGHT, OCR_TIER_FULL
+from .extraction_cache import get_extraction_cache
+from .models import ProofStatus, EXTRACTION_FALLBACK_VALUE, EXTRACTION_FALLBACK_CONFIDENCE
+
+logger = logging.getLogger(__name__)
+
+# Número de processos de extração (padrão: um por núcleo)
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", "0")) or (os.cpu_count() or 1)
+
+# Threads de OCR por PDF em cada worker: o pool já ocupa os núcleos, então uma só
+# quando há mais de um worker (OCR_PAGE_WORKERS, se definido, prevalece)
+OCR_THREADS_PER_WORKER = int(os.getenv("OCR_PAGE_WORKERS", "0")) or (
+    1 if EXTRACTION_WORKERS > 1 else min(4, os.cpu_count() or 1))
+
+_executor: Optional[Executor] = None
+
+# Camada de pré-processamento usada em cada imagem OCR (light = sem escalar)
+_ocr_tier_counts: Counter = Counter()
+
+
+def get_extraction_executor() -> Executor:
+    """Get or create the extraction process pool"""
+    global _executor
+    if _executor is None:
+        try:
+            _executor = ProcessPoolExecutor(max_workers=EXTRACTION_WORKERS, initializer=configure_ocr_threads,
+                                            initargs=(OCR_THREADS_PER_WORKER,))
+        except (OSError, NotImplementedError) as e:
+            # Ambientes serverless podem não suportar multiprocessing
+            logger.warning(f"⚠️ Pool de processos indisponível ({e}), usando threads")
+            configure_ocr_threads(OCR_THREADS_PER_WORKER)
+            _executor = ThreadPoolExecutor(max_workers=EXTRACTION_WORKERS)
+    return _executor
+
+
+def shutdown_extraction_executor():
+    """Shut down the extraction pool"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+
+
+async def run_extraction(contents: bytes, content_type: Optional[str], filename: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Executa extract_proof_data_from_bytes no pool sem bloquear o event loop
+    Retorna o dicionário de extract_proof_data
+    """
+    global _executor
+    loop = asyncio.get_running_loop()
+    args = (extract_proof_data_from_bytes, contents, content_type, filename)
+    executor = get_extraction_executor()
+    try:
+        return await loop.run_in_executor(executor, *args)
+    except BrokenProcessPool:
+        # Um worker morreu (ex: OOM); encerrar o pool quebrado (processos e fila)
+        # e recriar, uma vez só mesmo com várias extrações falhando juntas
+        if _executor is executor:
+            logger.warning("⚠️ Pool de extração quebrado, recriando")
+            _executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+        return await loop.run_in_executor(get_extraction_executor(), *args)
+
+
+def record_ocr_tiers(extracted_data: Dict[str, Any]):
+    """Acumula as camadas de OCR usadas numa extração"""
+    _ocr_tier_counts.update(extracted_data.get('ocr_tiers') or [])
+
+
+def get_ocr_tier_stats() -> Dict[str, Any]:
+    """Quantas imagens pararam na camada leve vs. escalaram para o pipeline pesado"""
+    light = _ocr_tier_counts[OCR_TIER_LIGHT]
+    full = _ocr_tier_counts[OCR_TIER_FULL]
+    total = light + full
+    return {
+        OCR_TIER_LIGHT: light,
+        OCR_TIER_FULL: full,
+        "escalation_rate": full / total if total else 0.0,
+    }
+
+
+def build_extraction_update(extracted_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Converte o resultado da extração nos campos do comprovante
+    Sucesso -> EXTRACTED, caso contrário -> EXTRACTED_WITH_ERROR; sem valor lido,
+    usa o valor de fallback (o comprovante continua podendo ser creditado)
+    """
+    value = extracted_data.get('value')
+    confidence = extracted_data.get('confidence', 0.0) or 0.0
+    if value is None:
+        value, confidence = EXTRACTION_FALLBACK_VALUE, EXTRACTION_FALLBACK_CONFIDENCE
+    success = bool(extracted_data.get('success'))
+    return {
+        "extracted_value": value,
+        "extraction_confidence": confidence,
+        "extraction_status": ProofStatus.EXTRACTED.value if success else ProofStatus.EXTRACTED_WITH_ERROR.value,
+        "beneficiary": extracted_data.get('beneficiary') or "DESCONHECIDO",
+        "endtoend": extracted_data.get('endtoend') or None,
+    }
+
+
+async def extract_to_update(contents: bytes, content_type: Optional[str], filename: Optional[str] = None,
+                            file_hash: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Roda a extração do conteúdo enviado e retorna os campos a atualizar
+    Com file_hash, consulta o cache de resultados antes de rodar o OCR
+    O cache lê e grava em SQLite (síncrono): get/set rodam numa thread, fora do event loop
+    """
+    cache = get_extraction_cache()
+    try:
+        extracted_data = await asyncio.to_thread(cache.get, file_hash) if file_hash else None
+        if extracted_data is None:
+            extracted_data = await run_extraction(contents, content_type, filename)
+            record_ocr_tiers(extracted_data)
+            if extracted_data.get('ocr_tiers'):
+                logger.info(f"🔍 Camadas de OCR ({filename}): {', '.join(extracted_data['ocr_tiers'])}")
+            # Só resultados bem-sucedidos: falhas podem ser transitórias (ex: Tesseract ausente)
+            if file_hash and extracted_data.get('success'):
+                await asyncio.to_thread(cache.set, file_hash, extracted_data)
+        else:
+            logger.info(f"♻️ Extração reaproveitada do cache: {file_hash[:12]}")
+    except Exception as e:
+        logger.error(f"Erro na extração de {filename}: {e}")
+        extracted_data = {'success': False, 'confidence': 0.0, 'error': str(e)}
+
+    return build_extraction_update(extracted_data)
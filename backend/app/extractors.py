@@ -3,133 +3,377 @@ Módulo de extração de valores de comprovantes (baseado em Sistema Nader V2)
 Suporta PDFs, JPGs e PNGs
 """
 
+from __future__ import annotations
+
+import io
+import os
 import re
-import pytesseract
-from PIL import Image
+import queue
+import importlib.util
+from abc import ABC, abstractmethod
 from pathlib import Path
 import logging
-from typing import Tuple, Optional, Dict
-from datetime import datetime
-
-try:
-    import cv2
-    import numpy as np
-    OPENCV_AVAILABLE = True
-except ImportError:
-    OPENCV_AVAILABLE = False
-
-try:
-    import pdfplumber
-    from pdf2image import convert_from_path
-    PDF_SUPPORT = True
-except ImportError:
-    PDF_SUPPORT = False
+from typing import TYPE_CHECKING, Any, Tuple, Optional, Dict, Iterator, List, Union, NamedTuple
+from datetime import datetime, date
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+def _module_available(name: str) -> bool:
+    """Checa se o módulo está instalado sem importá-lo"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+# Dependências pesadas (PIL, OpenCV, pdfplumber, Tesseract...) só são importadas
+# no primeiro uso, dentro das funções: rotas que não extraem nada (e o cold start
+# serverless) não pagam por elas. Aqui só se verifica se estão instaladas.
+OPENCV_AVAILABLE = _module_available("cv2") and _module_available("numpy")
+PDF_SUPPORT = _module_available("pdfplumber") and _module_available("pdf2image")
+# Renderizador em processo (dependência do pdfplumber): evita um processo do poppler por página
+PDFIUM_AVAILABLE = _module_available("pypdfium2")
+# API nativa do Tesseract: carrega o modelo uma vez por engine (sem fork por chamada)
+TESSEROCR_AVAILABLE = _module_available("tesserocr")
 
 logger = logging.getLogger(__name__)
 
-# Regex para extrair valores monetários (baseado em Nader V2)
-AMOUNT_RE = re.compile(r"""
-(?:
-    # Formato "Valor R$ 143.800,00"
-    (?:valor|value|amount|total|quantia)\s*
-    (?:R\$|BRL|USD|US\$)?\s*
-    (\d{1,3}(?:\.\d{3})*,\d{2})
-)|
-(?:
-    # Formato "R$ 143.800,00" isolado
-    (?:R\$|BRL)\s*
-    (\d{1,3}(?:\.\d{3})*,\d{2})
-)|
-(?:
-    # Formato americano $1,234.56
-    (?:US\$|\$)\s*
-    (\d{1,3}(?:,\d{3})*\.\d{2})
-)|
-(?:
-    # Números com vírgula decimal (formato brasileiro)
-    \b(\d{1,3}(?:\.\d{3})*,\d{2})\b
-)
-""", re.IGNORECASE | re.VERBOSE)
-
-# Regex para datas
-DATE_RE = re.compile(r'''
-(?:
-    # Formato "03 NOV 2025" ou "03/11/2025"
-    (\d{1,2}[\/\-]\d{1,2}[\/\-]\d{4})
-)|
-(?:
-    # Formato YYYY-MM-DD
-    (\d{4}[\/\-]\d{1,2}[\/\-]\d{1,2})
-)
-''', re.IGNORECASE | re.VERBOSE)
-
-# Regex para nomes de beneficiários
-BENEFICIARY_RE = re.compile(r'''
-(?:
-    # Formato: "Favorecido Nome: NOME"
-    Favorecido\s+Nome\s*[:\-]?\s*
-    ([A-Z][A-Za-z0-9\.\s\-&]+?)(?=\s+(?:CPF|CNPJ|Institui|Chave|Conta|Data))
-)|
-(?:
-    # Formato: "BeneficiÃ¡rio: NOME"
-    (?:BeneficiÃ¡rio|Beneficiario|Para)\s*[:\-]?\s*
-    ([A-Z][A-Za-z0-9\.\s\-&]{2,80})
+# Versão do extrator: incrementar ao mudar parsers/OCR para invalidar o cache de resultados
+EXTRACTOR_VERSION = "6"
+
+# Resolução de renderização das páginas escaneadas e threads de OCR por PDF
+# (dentro do pool de extração, configure_ocr_threads ajusta pelo tamanho do pool)
+PDF_RENDER_DPI = 300
+OCR_PAGE_WORKERS = int(os.getenv("OCR_PAGE_WORKERS", "0")) or min(4, os.cpu_count() or 1)
+
+
+def configure_ocr_threads(page_workers: int):
+    """
+    Threads de OCR por PDF neste processo; o Tesseract (OpenMP) fica com uma
+    thread por chamada, senão cada página abriria mais uma thread por núcleo
+    Chamada no início de cada worker do pool de extração
+    """
+    global OCR_PAGE_WORKERS
+    OCR_PAGE_WORKERS = max(1, page_workers)
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+# Backend de OCR: auto (tesserocr se instalado), tesserocr ou pytesseract
+OCR_BACKEND = os.getenv("OCR_BACKEND", "auto").lower()
+OCR_LANG = 'por'
+
+# Pré-processamento em camadas: só escala para o pipeline pesado
+# se a camada leve não achar valor ou tiver confiança média abaixo disso
+OCR_MIN_CONFIDENCE = float(os.getenv("OCR_MIN_CONFIDENCE", "0.70"))
+OCR_TIER_LIGHT = "light"
+OCR_TIER_FULL = "full"
+
+# Tipos MIME aceitos por extract_proof_data_from_bytes
+PDF_CONTENT_TYPES = {'application/pdf', 'application/x-pdf'}
+IMAGE_CONTENT_TYPES = {'image/jpeg', 'image/jpg', 'image/pjpeg', 'image/png'}
+CONTENT_TYPE_BY_EXTENSION = {
+    '.pdf': 'application/pdf',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+}
+
+# Caminho de arquivo ou conteúdo em memória
+PdfSource = Union[str, bytes, memoryview]
+
+# Meses por extenso ou abreviados (pt, e as abreviações em inglês que diferem),
+# em minúsculas; as três primeiras letras identificam o mês em MONTHS
+MONTHS = {
+    'jan': 1, 'fev': 2, 'feb': 2, 'mar': 3, 'abr': 4, 'apr': 4, 'mai': 5, 'may': 5,
+    'jun': 6, 'jul': 7, 'ago': 8, 'aug': 8, 'set': 9, 'sep': 9, 'out': 10, 'oct': 10,
+    'nov': 11, 'dez': 12, 'dec': 12,
+}
+MONTH_NAMES_PATTERN = (
+    r'(?:jan(?:eiro)?|fev(?:ereiro)?|feb|mar(?:[çc]o)?|abr(?:il)?|apr|mai(?:o)?|may|'
+    r'jun(?:ho)?|jul(?:ho)?|ago(?:sto)?|aug|set(?:embro)?|sep|out(?:ubro)?|oct|'
+    r'nov(?:embro)?|dez(?:embro)?|dec)(?![a-z])'
 )
-''', re.IGNORECASE | re.VERBOSE | re.MULTILINE)
-
-# Regex para EndToEnd (ID da transação PIX)
-ENDTOEND_RE = re.compile(r'''
-(?:
-    # Formato PIX: E + números + letras/números
-    \b(E\d{11,20}[a-zA-Z0-9]{10,20})\b
-)|
-(?:
-    # ID da transação explícito
-    (?:id\s*(?:da\s*)?transa[çc][ãa]o|end\s*to\s*end|endtoend|e2e)
-    \s*[:\-]?\s*
-    ([A-Za-z0-9]{15,50})
+
+# Scanner único de campos: uma passada pelo texto emite candidatos de
+# valor, data, beneficiário e EndToEnd com suas posições.
+# Roda sobre o texto em minúsculas (sem IGNORECASE) e toda alternativa começa
+# por uma classe de caracteres: assim o motor de regex descarta cada posição
+# com um teste de caractere em vez de tentar as dez alternativas.
+# Cada alternativa tem exatamente um grupo nomeado (o tipo do candidato,
+# lido via match.lastgroup). Nos tipos de LEADING_CHAR_KINDS o primeiro
+# caractere do candidato é consumido pela classe inicial, fora do grupo.
+# Rótulos de beneficiário/EndToEnd consomem só o rótulo e o valor é lido com
+# um match ancorado no fim dele, para que valores dentro do nome continuem
+# visíveis para o scanner.
+# Todos os quantificadores são limitados (separadores de milhar, espaços,
+# nomes): cada posição faz no máximo uma quantidade constante de trabalho,
+# então o tempo é linear no tamanho do texto mesmo com OCR ruidoso.
+FIELD_SCAN_RE = re.compile(r'''
+    # Valor: formato "Valor R$ 143.800,00"
+    [vatq](?:(?<=v)al(?:or|ue)|(?<=a)mount|(?<=t)otal|(?<=q)uantia)\s{0,16}
+    (?:r\$|brl|usd|us\$)?\s{0,16}
+    (?P<amount_labeled>\d{1,3}(?:\.\d{3}){0,3},\d{2})
+|
+    # Valor: formato "R$ 143.800,00" isolado
+    [rb](?:(?<=r)\$|(?<=b)rl)\s{0,16}
+    (?P<amount_brl>\d{1,3}(?:\.\d{3}){0,3},\d{2})
+|
+    # Valor: formato americano $1,234.56
+    [u$](?:(?<=u)s\$|(?<=\$))\s{0,16}
+    (?P<amount_usd>\d{1,3}(?:,\d{3}){0,3}\.\d{2})
+|
+    \d(?:
+        # Valor: números com vírgula decimal (formato brasileiro)
+        (?<!\w\d)(?P<amount_plain>\d{0,2}(?:\.\d{3}){0,3},\d{2})\b
+    |
+        # Data: formato "03/11/2025"
+        (?P<date_dmy>\d?[\/\-]\d{1,2}[\/\-]\d{4})
+    |
+        # Data: formato YYYY-MM-DD
+        (?P<date_ymd>\d{3}[\/\-]\d{1,2}[\/\-]\d{1,2})
+    |
+        # Data: mês por extenso/abreviado - "03 NOV 2025", "3 de novembro de 2025"
+        (?P<date_text>\d?[\s\/\-]{1,3}(?:de\s{1,3})?(?:%s)\.?[\s\/\-]{1,3}(?:de\s{1,3})?\d{4})(?!\d)
+    )
+|
+    # EndToEnd PIX: E + números + letras/números
+    e(?<!\we)(?P<endtoend_pix>\d{11,20}[a-z0-9]{10,20})\b
+|
+    # Rótulo de ID da transação explícito (valor lido em ENDTOEND_VALUE_RE)
+    [ie](?P<endtoend_label>(?:(?<=i)d\s{0,4}(?:da\s{0,4})?transa[çc][ãa]o|(?<=e)nd\s{0,4}to\s{0,4}end|(?<=e)ndtoend|(?<=e)2e)\s{0,16}[:\-]?\s{0,16})
+|
+    # Rótulo "Favorecido Nome: NOME" (valor lido em FAVORECIDO_VALUE_RE)
+    f(?P<favorecido_label>avorecido\s{1,16}nome\s{0,16}[:\-]?\s{0,16})
+|
+    # Rótulo "Beneficiário: NOME" (valor lido em BENEFICIARY_VALUE_RE)
+    [bp](?P<beneficiary_label>(?:(?<=b)enefici(?:á|ã¡|a)rio|(?<=p)ara)\s{0,16}[:\-]?\s{0,16})
+''' % MONTH_NAMES_PATTERN, re.VERBOSE)
+LEADING_CHAR_KINDS = {'amount_plain', 'date_dmy', 'date_ymd', 'date_text', 'endtoend_pix'}
+
+# Valores ancorados no fim dos rótulos
+# O nome do favorecido vai até o próximo rótulo (CPF, CNPJ...), no máximo
+# FAVORECIDO_MAX_CHARS: sem limite, cada rótulo sem CPF depois varreria o resto do texto
+# Nome mais longo que isso é rejeitado (beneficiário não lido), não truncado
+ENDTOEND_VALUE_RE = re.compile(r'[A-Za-z0-9]{15,50}')
+FAVORECIDO_MAX_CHARS = 120
+FAVORECIDO_VALUE_RE = re.compile(
+    r'[A-Z][A-Za-z0-9\.\s\-&]{0,%d}?(?=\s(?:CPF|CNPJ|Institui|Chave|Conta|Data))' % FAVORECIDO_MAX_CHARS,
+    re.IGNORECASE
 )
-''', re.IGNORECASE | re.VERBOSE)
+BENEFICIARY_VALUE_RE = re.compile(r'[A-Z][A-Za-z0-9\.\s\-&]{2,80}', re.IGNORECASE)
 
+# Partes das datas emitidas pelo scanner
+DATE_NUMERIC_RE = re.compile(r'(\d{1,4})[\/\-](\d{1,2})[\/\-](\d{1,4})')
+DATE_TEXT_RE = re.compile(r'(\d{1,2})[\s\/\-]{1,3}(?:de\s{1,3})?([a-zç]{3})[a-zç]*\.?[\s\/\-]{1,3}(?:de\s{1,3})?(\d{4})')
 
-def parse_amount(text: str) -> Optional[float]:
+# Limpeza do nome do beneficiário
+WHITESPACE_RE = re.compile(r'\s+')
+TRAILING_LABEL_RE = re.compile(r'\s+(?:CNPJ|CPF|Valor|R\$|Data|Conta|Agência)\s*$', re.IGNORECASE)
+
+# Teto do texto varrido pelo scanner (~600 páginas de OCR); o tempo já é
+# linear, o teto limita o pior caso absoluto de um PDF malformado
+FIELD_SCAN_MAX_CHARS = int(os.getenv("FIELD_SCAN_MAX_CHARS", "2000000"))
+
+AMOUNT_KINDS = {'amount_labeled', 'amount_brl', 'amount_usd', 'amount_plain'}
+DATE_KINDS = {'date_dmy', 'date_ymd', 'date_text'}
+PROOF_FIELDS = ('value', 'date', 'beneficiary', 'endtoend')
+
+
+class FieldMatch(NamedTuple):
+    """Valor de um campo e a posição (start, end) do trecho no texto"""
+    value: Any
+    start: int
+    end: int
+
+
+def _amount_from_raw(raw: str, us_format: bool = False) -> Optional[float]:
+    """Converte o texto do valor (BR ou US) em float dentro do intervalo válido"""
+    clean = raw.strip()
+    
+    if us_format:
+        # Formato: 1,234.56 -> remove separador de milhar
+        clean = clean.replace(',', '')
+    # Se tem vírgula como decimal (formato brasileiro)
+    elif ',' in clean and '.' in clean:
+        # Formato: 143.800,00 -> remove pontos e troca vírgula por ponto
+        clean = clean.replace('.', '').replace(',', '.')
+    elif ',' in clean:
+        # Formato: 1800,00 -> troca vírgula por ponto
+        clean = clean.replace(',', '.')
+    
+    try:
+        v = float(clean)
+    except ValueError:
+        return None
+    
+    # Validar intervalo (0 a 10 milhões)
+    return v if 0 < v < 10_000_000 else None
+
+
+def date_to_iso(date_str: str) -> Optional[str]:
     """
-    Extrai valor monetário do texto do comprovante
-    Retorna: float (valor em reais) ou None
+    Converte uma data encontrada pelo scanner em ISO (YYYY-MM-DD)
+    Aceita DD/MM/AAAA, AAAA-MM-DD e mês por extenso ("03 NOV 2025", "3 de novembro de 2025")
+    Retorna None para datas inexistentes (ex: 31/02/2025)
     """
-    if not text:
-        return None
+    numeric = DATE_NUMERIC_RE.fullmatch(date_str)
+    if numeric:
+        first, second, third = numeric.groups()
+        if len(first) == 4:
+            year, month, day = int(first), int(second), int(third)
+        else:
+            day, month, year = int(first), int(second), int(third)
+            if month > 12 >= day:
+                # MM/DD/AAAA (formato americano)
+                day, month = month, day
+    else:
+        textual = DATE_TEXT_RE.fullmatch(date_str.lower())
+        if not textual:
+            return None
+        day, year = int(textual.group(1)), int(textual.group(3))
+        month = MONTHS[textual.group(2)]
     
-    matches = AMOUNT_RE.findall(text)
-    if not matches:
+    try:
+        return date(year, month, day).isoformat()
+    except ValueError:
+        return None
+
+
+def _clean_name(name: str) -> Optional[str]:
+    if not name:
         return None
+    # Remover quebras de linha e múltiplos espaços
+    cleaned = WHITESPACE_RE.sub(' ', name).strip()
     
-    values = []
-    for match_groups in matches:
-        # match_groups é uma tupla, pega o primeiro grupo não vazio
-        raw = next((g for g in match_groups if g), None)
-        if not raw:
-            continue
+    # Remover rótulos no final
+    while True:
+        stripped = TRAILING_LABEL_RE.sub('', cleaned)
+        if stripped == cleaned:
+            break
+        cleaned = stripped
+    
+    return cleaned if cleaned else None
+
+
+def _lowercase_same_length(text: str) -> str:
+    """text.lower() preservando as posições (caracteres que mudam de tamanho ficam como estão)"""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return ''.join(c if len(c.lower()) != 1 else c.lower() for c in text)
+
+
+def scan_fields(text: str) -> Dict[str, List[FieldMatch]]:
+    """
+    Percorre o texto uma vez e retorna todos os candidatos de cada campo
+    Retorna: {'value': [...], 'date': [...], 'beneficiary': [...], 'endtoend': [...]}
+    na ordem em que aparecem no texto (datas ainda como texto bruto)
+    """
+    candidates: Dict[str, List[FieldMatch]] = {field: [] for field in PROOF_FIELDS}
+    if not text:
+        return candidates
+    if len(text) > FIELD_SCAN_MAX_CHARS:
+        logger.warning(f"⚠️ Texto com {len(text)} caracteres, varrendo só os primeiros {FIELD_SCAN_MAX_CHARS}")
+        text = text[:FIELD_SCAN_MAX_CHARS]
+    
+    for match in FIELD_SCAN_RE.finditer(_lowercase_same_length(text)):
+        kind = match.lastgroup
+        start, end = match.span(kind)
+        if kind in LEADING_CHAR_KINDS:
+            start = match.start()
         
-        clean = raw.strip()
+        if kind in AMOUNT_KINDS:
+            value = _amount_from_raw(text[start:end], us_format=kind == 'amount_usd')
+            if value is not None:
+                candidates['value'].append(FieldMatch(value, start, end))
         
-        # Se tem vírgula como decimal (formato brasileiro)
-        if ',' in clean and '.' in clean:
-            # Formato: 143.800,00 -> remove pontos e troca vírgula por ponto
-            clean = clean.replace('.', '').replace(',', '.')
-        elif ',' in clean:
-            # Formato: 1800,00 -> troca vírgula por ponto
-            clean = clean.replace(',', '.')
+        elif kind in DATE_KINDS:
+            # Texto bruto; convertido em select_fields só até achar uma data válida
+            candidates['date'].append(FieldMatch(text[start:end], start, end))
         
-        try:
-            v = float(clean)
-            # Validar intervalo (0 a 10 milhões)
-            if 0 < v < 10_000_000:
-                values.append(v)
-        except ValueError:
-            continue
+        elif kind == 'endtoend_pix':
+            candidates['endtoend'].append(FieldMatch(text[start:end].upper(), start, end))
+        
+        elif kind == 'endtoend_label':
+            value_match = ENDTOEND_VALUE_RE.match(text, end)
+            if value_match:
+                candidates['endtoend'].append(
+                    FieldMatch(value_match.group().upper(), value_match.start(), value_match.end())
+                )
+        
+        else:
+            value_re = FAVORECIDO_VALUE_RE if kind == 'favorecido_label' else BENEFICIARY_VALUE_RE
+            value_match = value_re.match(text, end)
+            if value_match:
+                cleaned = _clean_name(value_match.group())
+                if cleaned and len(cleaned) > 3:
+                    candidates['beneficiary'].append(
+                        FieldMatch(cleaned, value_match.start(), value_match.end())
+                    )
+    
+    return candidates
+
+
+def select_fields(candidates: Dict[str, List[FieldMatch]]) -> Dict[str, Optional[FieldMatch]]:
+    """
+    Escolhe um candidato por campo:
+    - valor: o maior
+    - data e beneficiário: o primeiro
+    - EndToEnd: o primeiro que começa com 'E', senão o primeiro
+    """
+    amounts = candidates['value']
+    endtoends = candidates['endtoend']
+    pix_endtoends = [c for c in endtoends if c.value.startswith('E')]
     
-    return max(values) if values else None
+    date = None
+    for candidate in candidates['date']:
+        iso_date = date_to_iso(candidate.value)
+        if iso_date is not None:
+            date = FieldMatch(iso_date, candidate.start, candidate.end)
+            break
+    
+    return {
+        'value': max(amounts, key=lambda c: c.value) if amounts else None,
+        'date': date,
+        'beneficiary': candidates['beneficiary'][0] if candidates['beneficiary'] else None,
+        'endtoend': (pix_endtoends or endtoends or [None])[0],
+    }
+
+
+def find_fields(text: str) -> Dict[str, Optional[FieldMatch]]:
+    """Todos os campos do comprovante numa única passada"""
+    return select_fields(scan_fields(text))
+
+
+def find_amount(text: str) -> Optional[FieldMatch]:
+    """Maior valor monetário do texto, com a posição do número"""
+    return find_fields(text)['value']
+
+
+def find_date(text: str) -> Optional[FieldMatch]:
+    """Primeira data válida do texto (ISO), com a posição"""
+    return find_fields(text)['date']
+
+
+def find_beneficiary(text: str) -> Optional[FieldMatch]:
+    """Nome do beneficiário, com a posição do trecho capturado"""
+    return find_fields(text)['beneficiary']
+
+
+def find_endtoend(text: str) -> Optional[FieldMatch]:
+    """EndToEnd do texto (prioriza os que começam com 'E'), com a posição"""
+    return find_fields(text)['endtoend']
+
+
+def parse_amount(text: str) -> Optional[float]:
+    """
+    Extrai valor monetário do texto do comprovante
+    Retorna: float (valor em reais) ou None
+    """
+    found = find_amount(text)
+    return found.value if found else None
 
 
 def parse_date(text: str) -> Optional[str]:
@@ -137,29 +381,8 @@ def parse_date(text: str) -> Optional[str]:
     Extrai data do texto do comprovante
     Retorna: string no formato ISO (YYYY-MM-DD) ou None
     """
-    if not text:
-        return None
-    
-    matches = DATE_RE.findall(text)
-    if not matches:
-        return None
-    
-    for match_groups in matches:
-        date_str = next((g for g in match_groups if g), None)
-        if not date_str:
-            continue
-        
-        try:
-            # Tentar diferentes formatos
-            from dateutil import parser as dateparser
-            parsed_date = dateparser.parse(date_str, dayfirst=True)
-            if parsed_date:
-                return parsed_date.date().isoformat()
-        except Exception as e:
-            logger.warning(f"Erro ao parsear data '{date_str}': {e}")
-            continue
-    
-    return None
+    found = find_date(text)
+    return found.value if found else None
 
 
 def parse_beneficiary(text: str) -> Optional[str]:
@@ -167,32 +390,8 @@ def parse_beneficiary(text: str) -> Optional[str]:
     Extrai nome do beneficiário do texto
     Retorna: string com nome ou None
     """
-    if not text:
-        return None
-    
-    def clean_name(name: str) -> Optional[str]:
-        if not name:
-            return None
-        # Remover quebras de linha e múltiplos espaços
-        cleaned = re.sub(r'\s+', ' ', name).strip()
-        
-        # Remover rótulos no final
-        labels_to_remove = ['CNPJ', 'CPF', 'Valor', 'R$', 'Data', 'Conta', 'Agência']
-        for label in labels_to_remove:
-            pattern = r'\s+' + re.escape(label) + r'\s*$'
-            cleaned = re.sub(pattern, '', cleaned, flags=re.IGNORECASE)
-        
-        return cleaned if cleaned else None
-    
-    # Tentar padrões específicos
-    match = BENEFICIARY_RE.search(text)
-    if match:
-        for group in match.groups():
-            cleaned = clean_name(group)
-            if cleaned and len(cleaned) > 3:
-                return cleaned
-    
-    return None
+    found = find_beneficiary(text)
+    return found.value if found else None
 
 
 def parse_endtoend(text: str) -> Optional[str]:
@@ -200,25 +399,195 @@ def parse_endtoend(text: str) -> Optional[str]:
     Extrai EndToEnd (ID da transação PIX) do texto
     Retorna: string com EndToEnd ou None
     """
-    if not text:
-        return None
+    found = find_endtoend(text)
+    return found.value if found else None
+
+
+class OCRWord(NamedTuple):
+    """Palavra reconhecida, confiança (0-1) e posição no texto do OCRResult"""
+    text: str
+    confidence: float
+    start: int
+    end: int
+
+
+class OCRResult(NamedTuple):
+    """
+    Texto reconhecido, confiança média das palavras (0-1) e as palavras com posição
+    Texto nativo de PDF entra como um único bloco com a confiança da página
+    """
+    text: str
+    confidence: float
+    words: List[OCRWord]
+
+
+EMPTY_OCR_RESULT = OCRResult("", 0.0, [])
+
+
+def _build_ocr_result(lines: List[List[Tuple[str, float]]]) -> OCRResult:
+    """
+    Monta o texto (palavras por linha), as palavras com posição e a
+    confiança média a partir das palavras do Tesseract (conf 0-100, -1 = sem texto)
+    """
+    parts: List[str] = []
+    words: List[OCRWord] = []
+    offset = 0
+    for line in lines:
+        if not line:
+            continue
+        if parts:
+            parts.append("\n")
+            offset += 1
+        for i, (word, conf) in enumerate(line):
+            if i:
+                parts.append(" ")
+                offset += 1
+            parts.append(word)
+            if conf >= 0:
+                words.append(OCRWord(word, conf / 100.0, offset, offset + len(word)))
+            offset += len(word)
     
-    matches = ENDTOEND_RE.findall(text)
-    if not matches:
+    confidence = sum(w.confidence for w in words) / len(words) if words else 0.0
+    return OCRResult("".join(parts), confidence, words)
+
+
+def field_confidence(result: OCRResult, field: Optional[FieldMatch]) -> Optional[float]:
+    """
+    Confiança de um campo = menor confiança entre as palavras que cobrem o trecho
+    Sem palavras no trecho, usa a confiança média do texto
+    """
+    if field is None:
         return None
+    overlapping = [w.confidence for w in result.words if w.start < field.end and w.end > field.start]
+    return min(overlapping) if overlapping else result.confidence
+
+
+class OCREngine(ABC):
+    """Interface dos backends de OCR"""
     
-    candidates = []
-    for match_groups in matches:
-        for group in match_groups:
-            if group and len(group.strip()) >= 15:
-                candidates.append(group.strip())
+    name = "base"
     
-    if not candidates:
-        return None
+    def __init__(self, lang: str = OCR_LANG):
+        self.lang = lang
+    
+    @abstractmethod
+    def image_to_string(self, image: Image.Image) -> str:
+        """Só o texto reconhecido"""
+    
+    @abstractmethod
+    def recognize(self, image: Image.Image) -> OCRResult:
+        """Texto + confiança por palavra numa única passada de OCR"""
+
+
+class PytesseractEngine(OCREngine):
+    """Fallback: executa o binário tesseract a cada chamada"""
+    
+    name = "pytesseract"
+    
+    def image_to_string(self, image: Image.Image) -> str:
+        import pytesseract
+        return pytesseract.image_to_string(image, lang=self.lang)
+    
+    def recognize(self, image: Image.Image) -> OCRResult:
+        import pytesseract
+        data = pytesseract.image_to_data(image, lang=self.lang, output_type=pytesseract.Output.DICT)
+        lines: Dict[Tuple[int, int, int], List[Tuple[str, float]]] = {}
+        for i, word in enumerate(data['text']):
+            word = (word or '').strip()
+            if not word:
+                continue
+            key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+            lines.setdefault(key, []).append((word, float(data['conf'][i])))
+        return _build_ocr_result(list(lines.values()))
+
+
+class TesserocrEngine(OCREngine):
+    """
+    Engine persistente via tesserocr
+    Cada PyTessBaseAPI carrega o traineddata uma vez e é reutilizada;
+    como a API não é thread-safe, as instâncias ficam num pool (uma por thread em uso)
+    """
+    
+    name = "tesserocr"
+    
+    def __init__(self, lang: str = OCR_LANG):
+        super().__init__(lang)
+        self._apis: "queue.LifoQueue" = queue.LifoQueue()
+        # Falhar cedo se o modelo não carregar
+        self._release(self._acquire())
     
-    # Priorizar EndToEnd que começam com 'E'
-    pix_candidates = [c for c in candidates if c.upper().startswith('E')]
-    return pix_candidates[0].upper() if pix_candidates else candidates[0].upper()
+    def _acquire(self):
+        try:
+            return self._apis.get_nowait()
+        except queue.Empty:
+            import tesserocr
+            return tesserocr.PyTessBaseAPI(lang=self.lang)
+    
+    def _release(self, api):
+        self._apis.put(api)
+    
+    def image_to_string(self, image: Image.Image) -> str:
+        api = self._acquire()
+        try:
+            api.SetImage(image)
+            return api.GetUTF8Text()
+        finally:
+            api.Clear()
+            self._release(api)
+    
+    def recognize(self, image: Image.Image) -> OCRResult:
+        import tesserocr
+        api = self._acquire()
+        try:
+            api.SetImage(image)
+            api.Recognize()
+            lines: List[List[Tuple[str, float]]] = []
+            current: List[Tuple[str, float]] = []
+            iterator = api.GetIterator()
+            if iterator is not None:
+                level = tesserocr.RIL.WORD
+                for word_iter in tesserocr.iterate_level(iterator, level):
+                    word = (word_iter.GetUTF8Text(level) or '').strip()
+                    if word:
+                        current.append((word, word_iter.Confidence(level)))
+                    if word_iter.IsAtFinalElement(tesserocr.RIL.TEXTLINE, level):
+                        lines.append(current)
+                        current = []
+            lines.append(current)
+            return _build_ocr_result(lines)
+        finally:
+            api.Clear()
+            self._release(api)
+
+
+_ocr_engine: Optional[OCREngine] = None
+_ocr_engine_pid: Optional[int] = None
+
+def get_ocr_engine() -> OCREngine:
+    """
+    Get or create the OCR engine for this process
+    Recriado após fork para não compartilhar handles do Tesseract entre workers
+    """
+    global _ocr_engine, _ocr_engine_pid
+    if _ocr_engine is None or _ocr_engine_pid != os.getpid():
+        _ocr_engine = None
+        if OCR_BACKEND in ("auto", "tesserocr") and TESSEROCR_AVAILABLE:
+            try:
+                _ocr_engine = TesserocrEngine()
+            except Exception as e:
+                logger.warning(f"⚠️ tesserocr indisponível ({e}), usando pytesseract")
+        elif OCR_BACKEND == "tesserocr":
+            logger.warning("⚠️ OCR_BACKEND=tesserocr mas tesserocr não está instalado, usando pytesseract")
+        if _ocr_engine is None:
+            _ocr_engine = PytesseractEngine()
+        _ocr_engine_pid = os.getpid()
+    return _ocr_engine
+
+
+def open_image(source: Union[str, io.BytesIO]) -> Image.Image:
+    """Abre a imagem com PIL (importado só no primeiro uso)"""
+    from PIL import Image
+    return Image.open(source)
 
 
 def preprocess_image(image: Image.Image) -> Image.Image:
@@ -230,6 +599,10 @@ def preprocess_image(image: Image.Image) -> Image.Image:
         return image
     
     try:
+        import cv2
+        import numpy as np
+        from PIL import Image
+        
         # Converter PIL para OpenCV
         img_array = np.array(image)
         
@@ -264,96 +637,274 @@ def preprocess_image(image: Image.Image) -> Image.Image:
         return image
 
 
-def extract_text_from_image(image_path: str) -> Tuple[str, float]:
+def light_preprocess_image(image: Image.Image) -> Image.Image:
+    """
+    Pré-processamento barato (camada 1): só escala de cinza
+    Suficiente para prints digitais limpos
+    """
+    if image.mode != 'L':
+        return image.convert('L')
+    return image
+
+
+def _amount_confidence(result: OCRResult) -> Tuple[bool, float]:
+    """Achou valor? e a confiança das palavras do valor (ou 0)"""
+    amount = find_amount(result.text)
+    if amount is None:
+        return False, 0.0
+    return True, field_confidence(result, amount)
+
+
+def _ocr_score(result: OCRResult) -> Tuple[bool, float, float]:
+    """Ordena resultados de OCR: achou valor, confiança do valor, confiança média"""
+    has_amount, amount_confidence = _amount_confidence(result)
+    return has_amount, amount_confidence, result.confidence
+
+
+def ocr_image(image: Image.Image, tiers: Optional[List[str]] = None) -> OCRResult:
+    """
+    OCR em camadas: tenta primeiro a imagem levemente processada e
+    só escala para preprocess_image (upscale/denoise/threshold) se
+    não houver valor legível ou a confiança das palavras do valor for baixa
+    A camada usada é anexada em tiers (se informado)
+    """
+    engine = get_ocr_engine()
+    light = engine.recognize(light_preprocess_image(image))
+    has_amount, amount_confidence = _amount_confidence(light)
+    
+    # Valor lido com confiança alta: parar aqui
+    if (has_amount and amount_confidence >= OCR_MIN_CONFIDENCE) or not OPENCV_AVAILABLE:
+        if tiers is not None:
+            tiers.append(OCR_TIER_LIGHT)
+        return light
+    
+    full = engine.recognize(preprocess_image(image))
+    if tiers is not None:
+        tiers.append(OCR_TIER_FULL)
+    return full if _ocr_score(full) >= _ocr_score(light) else light
+
+
+def recognize_image(image: Image.Image, tiers: Optional[List[str]] = None) -> OCRResult:
+    """OCR de objeto PIL Image com palavras e confianças (resultado vazio em caso de erro)"""
+    try:
+        return ocr_image(image, tiers)
+    except Exception as e:
+        logger.error(f"Erro ao extrair texto de imagem: {e}")
+        return EMPTY_OCR_RESULT
+
+
+def extract_text_from_image(image_path: str, tiers: Optional[List[str]] = None) -> Tuple[str, float]:
     """
     Extrai texto de imagem (JPG/PNG) usando Tesseract OCR
-    Retorna: (texto extraído, confiança 0-1)
+    Retorna: (texto extraído, confiança média das palavras 0-1)
     """
     try:
-        image = Image.open(image_path)
-        
-        # Pré-processar
-        processed = preprocess_image(image)
-        
-        # OCR
-        text = pytesseract.image_to_string(processed, lang='por')
-        
-        # Confidence estimation (simplificado)
-        # Texto maior geralmente = mais confiança
-        confidence = min(1.0, len(text) / 1000.0)
-        
-        return text, confidence
-    
+        image = open_image(image_path)
     except Exception as e:
         logger.error(f"Erro ao extrair texto de imagem {image_path}: {e}")
         return "", 0.0
+    
+    result = recognize_image(image, tiers)
+    return result.text, result.confidence
 
 
-def extract_text_from_pdf(pdf_path: str) -> Tuple[str, float]:
+def iter_pdf_pages(pdf_source: PdfSource, page_numbers: List[int]) -> Iterator[Tuple[int, Image.Image]]:
+    """
+    Renderiza as páginas indicadas (1-based) uma por vez, sob demanda: só a
+    página corrente fica em memória enquanto quem consome não pede a próxima
+    Aceita caminho do arquivo ou o conteúdo do PDF em memória
+    Usa pypdfium2 em processo; sem ele, uma chamada ao poppler por página
+    Gera: (número da página, imagem)
+    """
+    if not page_numbers:
+        return
+    
+    if isinstance(pdf_source, memoryview):
+        pdf_source = pdf_source.tobytes()
+    
+    if PDFIUM_AVAILABLE:
+        import pypdfium2 as pdfium
+        doc = pdfium.PdfDocument(pdf_source)
+        try:
+            scale = PDF_RENDER_DPI / 72
+            for n in page_numbers:
+                yield n, doc[n - 1].render(scale=scale).to_pil().convert("RGB")
+        finally:
+            doc.close()
+        return
+    
+    from pdf2image import convert_from_path, convert_from_bytes
+    convert = convert_from_bytes if isinstance(pdf_source, bytes) else convert_from_path
+    for n in page_numbers:
+        images = convert(pdf_source, first_page=n, last_page=n, dpi=PDF_RENDER_DPI)
+        if images:
+            yield n, images[0]
+
+
+def recognize_pdf_pages(pdf_source: PdfSource, page_numbers: List[int],
+                        tiers: Optional[List[str]] = None) -> Dict[int, OCRResult]:
+    """
+    OCR das páginas indicadas, renderizando cada uma só quando há thread livre:
+    no máximo OCR_PAGE_WORKERS imagens em memória, liberadas ao fim do OCR
+    Retorna: {número da página: resultado}
+    """
+    results: Dict[int, OCRResult] = {}
+    workers = min(OCR_PAGE_WORKERS, len(page_numbers))
+    if workers <= 1:
+        for n, image in iter_pdf_pages(pdf_source, page_numbers):
+            results[n] = recognize_image(image, tiers)
+            del image
+        return results
+    
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending: Dict[Future, int] = {}
+        for n, image in iter_pdf_pages(pdf_source, page_numbers):
+            if len(pending) >= workers:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[pending.pop(future)] = future.result()
+            pending[executor.submit(recognize_image, image, tiers)] = n
+            del image
+        for future, n in pending.items():
+            results[n] = future.result()
+    return results
+
+
+def recognize_pdf(pdf_source: PdfSource, tiers: Optional[List[str]] = None) -> OCRResult:
     """
     Extrai texto de PDF usando pdfplumber ou OCR das páginas
-    Retorna: (texto extraído, confiança 0-1)
+    Aceita caminho do arquivo ou o conteúdo do PDF em memória
+    Páginas sem texto nativo são renderizadas e passam pelo OCR uma a uma
+    (até OCR_PAGE_WORKERS em paralelo)
+    Texto nativo entra como um bloco com confiança 0.95; páginas OCR trazem as palavras
     """
     if not PDF_SUPPORT:
         logger.error("PDF support não disponível. Instale: pip install pdfplumber pdf2image")
-        return "", 0.0
+        return EMPTY_OCR_RESULT
+    
+    source_label = pdf_source if isinstance(pdf_source, str) else f"<{len(pdf_source)} bytes>"
+    if isinstance(pdf_source, memoryview):
+        pdf_source = pdf_source.tobytes()
     
     try:
-        all_text = ""
-        confidence = 0.0
-        page_count = 0
+        import pdfplumber
+        
+        # Resultado por página (None = precisa de OCR)
+        pages: List[Optional[OCRResult]] = []
         
-        with pdfplumber.open(pdf_path) as pdf:
+        opened = io.BytesIO(pdf_source) if isinstance(pdf_source, bytes) else pdf_source
+        with pdfplumber.open(opened) as pdf:
             for page in pdf.pages:
                 # Tentar extrair texto nativo primeiro
                 page_text = page.extract_text() or ""
                 
                 if page_text.strip():
-                    all_text += page_text + "\n"
                     # Texto nativo = alta confiança
-                    confidence += 0.95
+                    pages.append(OCRResult(page_text, 0.95, [OCRWord(page_text, 0.95, 0, len(page_text))]))
                 else:
-                    # Fallback para OCR
-                    try:
-                        # Converter página para imagem
-                        images = convert_from_path(pdf_path, first_page=page.page_number, last_page=page.page_number, dpi=300)
-                        if images:
-                            img_text, img_conf = extract_text_from_image_object(images[0])
-                            all_text += img_text + "\n"
-                            confidence += img_conf
-                    except Exception as e:
-                        logger.warning(f"Erro ao fazer OCR na página {page.page_number}: {e}")
-                
-                page_count += 1
+                    pages.append(None)
+        
+        # Fallback para OCR nas páginas sem texto
+        ocr_pages = [i + 1 for i, page in enumerate(pages) if page is None]
+        if ocr_pages:
+            try:
+                for page_number, result in recognize_pdf_pages(pdf_source, ocr_pages, tiers).items():
+                    pages[page_number - 1] = result
+            except Exception as e:
+                logger.warning(f"Erro ao fazer OCR nas páginas {ocr_pages}: {e}")
         
-        if page_count > 0:
-            confidence = min(1.0, confidence / page_count)
+        # Juntar páginas, deslocando a posição das palavras
+        parts: List[str] = []
+        words: List[OCRWord] = []
+        offset = 0
+        for page in pages:
+            if page is None:
+                continue
+            words.extend(OCRWord(w.text, w.confidence, w.start + offset, w.end + offset) for w in page.words)
+            parts.append(page.text + "\n")
+            offset += len(page.text) + 1
         
-        return all_text, confidence
+        page_count = len(pages)
+        confidence = min(1.0, sum(page.confidence for page in pages if page) / page_count) if page_count else 0.0
+        
+        return OCRResult("".join(parts), confidence, words)
     
     except Exception as e:
-        logger.error(f"Erro ao extrair texto de PDF {pdf_path}: {e}")
-        return "", 0.0
+        logger.error(f"Erro ao extrair texto de PDF {source_label}: {e}")
+        return EMPTY_OCR_RESULT
 
 
-def extract_text_from_image_object(image: Image.Image) -> Tuple[str, float]:
+def extract_text_from_pdf(pdf_source: PdfSource, tiers: Optional[List[str]] = None) -> Tuple[str, float]:
     """
-    Extrai texto de objeto PIL Image usando OCR
+    Extrai texto de PDF usando pdfplumber ou OCR das páginas
     Retorna: (texto extraído, confiança 0-1)
     """
-    try:
-        # Pré-processar
-        processed = preprocess_image(image)
-        
-        # OCR
-        text = pytesseract.image_to_string(processed, lang='por')
-        confidence = min(1.0, len(text) / 1000.0)
-        
-        return text, confidence
+    result = recognize_pdf(pdf_source, tiers)
+    return result.text, result.confidence
+
+
+def extract_text_from_image_object(image: Image.Image, tiers: Optional[List[str]] = None) -> Tuple[str, float]:
+    """
+    Extrai texto de objeto PIL Image usando OCR
+    Retorna: (texto extraído, confiança média das palavras 0-1)
+    """
+    result = recognize_image(image, tiers)
+    return result.text, result.confidence
+
+
+def _empty_proof_data(error: str) -> Dict:
+    """Resultado de extração sem dados"""
+    return {
+        'value': None,
+        'date': None,
+        'beneficiary': None,
+        'endtoend': None,
+        'raw_text': '',
+        'confidence': 0.0,
+        'success': False,
+        'error': error
+    }
+
+
+def build_proof_data(ocr: OCRResult, tiers: Optional[List[str]] = None) -> Dict:
+    """
+    Extrai os campos do texto do comprovante e monta o resultado
+    confidence = confiança das palavras do valor (ou média do texto se não houver valor)
+    field_confidences traz a confiança de cada campo encontrado
+    ocr_tiers registra a camada de pré-processamento usada em cada imagem OCR
+    """
+    raw_text = ocr.text
+    if not raw_text.strip():
+        return {**_empty_proof_data('Não foi possível extrair texto do arquivo'), 'ocr_tiers': tiers or []}
     
-    except Exception as e:
-        logger.error(f"Erro ao extrair texto de imagem: {e}")
-        return "", 0.0
+    # Extrair dados específicos (uma passada pelo texto)
+    fields = find_fields(raw_text)
+    amount = fields['value']
+    date = fields['date']
+    beneficiary = fields['beneficiary']
+    endtoend = fields['endtoend']
+    
+    field_confidences = {
+        name: round(field_confidence(ocr, found), 2)
+        for name, found in fields.items()
+        if found is not None
+    }
+    
+    # Determinar sucesso (deve ter pelo menos valor)
+    success = amount is not None
+    
+    return {
+        'value': amount.value if amount else None,
+        'date': date.value if date else None,
+        'beneficiary': beneficiary.value if beneficiary else None,
+        'endtoend': endtoend.value if endtoend else None,
+        'raw_text': raw_text[:500] if raw_text else '',  # Primeiros 500 chars
+        'confidence': field_confidences['value'] if success else round(ocr.confidence, 2),
+        'field_confidences': field_confidences,
+        'success': success,
+        'error': None if success else 'Não foi possível extrair valor do comprovante',
+        'ocr_tiers': tiers or []
+    }
 
 
 def extract_proof_data(file_path: str) -> Dict:
@@ -367,7 +918,8 @@ def extract_proof_data(file_path: str) -> Dict:
         'beneficiary': str,
         'endtoend': str,
         'raw_text': str,
-        'confidence': float (0-1),
+        'confidence': float (0-1, confiança do valor),
+        'field_confidences': dict (campo -> confiança 0-1),
         'success': bool
     }
     """
@@ -376,63 +928,46 @@ def extract_proof_data(file_path: str) -> Dict:
         file_ext = Path(file_path).suffix.lower()
         
         # Extrair texto baseado no tipo de arquivo
+        tiers: List[str] = []
         if file_ext == '.pdf':
-            raw_text, confidence = extract_text_from_pdf(file_path)
+            ocr = recognize_pdf(file_path, tiers)
         elif file_ext in ['.jpg', '.jpeg', '.png']:
-            raw_text, confidence = extract_text_from_image(file_path)
+            ocr = recognize_image(open_image(file_path), tiers)
         else:
-            return {
-                'value': None,
-                'date': None,
-                'beneficiary': None,
-                'endtoend': None,
-                'raw_text': '',
-                'confidence': 0.0,
-                'success': False,
-                'error': f'Tipo de arquivo não suportado: {file_ext}'
-            }
-        
-        if not raw_text.strip():
-            return {
-                'value': None,
-                'date': None,
-                'beneficiary': None,
-                'endtoend': None,
-                'raw_text': '',
-                'confidence': 0.0,
-                'success': False,
-                'error': 'Não foi possível extrair texto do arquivo'
-            }
+            return _empty_proof_data(f'Tipo de arquivo não suportado: {file_ext}')
         
-        # Extrair dados específicos
-        value = parse_amount(raw_text)
-        date = parse_date(raw_text)
-        beneficiary = parse_beneficiary(raw_text)
-        endtoend = parse_endtoend(raw_text)
+        return build_proof_data(ocr, tiers)
+    
+    except Exception as e:
+        logger.error(f"Erro ao extrair dados do comprovante {file_path}: {e}")
+        return _empty_proof_data(str(e))
+
+
+def extract_proof_data_from_bytes(data: Union[bytes, memoryview], content_type: Optional[str],
+                                  filename: Optional[str] = None) -> Dict:
+    """
+    Extrai todos os dados de um comprovante a partir do conteúdo em memória
+    Sem arquivo temporário: PDFs e imagens são decodificados direto do buffer
+    O tipo vem do content_type; se genérico, usa a extensão de filename
+    
+    Retorna o mesmo dicionário de extract_proof_data
+    """
+    try:
+        content_type = (content_type or '').split(';')[0].strip().lower()
+        if content_type not in PDF_CONTENT_TYPES and content_type not in IMAGE_CONTENT_TYPES and filename:
+            content_type = CONTENT_TYPE_BY_EXTENSION.get(Path(filename).suffix.lower(), content_type)
         
-        # Determinar sucesso (deve ter pelo menos valor)
-        success = value is not None
+        # Extrair texto baseado no tipo de arquivo
+        tiers: List[str] = []
+        if content_type in PDF_CONTENT_TYPES:
+            ocr = recognize_pdf(data, tiers)
+        elif content_type in IMAGE_CONTENT_TYPES:
+            ocr = recognize_image(open_image(io.BytesIO(data)), tiers)
+        else:
+            return _empty_proof_data(f'Tipo de arquivo não suportado: {content_type or filename}')
         
-        return {
-            'value': value,
-            'date': date,
-            'beneficiary': beneficiary,
-            'endtoend': endtoend,
-            'raw_text': raw_text[:500] if raw_text else '',  # Primeiros 500 chars
-            'confidence': confidence,
-            'success': success,
-            'error': None if success else 'Não foi possível extrair valor do comprovante'
-        }
+        return build_proof_data(ocr, tiers)
     
     except Exception as e:
-        logger.error(f"Erro ao extrair dados do comprovante {file_path}: {e}")
-        return {
-            'value': None,
-            'date': None,
-            'beneficiary': None,
-            'endtoend': None,
-            'raw_text': '',
-            'confidence': 0.0,
-            'success': False,
-            'error': str(e)
-        }
+        logger.error(f"Erro ao extrair dados do comprovante {filename or content_type}: {e}")
+        return _empty_proof_data(str(e))
@@ -3,17 +3,20 @@ FLUXO CASH - Backend com FastAPI
 Sistema de gestão de clientes e comprovantes com extração automática de valores
 """
 
+import asyncio
 import logging
 import hashlib
-from datetime import datetime
-from fastapi import FastAPI, Body, UploadFile, File
+from datetime import datetime, timezone
+from fastapi import FastAPI, Body, UploadFile, File, BackgroundTasks, Response
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Dict, Any
-import tempfile
-from pathlib import Path
+from typing import Dict, Any, Optional
 
-# Importar o módulo de extração
-from .extractors import extract_proof_data
+# Importar o pipeline de extração
+from .extraction_jobs import extract_to_update, shutdown_extraction_executor, get_ocr_tier_stats
+from .extraction_cache import get_extraction_cache
+from .models import ProofStatus
+from .pagination import clamp_limit, decode_cursor, created_at_range, paginate_newest_first, NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER
+from .periods import period_range
 
 # Importar funções do banco de dados
 from .db_helpers import (
@@ -47,8 +50,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER],
 )
 
+@app.on_event("shutdown")
+def shutdown_extraction_pool():
+    shutdown_extraction_executor()
+
 # ========================================
 # CONFIGURAÇÃO DO BANCO DE DADOS
 # ========================================
@@ -56,18 +64,29 @@ app.add_middleware(
 # Inicializar conexão com Supabase
 from .database import init_database
 
-# Tentar conectar ao Supabase
-if init_database():
-    logger.info("✅ Conectado ao Supabase PostgreSQL")
-    USE_SUPABASE = True
-else:
-    logger.warning("⚠️ Supabase não disponível, usando memória")
-    USE_SUPABASE = False
-    # Fallback para dicionários em memória
-    proofs_db = {}
-    clients_db = {}
-    transactions_db = []
-    transaction_counter = 0
+# Dicionários em memória (usados enquanto/quando o Supabase não está disponível)
+USE_SUPABASE = False
+proofs_db = {}
+clients_db = {}
+transactions_db = []  # ordem de inserção = (created_at, id) crescente (base da paginação)
+transaction_counter = 0
+
+
+def connect_database():
+    """Testa a conexão com o Supabase (chamada de rede bloqueante)"""
+    global USE_SUPABASE
+    if init_database():
+        logger.info("✅ Conectado ao Supabase PostgreSQL")
+        USE_SUPABASE = True
+    else:
+        logger.warning("⚠️ Supabase não disponível, usando memória")
+        USE_SUPABASE = False
+
+
+@app.on_event("startup")
+async def check_database_connection():
+    # Fora do import e sem segurar o startup: o teste roda numa thread em segundo plano
+    asyncio.get_running_loop().run_in_executor(None, connect_database)
 
 # ========================================
 # HEALTH CHECK
@@ -80,6 +99,13 @@ def health():
         "service": "FLUXO CASH"
     }
 
+@app.get("/metrics")
+def metrics():
+    return {
+        "extraction_cache": get_extraction_cache().stats(),
+        "ocr_tiers": get_ocr_tier_stats()
+    }
+
 # ========================================
 # PROOFS (COMPROVANTES)
 # ========================================
@@ -108,12 +134,12 @@ def get_proof(proof_id: int):
     return {"proof": proofs_db[proof_id]}
 
 @app.post("/proofs/clients/{client_id}/upload")
-async def upload_proof(client_id: int, file: UploadFile = File(...)):
+async def upload_proof(client_id: int, background_tasks: BackgroundTasks, file: UploadFile = File(...)):
     """
     Endpoint para upload de comprovantes
     - Detecta duplicatas
-    - Extrai valores usando OCR (PDFs/Imagens)
-    - Armazena arquivo
+    - Armazena o comprovante como EXTRACTING e retorna imediatamente
+    - Extrai valores usando OCR (PDFs/Imagens) em segundo plano
     """
     try:
         if client_id not in clients_db:
@@ -141,66 +167,53 @@ async def upload_proof(client_id: int, file: UploadFile = File(...)):
                 "message": "Arquivo duplicado detectado"
             }
         
-        # 💾 Salvar arquivo temporariamente
-        with tempfile.NamedTemporaryFile(suffix=Path(file.filename).suffix, delete=False) as tmp:
-            tmp.write(contents)
-            tmp_path = tmp.name
+        # 📝 Cria novo comprovante aguardando extração
+        new_proof = {
+            "id": new_id,
+            "client_id": client_id,
+            "filename": file.filename,
+            "file_type": file.content_type or "application/octet-stream",
+            "file_size": file_size,
+            "extracted_value": None,
+            "extraction_confidence": 0.0,
+            "extraction_status": ProofStatus.EXTRACTING.value,
+            "beneficiary": None,
+            "endtoend": None,
+            "is_duplicate": False,
+            "deposited": False,  # 🌟 NOVO: Flag para controlar se já foi creditado
+            "file_hash": file_hash,
+            "uploaded_at": datetime.now(timezone.utc).isoformat()
+        }
         
-        try:
-            # 💰 Extrai dados do comprovante usando OCR/PDF reader
-            extracted_data = extract_proof_data(tmp_path)
-            
-            value = extracted_data.get('value')
-            confidence = extracted_data.get('confidence', 0)
-            beneficiary = extracted_data.get('beneficiary')
-            endtoend = extracted_data.get('endtoend')
-            
-            if value is None:
-                value = 5000.0  # Fallback
-                confidence = 0.5
-            
-            extraction_status = "EXTRACTED" if extracted_data.get('success') else "EXTRACTED_WITH_ERROR"
-            
-            # 📝 Cria novo comprovante
-            new_proof = {
-                "id": new_id,
-                "client_id": client_id,
-                "filename": file.filename,
-                "file_type": file.content_type or "application/octet-stream",
-                "file_size": file_size,
-                "extracted_value": value,
-                "extraction_confidence": confidence,
-                "extraction_status": extraction_status,
-                "beneficiary": beneficiary or "DESCONHECIDO",
-                "endtoend": endtoend or None,
-                "is_duplicate": False,
-                "deposited": False,  # 🌟 NOVO: Flag para controlar se já foi creditado
-                "file_hash": file_hash,
-                "uploaded_at": datetime.now().isoformat()
-            }
-            
-            proofs_db[new_id] = new_proof
-            
-            logger.info(f"✅ Comprovante enviado: {file.filename} | Valor: R$ {value:.2f} | Confiança: {confidence:.0%}")
-            
-            return {
-                "success": True,
-                "proof": new_proof,
-                "is_duplicate": False,
-                "message": f"Comprovante enviado com sucesso | Valor extraído: R$ {value:.2f}"
-            }
+        proofs_db[new_id] = new_proof
         
-        finally:
-            # Limpar arquivo temporário
-            try:
-                Path(tmp_path).unlink()
-            except:
-                pass
+        # 💰 Extração OCR/PDF roda em segundo plano, depois da resposta
+        background_tasks.add_task(process_proof_extraction, new_id, contents, file.content_type, file.filename, file_hash)
+        
+        logger.info(f"✅ Comprovante enviado: {file.filename} (ID: {new_id}) | Extração agendada")
+        
+        return {
+            "success": True,
+            "proof": new_proof,
+            "is_duplicate": False,
+            "message": "Comprovante enviado com sucesso | Extração em andamento"
+        }
     
     except Exception as e:
         logger.error(f"Erro ao fazer upload: {str(e)}")
         return {"error": str(e)}, 500
 
+async def process_proof_extraction(proof_id: int, contents: bytes, content_type: str, filename: str, file_hash: str):
+    """Extrai os dados do comprovante no pool (ou do cache) e atualiza o registro"""
+    update_data = await extract_to_update(contents, content_type, filename, file_hash)
+    
+    # Comprovante pode ter sido deletado durante a extração
+    if proof_id not in proofs_db:
+        return
+    
+    proofs_db[proof_id].update(update_data)
+    logger.info(f"✅ Extração concluída: comprovante #{proof_id} | Status: {update_data['extraction_status']} | Valor: {update_data['extracted_value']}")
+
 @app.delete("/proofs/{proof_id}")
 def delete_proof(proof_id: int):
     try:
@@ -256,7 +269,7 @@ def create_deposit_from_proof(proof_id: int):
         "type": "DEPOSIT",
         "status": "COMPLETED",
         "description": f"Depósito de {proof['filename']}",
-        "created_at": datetime.now().isoformat()
+        "created_at": datetime.now(timezone.utc).isoformat()
     }
     
     transactions_db.append(transaction)
@@ -543,13 +556,22 @@ def get_global_balance():
         return {"error": str(e)}, 500
 
 @app.get("/global-withdrawals")
-def get_global_withdrawals():
+def get_global_withdrawals(response: Response, limit: Optional[int] = None, cursor: Optional[str] = None):
     try:
-        # Retornar apenas transações de saque reais, normalizadas
-        withdrawals = [w for w in transactions_db if w.get('type') == 'WITHDRAWAL']
+        if cursor:
+            try:
+                decode_cursor(cursor)
+            except ValueError as e:
+                return {"error": str(e)}, 400
+        limit = clamp_limit(limit)
+        
+        # Saques reais, mais recentes primeiro (transactions_db já está em ordem: sem sort)
+        is_withdrawal = lambda t: t.get('type') == 'WITHDRAWAL'
+        withdrawals, next_cursor = paginate_newest_first(transactions_db, is_withdrawal, limit, cursor)
         
-        # Ordenar por data (mais recente primeiro)
-        withdrawals.sort(key=lambda x: x.get('created_at', ''), reverse=True)
+        response.headers[TOTAL_COUNT_HEADER] = str(sum(1 for t in transactions_db if is_withdrawal(t)))
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
         
         result = []
         for t in withdrawals:
@@ -596,7 +618,7 @@ def create_withdrawal(client_id: int, data: Dict[str, Any] = Body(...)):
             "admin_notes": data.get("admin_notes", ""),
             "status": "PENDING",
             "type": "WITHDRAWAL",
-            "created_at": datetime.now().isoformat()
+            "created_at": datetime.now(timezone.utc).isoformat()
         }
         
         transactions_db.append(withdrawal)
@@ -722,16 +744,26 @@ def delete_withdrawal(client_id: int, withdrawal_id: int):
 # ========================================
 
 @app.get("/clients/{client_id}/history")
-def get_client_history(client_id: int, period: str = "all"):
+def get_client_history(client_id: int, period: str = "all", date_from: Optional[str] = None,
+                       date_to: Optional[str] = None, limit: Optional[int] = None, cursor: Optional[str] = None):
     try:
         if client_id not in clients_db:
             return {"error": "Cliente não encontrado"}, 404
         
-        # Filtrar transações completadas do cliente
-        client_transactions = [
-            t for t in transactions_db 
-            if t.get('client_id') == client_id and t.get('status') == 'COMPLETED'
-        ]
+        try:
+            if cursor:
+                decode_cursor(cursor)
+            start, end = created_at_range(transactions_db, *period_range(period, date_from, date_to))
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        limit = clamp_limit(limit)
+        
+        # Filtrar transações completadas do cliente, só na faixa do período (busca binária)
+        is_completed = lambda t: t.get('client_id') == client_id and t.get('status') == 'COMPLETED'
+        client_transactions = [t for t in transactions_db[start:end] if is_completed(t)]
+        
+        # Página pedida, mais recentes primeiro (totais abaixo usam o período inteiro)
+        page, next_cursor = paginate_newest_first(transactions_db, is_completed, limit, cursor, start, end)
         
         # Calcular totais
         total_deposits = sum([
@@ -748,7 +780,7 @@ def get_client_history(client_id: int, period: str = "all"):
         
         # Formatar transações para UI
         formatted_transactions = []
-        for t in client_transactions:
+        for t in page:
             client_name = clients_db.get(t['client_id'], {}).get('name', 'N/A')
             formatted_transactions.append({
                 "id": t['id'],
@@ -762,28 +794,36 @@ def get_client_history(client_id: int, period: str = "all"):
                 "status": t.get('status', 'PENDING')
             })
         
-        # Ordenar por data (mais recente primeiro)
-        formatted_transactions.sort(key=lambda x: x['data'], reverse=True)
-        
         return {
             "total_deposits": total_deposits,
             "total_withdrawals": total_withdrawals,
             "saldo_periodo": saldo_periodo,
             "transactions": formatted_transactions,
-            "total": len(formatted_transactions)
+            "total": len(client_transactions),
+            "next_cursor": next_cursor
         }
     except Exception as e:
         logger.error(f"Erro ao buscar histórico: {str(e)}")
         return {"error": str(e)}, 500
 
 @app.get("/bank/global/history")
-def get_global_history(period: str = "all"):
+def get_global_history(period: str = "all", date_from: Optional[str] = None, date_to: Optional[str] = None,
+                       limit: Optional[int] = None, cursor: Optional[str] = None):
     try:
-        # Filtrar transações completadas
-        completed_transactions = [
-            t for t in transactions_db 
-            if t.get('status') == 'COMPLETED'
-        ]
+        try:
+            if cursor:
+                decode_cursor(cursor)
+            start, end = created_at_range(transactions_db, *period_range(period, date_from, date_to))
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        limit = clamp_limit(limit)
+        
+        # Filtrar transações completadas, só na faixa do período (busca binária)
+        is_completed = lambda t: t.get('status') == 'COMPLETED'
+        completed_transactions = [t for t in transactions_db[start:end] if is_completed(t)]
+        
+        # Página pedida, mais recentes primeiro (totais abaixo usam o período inteiro)
+        page, next_cursor = paginate_newest_first(transactions_db, is_completed, limit, cursor, start, end)
         
         # Calcular totais
         total_deposits = sum([
@@ -800,7 +840,7 @@ def get_global_history(period: str = "all"):
         
         # Formatar transações para UI
         formatted_transactions = []
-        for t in completed_transactions:
+        for t in page:
             client_name = clients_db.get(t['client_id'], {}).get('name', 'N/A')
             formatted_transactions.append({
                 "id": t['id'],
@@ -814,15 +854,13 @@ def get_global_history(period: str = "all"):
                 "status": t.get('status', 'PENDING')
             })
         
-        # Ordenar por data (mais recente primeiro)
-        formatted_transactions.sort(key=lambda x: x['data'], reverse=True)
-        
         return {
             "total_deposits": total_deposits,
             "total_withdrawals": total_withdrawals,
             "saldo_periodo": saldo_periodo,
             "transactions": formatted_transactions,
-            "total": len(formatted_transactions)
+            "total": len(completed_transactions),
+            "next_cursor": next_cursor
         }
     except Exception as e:
         logger.error(f"Erro ao buscar histórico global: {str(e)}")
@@ -876,16 +914,22 @@ def get_bank_simulation_global():
         return {"error": str(e)}, 500
 
 @app.get("/bank-simulation/withdrawals")
-def get_bank_simulation_withdrawals():
+def get_bank_simulation_withdrawals(response: Response, limit: Optional[int] = None, cursor: Optional[str] = None):
     try:
-        # Pegar operações de saque reais (WITHDRAWAL)
-        withdrawals = [
-            t for t in transactions_db 
-            if t['type'] == "WITHDRAWAL"
-        ]
-        
-        # Ordenar por data (mais recente primeiro)
-        withdrawals.sort(key=lambda x: x.get('created_at', ''), reverse=True)
+        if cursor:
+            try:
+                decode_cursor(cursor)
+            except ValueError as e:
+                return {"error": str(e)}, 400
+        limit = clamp_limit(limit)
+        
+        # Saques reais, mais recentes primeiro (transactions_db já está em ordem: sem sort)
+        is_withdrawal = lambda t: t.get('type') == 'WITHDRAWAL'
+        withdrawals, next_cursor = paginate_newest_first(transactions_db, is_withdrawal, limit, cursor)
+        
+        response.headers[TOTAL_COUNT_HEADER] = str(sum(1 for t in transactions_db if is_withdrawal(t)))
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
         
         result = []
         for t in withdrawals:
@@ -3,27 +3,34 @@ FLUXO CASH - Backend com FastAPI + Supabase
 Sistema de gestão de clientes e comprovantes com extração automática de valores
 """
 
+import asyncio
 import logging
 import hashlib
 from datetime import datetime
-from fastapi import FastAPI, Body, UploadFile, File
+from fastapi import FastAPI, Body, UploadFile, File, BackgroundTasks, Response
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Dict, Any
-import tempfile
-from pathlib import Path
-
-# Importar o módulo de extração
-from .extractors import extract_proof_data
+from typing import Dict, Any, Optional
+
+# Importar o pipeline de extração
+from .extraction_jobs import extract_to_update, shutdown_extraction_executor, get_ocr_tier_stats
+from .extraction_cache import get_extraction_cache
+from .client_cache import get_client_cache
+from .single_flight import get_single_flight
+from .models import ProofStatus
+from .database import DATABASE_BACKEND, close_async_supabase_client
+from .pagination import clamp_limit, decode_cursor, split_page, NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER
+from .periods import period_range
 
 # Importar funções do banco de dados
 from .db_helpers import (
     get_all_clients, get_client_by_id, create_client as db_create_client,
     update_client as db_update_client, delete_client as db_delete_client,
-    update_client_balance, get_client_proofs, create_proof as db_create_proof,
-    check_duplicate_proof, mark_proof_as_deposited, delete_proof as db_delete_proof,
+    get_client_proofs, create_proof as db_create_proof,
+    check_duplicate_proof, update_proof as db_update_proof, fail_stale_extractions, expire_stale_extractions, credit_proof as db_credit_proof, delete_proof as db_delete_proof,
     get_all_transactions, get_client_transactions, create_transaction as db_create_transaction,
-    update_transaction as db_update_transaction, delete_transaction as db_delete_transaction,
-    get_global_statistics
+    update_transaction as db_update_transaction, delete_transaction as db_delete_transaction, reverse_deposit as db_reverse_deposit, approve_withdrawal as db_approve_withdrawal,
+    get_global_statistics, get_history_totals,
+    PROOF_DETAIL_COLUMNS, TRANSACTION_LIST_COLUMNS, WITHDRAWAL_COLUMNS, TRANSACTION_WITH_CLIENT_COLUMNS
 )
 
 # Configurar logging
@@ -50,8 +57,23 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER],
 )
 
+@app.on_event("startup")
+async def recover_stale_extractions():
+    """Extrações que um processo anterior não terminou (reinício/serverless) viram EXTRACTED_WITH_ERROR"""
+    try:
+        if await fail_stale_extractions():
+            logger.warning("⚠️ Comprovantes presos em EXTRACTING marcados como EXTRACTED_WITH_ERROR")
+    except Exception as e:
+        logger.error(f"Erro ao recuperar extrações abandonadas: {str(e)}")
+
+@app.on_event("shutdown")
+async def shutdown_resources():
+    shutdown_extraction_executor()
+    await close_async_supabase_client()
+
 # ========================================
 # HEALTH CHECK
 # ========================================
@@ -61,7 +83,16 @@ def health():
     return {
         "status": "ok",
         "service": "FLUXO CASH",
-        "database": "Supabase PostgreSQL"
+        "database": "SQLite (WAL) local" if DATABASE_BACKEND == "sqlite" else "Supabase PostgreSQL"
+    }
+
+@app.get("/metrics")
+def metrics():
+    return {
+        "extraction_cache": get_extraction_cache().stats(),
+        "client_cache": get_client_cache().stats(),
+        "single_flight": get_single_flight().stats(),
+        "ocr_tiers": get_ocr_tier_stats()
     }
 
 # ========================================
@@ -69,9 +100,9 @@ def health():
 # ========================================
 
 @app.get("/clients")
-def get_clients():
+async def get_clients():
     try:
-        clients = get_all_clients()
+        clients = await get_all_clients()
         # Adicionar saldo_atual para compatibilidade
         for client in clients:
             client['saldo_atual'] = client.get('saldo', 0.0)
@@ -85,9 +116,10 @@ def get_clients():
         return {"error": str(e)}, 500
 
 @app.get("/clients/{client_id}")
-def get_client(client_id: int):
+async def get_client(client_id: int):
     try:
-        client = get_client_by_id(client_id)
+        # Resposta inclui o saldo: lido do banco, não do cache do processo
+        client = await get_client_by_id(client_id, fresh=True)
         if not client:
             return {"error": "Cliente não encontrado"}, 404
         
@@ -98,13 +130,13 @@ def get_client(client_id: int):
         return {"error": str(e)}, 500
 
 @app.post("/clients")
-def create_client(data: Dict[str, Any] = Body(...)):
+async def create_client(data: Dict[str, Any] = Body(...)):
     try:
         name = data.get("name", "").strip()
         if not name:
             return {"error": "Nome do cliente é obrigatório"}, 400
         
-        new_client = db_create_client(
+        new_client = await db_create_client(
             name=name,
             email=data.get("email", ""),
             phone=data.get("phone", ""),
@@ -124,9 +156,9 @@ def create_client(data: Dict[str, Any] = Body(...)):
         return {"error": str(e)}, 500
 
 @app.put("/clients/{client_id}")
-def update_client(client_id: int, data: Dict[str, Any] = Body(...)):
+async def update_client(client_id: int, data: Dict[str, Any] = Body(...)):
     try:
-        client = get_client_by_id(client_id)
+        client = await get_client_by_id(client_id)
         if not client:
             return {"error": "Cliente não encontrado"}, 404
         
@@ -143,7 +175,7 @@ def update_client(client_id: int, data: Dict[str, Any] = Body(...)):
         if "notes" in data:
             update_data["notes"] = data["notes"]
         
-        updated_client = db_update_client(client_id, **update_data)
+        updated_client = await db_update_client(client_id, **update_data)
         logger.info(f"✅ Cliente atualizado: {updated_client['name']} (ID: {client_id})")
         
         return {
@@ -156,13 +188,13 @@ def update_client(client_id: int, data: Dict[str, Any] = Body(...)):
         return {"error": str(e)}, 500
 
 @app.put("/clients/{client_id}/notes")
-def update_client_notes(client_id: int, data: Dict[str, Any] = Body(...)):
+async def update_client_notes(client_id: int, data: Dict[str, Any] = Body(...)):
     try:
-        client = get_client_by_id(client_id)
+        client = await get_client_by_id(client_id)
         if not client:
             return {"error": "Cliente não encontrado"}, 404
         
-        updated_client = db_update_client(client_id, notes=data.get("notes", ""))
+        updated_client = await db_update_client(client_id, notes=data.get("notes", ""))
         logger.info(f"✅ Notas do cliente atualizadas: {updated_client['name']} (ID: {client_id})")
         
         return {
@@ -175,14 +207,14 @@ def update_client_notes(client_id: int, data: Dict[str, Any] = Body(...)):
         return {"error": str(e)}, 500
 
 @app.delete("/clients/{client_id}")
-def delete_client(client_id: int):
+async def delete_client(client_id: int):
     try:
-        client = get_client_by_id(client_id)
+        client = await get_client_by_id(client_id)
         if not client:
             return {"error": "Cliente não encontrado"}, 404
         
         client_name = client["name"]
-        db_delete_client(client_id)
+        await db_delete_client(client_id)
         
         logger.info(f"✅ Cliente deletado: {client_name} (ID: {client_id})")
         
@@ -195,9 +227,9 @@ def delete_client(client_id: int):
         return {"error": str(e)}, 500
 
 @app.get("/clients/{client_id}/balance")
-def get_client_balance(client_id: int):
+async def get_client_balance(client_id: int):
     try:
-        client = get_client_by_id(client_id)
+        client = await get_client_by_id(client_id, fresh=True)
         if not client:
             return {"error": "Cliente não encontrado"}, 404
         
@@ -221,9 +253,9 @@ logger.info("✅ FLUXO CASH Backend (Supabase) iniciado com sucesso")
 # ========================================
 
 @app.get("/proofs/clients/{client_id}")
-def get_client_proofs_route(client_id: int):
+async def get_client_proofs_route(client_id: int):
     try:
-        proofs = get_client_proofs(client_id)
+        proofs = await get_client_proofs(client_id)
         
         stats = {
             "total_proofs": len(proofs),
@@ -241,34 +273,31 @@ def get_client_proofs_route(client_id: int):
         return {"error": str(e)}, 500
 
 @app.get("/proofs/{proof_id}")
-def get_proof(proof_id: int):
+async def get_proof(proof_id: int):
     try:
-        from .database import get_supabase_client
-        supabase = get_supabase_client()
-        response = supabase.table('proofs').select('*').eq('id', proof_id).execute()
+        from .database import get_async_supabase_client
+        supabase = get_async_supabase_client()
+        response = await supabase.table('proofs').select(PROOF_DETAIL_COLUMNS).eq('id', proof_id).execute()
         
         if not response.data:
             return {"error": "Comprovante não encontrado"}, 404
         
-        return {"proof": response.data[0]}
+        proof = response.data[0]
+        await expire_stale_extractions([proof], proof['client_id'])
+        return {"proof": proof}
     except Exception as e:
         logger.error(f"Erro ao buscar comprovante: {str(e)}")
         return {"error": str(e)}, 500
 
 @app.post("/proofs/clients/{client_id}/upload")
-async def upload_proof(client_id: int, file: UploadFile = File(...)):
+async def upload_proof(client_id: int, background_tasks: BackgroundTasks, file: UploadFile = File(...)):
     """
     Endpoint para upload de comprovantes
     - Detecta duplicatas
-    - Extrai valores usando OCR (PDFs/Imagens)
-    - Armazena arquivo
+    - Armazena o comprovante como EXTRACTING e retorna imediatamente
+    - Extrai valores usando OCR (PDFs/Imagens) em segundo plano
     """
     try:
-        # Verificar se cliente existe
-        client = get_client_by_id(client_id)
-        if not client:
-            return {"error": "Cliente não encontrado"}, 404
-        
         # Ler conteúdo do arquivo
         contents = await file.read()
         file_size = len(contents)
@@ -276,8 +305,13 @@ async def upload_proof(client_id: int, file: UploadFile = File(...)):
         # Gerar hash do arquivo para detectar duplicatas
         file_hash = hashlib.sha256(contents).hexdigest()
         
-        # Verificar duplicata
-        is_duplicate = check_duplicate_proof(file_hash, client_id)
+        # Verificar se cliente existe e se é duplicata (consultas em paralelo)
+        client, is_duplicate = await asyncio.gather(
+            get_client_by_id(client_id),
+            check_duplicate_proof(file_hash, client_id)
+        )
+        if not client:
+            return {"error": "Cliente não encontrado"}, 404
         
         if is_duplicate:
             logger.warning(f"⚠️ Comprovante duplicado detectado: {file.filename}")
@@ -288,77 +322,58 @@ async def upload_proof(client_id: int, file: UploadFile = File(...)):
                 "message": "Arquivo duplicado detectado"
             }
         
-        # Salvar arquivo temporariamente
-        with tempfile.NamedTemporaryFile(suffix=Path(file.filename).suffix, delete=False) as tmp:
-            tmp.write(contents)
-            tmp_path = tmp.name
+        # Criar comprovante no banco aguardando extração
+        new_proof = await db_create_proof(
+            client_id=client_id,
+            filename=file.filename,
+            file_hash=file_hash,
+            file_type=file.content_type or "application/octet-stream",
+            file_size=file_size,
+            extraction_status=ProofStatus.EXTRACTING.value,
+            is_duplicate=False,
+            deposited=False
+        )
         
-        try:
-            # Extrair dados do comprovante usando OCR/PDF reader
-            extracted_data = extract_proof_data(tmp_path)
-            
-            value = extracted_data.get('value')
-            confidence = extracted_data.get('confidence', 0)
-            beneficiary = extracted_data.get('beneficiary')
-            endtoend = extracted_data.get('endtoend')
-            
-            if value is None:
-                value = 5000.0  # Fallback
-                confidence = 0.5
-            
-            extraction_status = "EXTRACTED" if extracted_data.get('success') else "EXTRACTED_WITH_ERROR"
-            
-            # Criar novo comprovante no banco
-            new_proof = db_create_proof(
-                client_id=client_id,
-                filename=file.filename,
-                file_hash=file_hash,
-                file_type=file.content_type or "application/octet-stream",
-                file_size=file_size,
-                extracted_value=value,
-                extraction_confidence=confidence,
-                extraction_status=extraction_status,
-                beneficiary=beneficiary or "DESCONHECIDO",
-                endtoend=endtoend or None,
-                is_duplicate=False,
-                deposited=False
-            )
-            
-            logger.info(f"✅ Comprovante enviado: {file.filename} | Valor: R$ {value:.2f} | Confiança: {confidence:.0%}")
-            
-            return {
-                "success": True,
-                "proof": new_proof,
-                "is_duplicate": False,
-                "message": f"Comprovante enviado com sucesso | Valor extraído: R$ {value:.2f}"
-            }
+        # Agendar extração para depois da resposta
+        background_tasks.add_task(process_proof_extraction, new_proof['id'], contents, file.content_type, file.filename, file_hash)
+        
+        logger.info(f"✅ Comprovante enviado: {file.filename} (ID: {new_proof['id']}) | Extração agendada")
         
-        finally:
-            # Limpar arquivo temporário
-            try:
-                Path(tmp_path).unlink()
-            except:
-                pass
+        return {
+            "success": True,
+            "proof": new_proof,
+            "is_duplicate": False,
+            "message": "Comprovante enviado com sucesso | Extração em andamento"
+        }
     
     except Exception as e:
         logger.error(f"Erro ao fazer upload: {str(e)}")
         return {"error": str(e)}, 500
 
+async def process_proof_extraction(proof_id: int, contents: bytes, content_type: str, filename: str, file_hash: str):
+    """Extrai os dados do comprovante no pool (ou do cache) e atualiza o registro"""
+    update_data = await extract_to_update(contents, content_type, filename, file_hash)
+    try:
+        await db_update_proof(proof_id, **update_data)
+        logger.info(f"✅ Extração concluída: comprovante #{proof_id} | Status: {update_data['extraction_status']} | Valor: {update_data['extracted_value']}")
+    except Exception as e:
+        logger.error(f"Erro ao salvar extração do comprovante #{proof_id}: {str(e)}")
+
 @app.delete("/proofs/{proof_id}")
-def delete_proof_route(proof_id: int):
+async def delete_proof_route(proof_id: int):
     try:
-        from .database import get_supabase_client
-        supabase = get_supabase_client()
+        from .database import get_async_supabase_client
+        supabase = get_async_supabase_client()
         
         # Buscar comprovante
-        response = supabase.table('proofs').select('*').eq('id', proof_id).execute()
+        response = await supabase.table('proofs').select('id', 'filename').eq('id', proof_id).execute()
         if not response.data:
             return {"error": "Comprovante não encontrado"}, 404
         
         proof = response.data[0]
         
         # Deletar
-        db_delete_proof(proof_id)
+        await db_delete_proof(proof_id)
         
         logger.info(f"✅ Comprovante deletado: {proof['filename']} (ID: {proof_id})")
         
@@ -376,94 +391,42 @@ def delete_proof_route(proof_id: int):
 # ========================================
 
 @app.post("/deposits/proofs/{proof_id}")
-def create_deposit_from_proof(proof_id: int):
+async def create_deposit_from_proof(proof_id: int):
+    """
+    Credita o comprovante: validação, lançamento, saldo e flag de depositado
+    numa única transação no banco (um round trip)
+    """
     try:
-        from .database import get_supabase_client
-        supabase = get_supabase_client()
-        
-        # Buscar comprovante
-        response = supabase.table('proofs').select('*').eq('id', proof_id).execute()
-        if not response.data:
-            return {"error": "Comprovante não encontrado"}, 404
-        
-        proof = response.data[0]
-        
-        # Validação: Verificar se já foi depositado
-        if proof.get('deposited', False):
-            return {"error": "Este comprovante já foi creditado anteriormente"}, 400
-        
-        # Aceitar EXTRACTED ou EXTRACTED_WITH_ERROR
-        if proof['extraction_status'] not in ['EXTRACTED', 'EXTRACTED_WITH_ERROR']:
-            return {"error": "Comprovante não tem valor extraído"}, 400
+        result = await db_credit_proof(proof_id)
+        if result.get('error'):
+            return {"error": result['error']}, result.get('status', 400)
         
-        if proof['extracted_value'] is None or proof['extracted_value'] == 0:
-            return {"error": "Valor inválido"}, 400
-        
-        client_id = proof['client_id']
-        value = float(proof['extracted_value'])
-        
-        # Criar transação
-        transaction = db_create_transaction(
-            client_id=client_id,
-            amount=value,
-            trans_type="DEPOSIT",
-            status="COMPLETED",
-            description=f"Depósito de {proof['filename']}",
-            proof_id=proof_id
-        )
-        
-        # Atualizar saldo do cliente
-        update_client_balance(client_id, value, operation='add')
-        
-        # Marcar comprovante como depositado
-        mark_proof_as_deposited(proof_id)
-        
-        # Buscar saldo atualizado
-        client = get_client_by_id(client_id)
-        
-        logger.info(f"✅ Depósito criado: R$ {value} para cliente {client_id} | Comprovante #{proof_id} marcado como depositado")
+        logger.info(f"✅ Depósito criado: R$ {result['amount']} para cliente {result['client_id']} | Comprovante #{proof_id} marcado como depositado")
         
         return {
             "success": True,
-            "transaction_id": transaction['id'],
-            "amount": value,
-            "client_saldo": client['saldo'] if client else 0
+            "transaction_id": result['transaction_id'],
+            "amount": float(result['amount']),
+            "client_saldo": result['client_saldo']
         }
     except Exception as e:
         logger.error(f"Erro ao criar depósito: {str(e)}")
         return {"error": str(e)}, 500
 
 @app.delete("/deposits/{transaction_id}")
-def remove_deposit(transaction_id: int):
-    """Remove (reverte) um depósito"""
+async def remove_deposit(transaction_id: int):
+    """Remove (reverte) um depósito numa única transação no banco"""
     try:
-        from .database import get_supabase_client
-        supabase = get_supabase_client()
-        
-        # Buscar transação
-        response = supabase.table('transactions').select('*').eq('id', transaction_id).eq('type', 'DEPOSIT').execute()
-        if not response.data:
-            return {"error": "Depósito não encontrado"}, 404
-        
-        transaction = response.data[0]
-        client_id = transaction['client_id']
-        value = float(transaction['amount'])
+        result = await db_reverse_deposit(transaction_id)
+        if result.get('error'):
+            return {"error": result['error']}, result.get('status', 400)
         
-        # Remover transação
-        db_delete_transaction(transaction_id)
-        
-        # Reverter saldo do cliente
-        update_client_balance(client_id, value, operation='subtract')
-        
-        # Buscar saldo atualizado
-        client = get_client_by_id(client_id)
-        
-        logger.info(f"✅ Depósito removido: R$ {value} do cliente {client_id}")
+        logger.info(f"✅ Depósito removido: R$ {result['amount']} do cliente {result['client_id']}")
         
         return {
             "success": True,
             "message": "Depósito removido com sucesso",
-            "client_saldo": client['saldo'] if client else 0
+            "client_saldo": result['client_saldo']
         }
     except Exception as e:
         logger.error(f"Erro ao remover depósito: {str(e)}")
@@ -475,13 +438,13 @@ def remove_deposit(transaction_id: int):
 # ========================================
 
 @app.post("/clients/{client_id}/withdrawals")
-def create_withdrawal(client_id: int, data: Dict[str, Any] = Body(...)):
+async def create_withdrawal(client_id: int, data: Dict[str, Any] = Body(...)):
     try:
-        client = get_client_by_id(client_id)
+        client = await get_client_by_id(client_id)
         if not client:
             return {"error": "Cliente não encontrado"}, 404
         
-        withdrawal = db_create_transaction(
+        withdrawal = await db_create_transaction(
             client_id=client_id,
             amount=float(data.get("valor", 0)),
             trans_type="WITHDRAWAL",
@@ -502,17 +465,18 @@ def create_withdrawal(client_id: int, data: Dict[str, Any] = Body(...)):
         return {"error": str(e)}, 500
 
 @app.get("/clients/{client_id}/withdrawals")
-def get_client_withdrawals(client_id: int):
+async def get_client_withdrawals(client_id: int):
     try:
-        client = get_client_by_id(client_id)
+        from .database import get_async_supabase_client
+        supabase = get_async_supabase_client()
+        
+        client, response = await asyncio.gather(
+            get_client_by_id(client_id),
+            supabase.table('transactions').select(WITHDRAWAL_COLUMNS).eq('client_id', client_id).eq('type', 'WITHDRAWAL').execute()
+        )
         if not client:
             return {"error": "Cliente não encontrado"}, 404
         
-        from .database import get_supabase_client
-        supabase = get_supabase_client()
-        
-        response = supabase.table('transactions').select('*').eq('client_id', client_id).eq('type', 'WITHDRAWAL').execute()
-        
         return {
             "withdrawals": response.data
         }
@@ -521,17 +485,17 @@ def get_client_withdrawals(client_id: int):
         return {"error": str(e)}, 500
 
 @app.put("/clients/{client_id}/withdrawals/{withdrawal_id}")
-def update_withdrawal(client_id: int, withdrawal_id: int, data: Dict[str, Any] = Body(...)):
+async def update_withdrawal(client_id: int, withdrawal_id: int, data: Dict[str, Any] = Body(...)):
     try:
-        client = get_client_by_id(client_id)
+        client = await get_client_by_id(client_id)
         if not client:
             return {"error": "Cliente não encontrado"}, 404
         
-        from .database import get_supabase_client
-        supabase = get_supabase_client()
+        from .database import get_async_supabase_client
+        supabase = get_async_supabase_client()
         
         # Buscar saque
-        response = supabase.table('transactions').select('*').eq('id', withdrawal_id).eq('client_id', client_id).eq('type', 'WITHDRAWAL').execute()
+        response = await supabase.table('transactions').select('id', 'status', 'amount').eq('id', withdrawal_id).eq('client_id', client_id).eq('type', 'WITHDRAWAL').execute()
         if not response.data:
             return {"error": "Saque não encontrado"}, 404
         
@@ -558,13 +522,16 @@ def update_withdrawal(client_id: int, withdrawal_id: int, data: Dict[str, Any] =
         if "admin_notes" in data:
             update_data["admin_notes"] = data["admin_notes"]
         
-        # Se houve transição PENDING -> COMPLETED, aplicar redução de saldo
+        # Transição PENDING -> COMPLETED: troca de status e redução de saldo numa
+        # única transação no banco (só uma aprovação concorrente desconta)
         if old_status == "PENDING" and new_status == "COMPLETED":
-            valor_saque = float(withdrawal.get('amount', 0))
-            update_client_balance(client_id, valor_saque, operation='subtract')
-        
-        # Atualizar transação
-        updated_withdrawal = db_update_transaction(withdrawal_id, **update_data)
+            result = await db_approve_withdrawal(withdrawal_id, client_id, update_data.get("admin_notes"))
+            if result.get('error'):
+                return {"error": result['error']}, result.get('status', 400)
+            updated_withdrawal = result['withdrawal']
+        else:
+            # Atualizar transação
+            updated_withdrawal = await db_update_transaction(withdrawal_id, **update_data)
         
         # Label para exibição
         display_status = "APROVADO" if updated_withdrawal.get('status') == "COMPLETED" else ("PENDENTE" if updated_withdrawal.get('status') == "PENDING" else updated_withdrawal.get('status'))
@@ -581,21 +548,21 @@ def update_withdrawal(client_id: int, withdrawal_id: int, data: Dict[str, Any] =
         return {"error": str(e)}, 500
 
 @app.delete("/clients/{client_id}/withdrawals/{withdrawal_id}")
-def delete_withdrawal(client_id: int, withdrawal_id: int):
+async def delete_withdrawal(client_id: int, withdrawal_id: int):
     try:
-        client = get_client_by_id(client_id)
+        client = await get_client_by_id(client_id)
         if not client:
             return {"error": "Cliente não encontrado"}, 404
         
-        from .database import get_supabase_client
-        supabase = get_supabase_client()
+        from .database import get_async_supabase_client
+        supabase = get_async_supabase_client()
         
         # Buscar e deletar saque
-        response = supabase.table('transactions').select('*').eq('id', withdrawal_id).eq('client_id', client_id).execute()
+        response = await supabase.table('transactions').select('id').eq('id', withdrawal_id).eq('client_id', client_id).execute()
         if not response.data:
             return {"error": "Saque não encontrado"}, 404
         
-        db_delete_transaction(withdrawal_id)
+        await db_delete_transaction(withdrawal_id)
         
         logger.info(f"✅ Saque deletado: {withdrawal_id}")
         
@@ -612,29 +579,75 @@ def delete_withdrawal(client_id: int, withdrawal_id: int):
 # GLOBAL BALANCE & STATISTICS
 # ========================================
 
+async def fetch_transactions_page(base_query, limit: Optional[int], after, with_count: bool = False):
+    """
+    Executa uma listagem de transações paginada por keyset (created_at, id),
+    mais recentes primeiro; busca limit + 1 linhas para saber se há próxima página
+    base_query() monta a consulta com os filtros da listagem. Com with_count, o
+    total do filtro (sem o cursor, igual em todas as páginas) vem de um count
+    exato em paralelo. Retorna (linhas, next_cursor, total ou None)
+    """
+    query = base_query().keyset(after)
+    if limit is None:
+        rows = (await query.execute()).data
+        return rows, None, len(rows)
+    
+    query = query.limit(limit + 1)
+    if with_count:
+        response, counted = await asyncio.gather(
+            query.execute(),
+            base_query().select('id', count='exact').limit(0).execute()
+        )
+        total = counted.count
+    else:
+        response, total = await query.execute(), None
+    rows, next_cursor = split_page(response.data, limit)
+    return rows, next_cursor, total
+
+def in_period(query, date_from: Optional[str], date_to: Optional[str]):
+    """Filtra created_at na faixa [date_from, date_to) do período (no banco)"""
+    if date_from:
+        query = query.gte('created_at', date_from)
+    if date_to:
+        query = query.lt('created_at', date_to)
+    return query
+
+def set_page_headers(response: Response, next_cursor: Optional[str], total: int):
+    """Próximo cursor e total nos cabeçalhos das listagens que retornam uma lista"""
+    response.headers[TOTAL_COUNT_HEADER] = str(total)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
 @app.get("/global-balance")
-def get_global_balance():
+async def get_global_balance():
     try:
-        stats = get_global_statistics()
+        stats = await get_global_statistics()
         return stats
     except Exception as e:
         logger.error(f"Erro em get_global_balance: {str(e)}")
         return {"error": str(e)}, 500
 
 @app.get("/global-withdrawals")
-def get_global_withdrawals():
+async def get_global_withdrawals(response: Response, limit: Optional[int] = None, cursor: Optional[str] = None):
     try:
-        from .database import get_supabase_client
-        supabase = get_supabase_client()
+        from .database import get_async_supabase_client
+        supabase = get_async_supabase_client()
         
-        # Buscar todas as transações de saque
-        response = supabase.table('transactions').select('*').eq('type', 'WITHDRAWAL').order('created_at', desc=True).execute()
+        try:
+            after = decode_cursor(cursor) if cursor else None
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        limit = clamp_limit(limit)
+        
+        # Buscar todas as transações de saque, com o nome do cliente embutido
+        # (com limit, só a página pedida; total e cursor vão nos cabeçalhos)
+        query = lambda: supabase.table('transactions').select(TRANSACTION_WITH_CLIENT_COLUMNS).eq('type', 'WITHDRAWAL')
+        withdrawals, next_cursor, total = await fetch_transactions_page(query, limit, after, with_count=True)
         
         result = []
-        for t in response.data:
+        for t in withdrawals:
             client_id = t['client_id']
-            client = get_client_by_id(client_id)
-            client_name = client['name'] if client else 'Cliente Desconhecido'
+            client_name = (t.get('clients') or {}).get('name', 'Cliente Desconhecido')
             
             # Converter status para exibição
             display_status = "APROVADO" if t['status'] == "COMPLETED" else "PENDENTE"
@@ -650,6 +663,7 @@ def get_global_withdrawals():
                 "notes": t.get('description', '')
             })
         
+        set_page_headers(response, next_cursor, total)
         return result
     except Exception as e:
         logger.error(f"Erro em get_global_withdrawals: {str(e)}")
@@ -660,25 +674,32 @@ def get_global_withdrawals():
 # ========================================
 
 @app.get("/clients/{client_id}/history")
-def get_client_history(client_id: int, period: str = "all"):
+async def get_client_history(client_id: int, period: str = "all", date_from: Optional[str] = None,
+                             date_to: Optional[str] = None, limit: Optional[int] = None, cursor: Optional[str] = None):
     try:
-        client = get_client_by_id(client_id)
+        from .database import get_async_supabase_client
+        supabase = get_async_supabase_client()
+        
+        try:
+            after = decode_cursor(cursor) if cursor else None
+            range_from, range_to = period_range(period, date_from, date_to)
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        limit = clamp_limit(limit)
+        
+        # Buscar cliente, página de transações completadas e totais do período inteiro (em paralelo)
+        query = lambda: in_period(
+            supabase.table('transactions').select(TRANSACTION_LIST_COLUMNS).eq('client_id', client_id).eq('status', 'COMPLETED'),
+            range_from, range_to
+        )
+        client, (transactions, next_cursor, _), totals = await asyncio.gather(
+            get_client_by_id(client_id),
+            fetch_transactions_page(query, limit, after),
+            get_history_totals(client_id, range_from, range_to)
+        )
         if not client:
             return {"error": "Cliente não encontrado"}, 404
         
-        from .database import get_supabase_client
-        supabase = get_supabase_client()
-        
-        # Buscar transações completadas do cliente
-        response = supabase.table('transactions').select('*').eq('client_id', client_id).eq('status', 'COMPLETED').order('created_at', desc=True).execute()
-        
-        transactions = response.data
-        
-        # Calcular totais
-        total_deposits = sum([t['amount'] for t in transactions if t['type'] == 'DEPOSIT'])
-        total_withdrawals = sum([t['amount'] for t in transactions if t['type'] == 'WITHDRAWAL'])
-        saldo_periodo = total_deposits - total_withdrawals
-        
         # Formatar transações para UI
         formatted_transactions = []
         for t in transactions:
@@ -695,37 +716,45 @@ def get_client_history(client_id: int, period: str = "all"):
             })
         
         return {
-            "total_deposits": total_deposits,
-            "total_withdrawals": total_withdrawals,
-            "saldo_periodo": saldo_periodo,
+            "total_deposits": totals['total_deposits'],
+            "total_withdrawals": totals['total_withdrawals'],
+            "saldo_periodo": totals['saldo_periodo'],
             "transactions": formatted_transactions,
-            "total": len(formatted_transactions)
+            "total": totals['total'],
+            "next_cursor": next_cursor
         }
     except Exception as e:
         logger.error(f"Erro ao buscar histórico: {str(e)}")
         return {"error": str(e)}, 500
 
 @app.get("/bank/global/history")
-def get_global_history(period: str = "all"):
+async def get_global_history(period: str = "all", date_from: Optional[str] = None, date_to: Optional[str] = None,
+                             limit: Optional[int] = None, cursor: Optional[str] = None):
     try:
-        from .database import get_supabase_client
-        supabase = get_supabase_client()
-        
-        # Buscar transações completadas
-        response = supabase.table('transactions').select('*').eq('status', 'COMPLETED').order('created_at', desc=True).execute()
+        from .database import get_async_supabase_client
+        supabase = get_async_supabase_client()
         
-        transactions = response.data
-        
-        # Calcular totais
-        total_deposits = sum([t['amount'] for t in transactions if t['type'] == 'DEPOSIT'])
-        total_withdrawals = sum([t['amount'] for t in transactions if t['type'] == 'WITHDRAWAL'])
-        saldo_periodo = total_deposits - total_withdrawals
+        try:
+            after = decode_cursor(cursor) if cursor else None
+            range_from, range_to = period_range(period, date_from, date_to)
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        limit = clamp_limit(limit)
+        
+        # Página de transações completadas (com o nome do cliente) e totais do período inteiro (em paralelo)
+        query = lambda: in_period(
+            supabase.table('transactions').select(TRANSACTION_WITH_CLIENT_COLUMNS).eq('status', 'COMPLETED'),
+            range_from, range_to
+        )
+        (transactions, next_cursor, _), totals = await asyncio.gather(
+            fetch_transactions_page(query, limit, after),
+            get_history_totals(None, range_from, range_to)
+        )
         
-        # Formatar transações para UI
+        # Formatar transações para UI (nome do cliente embutido na consulta)
         formatted_transactions = []
         for t in transactions:
-            client = get_client_by_id(t['client_id'])
-            client_name = client['name'] if client else 'N/A'
+            client_name = (t.get('clients') or {}).get('name', 'N/A')
             
             formatted_transactions.append({
                 "id": t['id'],
@@ -740,11 +769,12 @@ def get_global_history(period: str = "all"):
             })
         
         return {
-            "total_deposits": total_deposits,
-            "total_withdrawals": total_withdrawals,
-            "saldo_periodo": saldo_periodo,
+            "total_deposits": totals['total_deposits'],
+            "total_withdrawals": totals['total_withdrawals'],
+            "saldo_periodo": totals['saldo_periodo'],
             "transactions": formatted_transactions,
-            "total": len(formatted_transactions)
+            "total": totals['total'],
+            "next_cursor": next_cursor
         }
     except Exception as e:
         logger.error(f"Erro ao buscar histórico global: {str(e)}")
@@ -755,9 +785,9 @@ def get_global_history(period: str = "all"):
 # ========================================
 
 @app.get("/bank-simulation/global")
-def get_bank_simulation_global():
+async def get_bank_simulation_global():
     try:
-        stats = get_global_statistics()
+        stats = await get_global_statistics()
         
         # Adicionar campos extras para compatibilidade
         stats['clientes_positivos'] = stats.get('total_clients', 0) - stats.get('clientes_em_negativo', 0)
@@ -768,18 +798,25 @@ def get_bank_simulation_global():
         return {"error": str(e)}, 500
 
 @app.get("/bank-simulation/withdrawals")
-def get_bank_simulation_withdrawals():
+async def get_bank_simulation_withdrawals(response: Response, limit: Optional[int] = None, cursor: Optional[str] = None):
     try:
-        from .database import get_supabase_client
-        supabase = get_supabase_client()
+        from .database import get_async_supabase_client
+        supabase = get_async_supabase_client()
+        
+        try:
+            after = decode_cursor(cursor) if cursor else None
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        limit = clamp_limit(limit)
         
-        # Buscar operações de saque
-        response = supabase.table('transactions').select('*').eq('type', 'WITHDRAWAL').order('created_at', desc=True).execute()
+        # Buscar operações de saque, com o nome do cliente embutido
+        # (com limit, só a página pedida; total e cursor vão nos cabeçalhos)
+        query = lambda: supabase.table('transactions').select(TRANSACTION_WITH_CLIENT_COLUMNS).eq('type', 'WITHDRAWAL')
+        withdrawals, next_cursor, total = await fetch_transactions_page(query, limit, after, with_count=True)
         
         result = []
-        for t in response.data:
-            client = get_client_by_id(t['client_id'])
-            client_name = client['name'] if client else 'Cliente Desconhecido'
+        for t in withdrawals:
+            client_name = (t.get('clients') or {}).get('name', 'Cliente Desconhecido')
             
             # Converter status para exibição
             display_status = "APROVADO" if t['status'] == "COMPLETED" else "PENDENTE"
@@ -795,6 +832,7 @@ def get_bank_simulation_withdrawals():
                 "notes": t.get('description', '')
             })
         
+        set_page_headers(response, next_cursor, total)
         return result
     except Exception as e:
         logger.error(f"Erro em get_bank_simulation_withdrawals: {str(e)}")
@@ -2,7 +2,7 @@
 Database models for FLUXO CASH proof management system
 """
 
-from datetime import datetime
+from datetime import datetime, timezone
 from enum import Enum
 from typing import Optional
 
@@ -12,10 +12,17 @@ class ProofStatus(str, Enum):
     UPLOADED = "UPLOADED"          # Arquivo enviado, não processado
     EXTRACTING = "EXTRACTING"      # Processando extração
     EXTRACTED = "EXTRACTED"        # Valor extraído com sucesso
+    EXTRACTED_WITH_ERROR = "EXTRACTED_WITH_ERROR"  # Extração falhou: valor de fallback, conferir antes de creditar
     FAILED = "FAILED"              # Falha na extração
     MANUAL_ENTRY = "MANUAL_ENTRY"  # Valor inserido manualmente
 
 
+# Comprovante sem valor lido (OCR falhou ou a extração foi abandonada): fica
+# EXTRACTED_WITH_ERROR com este valor e confiança, como no upload síncrono
+EXTRACTION_FALLBACK_VALUE = 5000.0
+EXTRACTION_FALLBACK_CONFIDENCE = 0.5
+
+
 class Proof:
     """
     Modelo de comprovante/prova de transação
@@ -75,8 +82,8 @@ class Proof:
         self.extraction_status = extraction_status
         self.beneficiary = beneficiary
         self.endtoend = endtoend
-        self.uploaded_at = uploaded_at or datetime.now()
-        self.created_at = created_at or datetime.now()
+        self.uploaded_at = uploaded_at or datetime.now(timezone.utc)
+        self.created_at = created_at or datetime.now(timezone.utc)
     
     def to_dict(self):
         """Converte modelo para dicionário"""
@@ -120,7 +127,7 @@ class Client:
         self.phone = phone
         self.account = account
         self.notes = notes
-        self.created_at = created_at or datetime.now()
+        self.created_at = created_at or datetime.now(timezone.utc)
         self.proofs = []
     
     def to_dict(self):
@@ -0,0 +1,113 @@
+"""
+Paginação por keyset em (created_at, id) para as listagens de transações
+O cursor é opaco para o frontend: base64 url-safe do JSON [created_at, id]
+da última linha entregue. A próxima página começa estritamente depois dele,
+então inserções e remoções entre as páginas não duplicam nem pulam linhas
+"""
+import base64
+import json
+import os
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Maior página aceita (limit acima disso é reduzido)
+MAX_PAGE_LIMIT = int(os.getenv("MAX_PAGE_LIMIT", "500"))
+
+# Cabeçalhos das listagens que retornam uma lista pura
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+def row_key(row: Dict[str, Any]) -> Tuple[str, int]:
+    """Chave de ordenação da linha: (created_at, id)"""
+    return (row.get('created_at') or '', row['id'])
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    """Cursor da próxima página a partir da última linha entregue"""
+    raw = json.dumps(list(row_key(row)), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """(created_at, id) do cursor; ValueError se o cursor não for válido"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        return str(created_at), int(row_id)
+    except Exception:
+        raise ValueError("Cursor inválido")
+
+def clamp_limit(limit: Optional[int]) -> Optional[int]:
+    """None (sem paginação) ou limit entre 1 e MAX_PAGE_LIMIT"""
+    if limit is None:
+        return None
+    return max(1, min(limit, MAX_PAGE_LIMIT))
+
+def split_page(rows: List[Dict[str, Any]], limit: Optional[int]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Separa a página das linhas buscadas com limit + 1:
+    a linha extra só indica que existe próxima página
+    """
+    if limit is None or len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    return page, encode_cursor(page[-1])
+
+def _position_of(rows: List[Dict[str, Any]], key, key_of: Callable = row_key) -> int:
+    """Busca binária: quantas linhas de rows (ordenadas por key_of) vêm antes de key"""
+    lo, hi = 0, len(rows)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if key_of(rows[mid]) < key:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+def _utc_text(value: Optional[str]) -> Optional[str]:
+    """Data ISO em UTC com offset, no formato de created_at (sem offset = UTC)"""
+    if not value:
+        return value
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc).isoformat()
+
+def created_at_range(rows: List[Dict[str, Any]], date_from: Optional[str], date_to: Optional[str]) -> Tuple[int, int]:
+    """
+    Índice de faixa da lista em memória ordenada por created_at: posições
+    [início, fim) das linhas com date_from <= created_at < date_to, por busca
+    binária. As linhas guardam created_at em UTC com offset (+00:00); os
+    limites são levados para o mesmo formato antes da comparação como texto
+    """
+    date_from, date_to = _utc_text(date_from), _utc_text(date_to)
+    created_at = lambda row: row.get('created_at') or ''
+    start = _position_of(rows, date_from, created_at) if date_from else 0
+    end = _position_of(rows, date_to, created_at) if date_to else len(rows)
+    return start, max(start, end)
+
+def paginate_newest_first(
+    rows: List[Dict[str, Any]],
+    matches: Callable[[Dict[str, Any]], bool],
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    start: int = 0,
+    end: Optional[int] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Página (mais recentes primeiro) de uma lista em memória já ordenada por
+    (created_at, id) crescente, sem copiar nem reordenar a lista inteira:
+    começa na posição do cursor (busca binária) e anda para trás até juntar
+    limit linhas que passam em matches. start/end restringem a busca a uma
+    faixa de rows (ver created_at_range)
+    """
+    end = len(rows) if end is None else end
+    if cursor:
+        end = min(end, _position_of(rows, decode_cursor(cursor)))
+
+    wanted = None if limit is None else limit + 1
+    found = []
+    for i in range(end - 1, start - 1, -1):
+        if matches(rows[i]):
+            found.append(rows[i])
+            if wanted is not None and len(found) == wanted:
+                break
+    return split_page(found, limit)
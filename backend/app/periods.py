@@ -0,0 +1,77 @@
+"""
+Períodos do histórico (parâmetro period) como faixas de created_at
+Cada período vira [início, fim) em dias inteiros, aplicado no banco
+(created_at=gte./lt.) ou por busca binária na lista em memória
+Os dias são os do fuso do negócio (BUSINESS_TIMEZONE), não os do servidor; os
+limites saem em UTC com offset explícito, como o created_at gravado no banco
+"""
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional, Tuple
+from zoneinfo import ZoneInfo
+
+# Aceita os valores do frontend (day/week/year) e os curtos (today/7d/30d)
+PERIODS = ("all", "today", "day", "7d", "week", "30d", "month", "year", "custom")
+
+# Mesmo fuso de business_day() em database_schema.sql (dias de daily_stats)
+BUSINESS_TIMEZONE = ZoneInfo("America/Sao_Paulo")
+
+def business_today() -> date:
+    return datetime.now(BUSINESS_TIMEZONE).date()
+
+def business_day(value: str) -> str:
+    """Dia (AAAA-MM-DD) no fuso do negócio de um instante ISO; sem offset = UTC"""
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(BUSINESS_TIMEZONE).date().isoformat()
+
+def _start_of(day: date) -> str:
+    """Meia-noite do dia no fuso do negócio, em UTC: 2024-03-05 -> 2024-03-05T03:00:00+00:00"""
+    midnight = datetime(day.year, day.month, day.day, tzinfo=BUSINESS_TIMEZONE)
+    return midnight.astimezone(timezone.utc).isoformat()
+
+def _parse_day(value: str, name: str) -> date:
+    try:
+        return date.fromisoformat(value[:10])
+    except ValueError:
+        raise ValueError(f"Data inválida em {name}: {value} (use AAAA-MM-DD)")
+
+def period_range(
+    period: str = "all",
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    today: Optional[date] = None,
+) -> Tuple[Optional[str], Optional[str]]:
+    """
+    (início inclusivo, fim exclusivo) em ISO (UTC) para o período; None = sem limite
+    custom usa date_from/date_to (AAAA-MM-DD no fuso do negócio, ambos inclusivos,
+    qualquer um opcional)
+    ValueError se o período ou as datas forem inválidos
+    """
+    period = (period or "all").lower()
+    today = today or business_today()
+    tomorrow = today + timedelta(days=1)
+
+    if period == "all":
+        return None, None
+    if period in ("today", "day"):
+        return _start_of(today), _start_of(tomorrow)
+    if period == "7d":
+        return _start_of(today - timedelta(days=6)), _start_of(tomorrow)
+    if period == "week":
+        return _start_of(today - timedelta(days=today.weekday())), _start_of(tomorrow)
+    if period == "30d":
+        return _start_of(today - timedelta(days=29)), _start_of(tomorrow)
+    if period == "month":
+        first = today.replace(day=1)
+        next_month = (first + timedelta(days=32)).replace(day=1)
+        return _start_of(first), _start_of(next_month)
+    if period == "year":
+        return _start_of(date(today.year, 1, 1)), _start_of(date(today.year + 1, 1, 1))
+    if period == "custom":
+        start = _parse_day(date_from, "date_from") if date_from else None
+        end = _parse_day(date_to, "date_to") + timedelta(days=1) if date_to else None
+        if start and end and start >= end:
+            raise ValueError("date_from deve ser anterior ou igual a date_to")
+        return (_start_of(start) if start else None), (_start_of(end) if end else None)
+    raise ValueError(f"Período inválido: {period} (use {', '.join(PERIODS)})")
@@ -0,0 +1,85 @@
+"""
+Single-flight para as leituras quentes (clientes e estatísticas globais)
+Chamadas idênticas (mesma função e argumentos) que chegam enquanto uma
+consulta ao banco está em andamento aguardam essa mesma consulta em vez de
+abrir outra. O resultado não é guardado depois que a consulta termina: só
+quem chegou durante ela compartilha o resultado (não é um cache)
+Cada chamador recebe uma cópia própria, porque as rotas alteram o resultado
+(saldo_atual, clientes_positivos...)
+"""
+
+import asyncio
+import copy
+import functools
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class SingleFlight:
+    """
+    Agrupa chamadas concorrentes pela chave: a primeira (líder) dispara a
+    consulta numa task; as demais aguardam a mesma task
+    A task não é cancelada se o líder desistir (cliente desconectou), então os
+    outros chamadores continuam recebendo o resultado
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self.flights = 0
+        self.shared = 0
+        self.failures = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Resultado de fn() (cópia), compartilhando a execução com chamadas concorrentes de mesma chave"""
+        loop = asyncio.get_running_loop()
+        task = self._in_flight.get(key)
+        if task is not None and task.get_loop() is loop:
+            self.shared += 1
+        else:
+            task = loop.create_task(fn())
+            self._in_flight[key] = task
+            self.flights += 1
+            task.add_done_callback(functools.partial(self._finished, key))
+
+        result = await asyncio.shield(task)
+        return copy.deepcopy(result)
+
+    def _finished(self, key: Hashable, task: asyncio.Future):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Marca a exceção como lida mesmo se todos os chamadores desistiram
+        if not task.cancelled() and task.exception() is not None:
+            self.failures += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Consultas disparadas x chamadas que aproveitaram uma consulta em andamento"""
+        calls = self.flights + self.shared
+        return {
+            "flights": self.flights,
+            "shared": self.shared,
+            "shared_ratio": self.shared / calls if calls else 0.0,
+            "failures": self.failures,
+            "in_flight": len(self._in_flight),
+        }
+
+
+# Global single-flight instance
+_single_flight: Optional[SingleFlight] = None
+
+def get_single_flight() -> SingleFlight:
+    """Get or create the single-flight group"""
+    global _single_flight
+    if _single_flight is None:
+        _single_flight = SingleFlight()
+    return _single_flight
+
+
+def single_flight(fn: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """Decorator: chamadas concorrentes de fn com os mesmos argumentos compartilham uma execução"""
+    name = f"{fn.__module__}.{fn.__qualname__}"
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        key: Tuple = (name, args, tuple(sorted(kwargs.items())))
+        return await get_single_flight().do(key, lambda: fn(*args, **kwargs))
+
+    return wrapper
@@ -0,0 +1,770 @@
+"""
+Backend local em SQLite (modo WAL) com a mesma API REST do Supabase
+Com DATABASE_BACKEND=sqlite, SupabaseClient e AsyncSupabaseClient usam um
+transport httpx que responde às requisições do PostgREST a partir de um
+arquivo SQLite (SQLITE_PATH), sem rede: table()/TableQuery, select, insert,
+update, delete, iter_select, operações em lote, rpc, db_helpers e as rotas
+do main_supabase rodam sem mudança (uma máquina só, CI, benchmarks)
+
+Só o que database.py e os scripts do backend pedem (o resto responde
+400/404, para não virar uma segunda implementação a manter em dia com o
+Postgres):
+- tabelas clients, proofs e transactions (global_stats/daily_stats só
+  pelas funções)
+- select com colunas, * e relações embutidas pela chave estrangeira da
+  própria tabela (clients(name) em transactions)
+- filtros eq/gt/gte/lt/in/is.null (com not.) e o or= do keyset, order,
+  limit, Prefer count=exact
+- POST com objeto ou array (sem upsert), PATCH e DELETE com filtros,
+  return=representation/minimal
+- as funções (rpc) do database_schema.sql chamadas pelo app e por
+  rebuild_stats.py, escritas aqui em Python, cada uma numa transação; cada
+  rpc_<função> aponta para a função SQL e vice-versa, e
+  benchmarks/rpc_parity.py roda os mesmos cenários nos dois bancos
+Schema: database_schema_sqlite.sql (mesmas tabelas, índices e triggers de
+global_stats/daily_stats)
+
+Diferenças conhecidas: valores em REAL (não DECIMAL) e cada linha de um
+insert em lote usa os defaults das colunas ausentes
+"""
+
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import httpx
+
+from .database import order_terms
+from .periods import BUSINESS_TIMEZONE, business_day
+
+# Configuração (variáveis de ambiente)
+SQLITE_PATH = os.getenv("SQLITE_PATH", str(Path(__file__).resolve().parent.parent / "fluxo_cash.sqlite3"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+# A cada tantas transações de escrita, PRAGMA optimize atualiza as estatísticas
+# do planejador (sem elas o SQLite escolhe o índice de status/type e ordena em
+# memória em vez de seguir o índice de (created_at, id) nas listagens)
+SQLITE_OPTIMIZE_EVERY = 1000
+
+SCHEMA_PATH = Path(__file__).resolve().parent.parent / "database_schema_sqlite.sql"
+
+# Parâmetros da URL que não são filtros
+_RESERVED_PARAMS = {"select", "order", "limit"}
+_COMPARISONS = {"eq": "=", "gt": ">", "gte": ">=", "lt": "<"}
+_LOGIC_RE = re.compile(r"^(and|or)\((.*)\)$", re.S)
+_EMBED_RE = re.compile(r"^(\w+)\((.*)\)$", re.S)
+
+# Tabelas expostas no REST (as que o app lê e escreve)
+_REST_TABLES = ("clients", "proofs", "transactions")
+
+# IN (...) com no máximo este número de valores por consulta
+_IN_CHUNK = 500
+
+
+class PostgRESTError(Exception):
+    """Erro devolvido no formato do PostgREST ({code, message}) com o status HTTP"""
+
+    def __init__(self, status: int, code: str, message: str):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+        self.message = message
+
+    def body(self) -> Dict[str, Any]:
+        return {"code": self.code, "message": self.message, "details": None, "hint": None}
+
+
+def _split_top(text: str) -> List[str]:
+    """Separa por vírgulas fora de parênteses e de aspas: 'a,and(b,c),"d,e"'"""
+    parts, current = [], []
+    depth, quoted, escaped = 0, False, False
+    for char in text:
+        if escaped:
+            escaped = False
+        elif char == "\\" and quoted:
+            escaped = True
+        elif char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and char == ",":
+            parts.append("".join(current).strip())
+            current = []
+            continue
+        current.append(char)
+    parts.append("".join(current).strip())
+    return [part for part in parts if part]
+
+
+def _unquote(value: str) -> str:
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return value[1:-1].replace('\\"', '"').replace("\\\\", "\\")
+    return value
+
+
+def _param(params: Sequence[Tuple[str, str]], name: str, default: Optional[str] = None) -> Optional[str]:
+    return next((value for key, value in params if key == name), default)
+
+
+def _parse_prefer(header: str) -> Dict[str, str]:
+    """Prefer: return=minimal,count=exact -> {'return': 'minimal', 'count': 'exact'}"""
+    prefer = {}
+    for item in header.split(","):
+        key, _, value = item.strip().partition("=")
+        if key:
+            prefer[key] = value
+    return prefer
+
+
+def _json_response(status: int, payload: Any = None, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+    content = b"" if payload is None else json.dumps(payload).encode()
+    return httpx.Response(status, content=content, headers={"content-type": "application/json", **(headers or {})})
+
+
+def _content_range(count: int, total: Optional[int]) -> str:
+    total_text = "*" if total is None else str(total)
+    return f"0-{count - 1}/{total_text}" if count else f"*/{total_text}"
+
+
+def _utc_text(value: Optional[str]) -> Optional[str]:
+    """Instante ISO com fuso -> texto UTC sem fuso, como o created_at gravado"""
+    if not value:
+        return value
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        return value
+    return moment.astimezone(timezone.utc).replace(tzinfo=None).isoformat(timespec="milliseconds")
+
+
+def _business_midnight(value: Optional[str]) -> bool:
+    """Limite de período que cai na meia-noite do fuso do negócio (sem fuso = UTC)"""
+    if value is None:
+        return True
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(BUSINESS_TIMEZONE).time() == datetime.min.time()
+
+
+class SQLiteStore:
+    """
+    Banco SQLite em modo WAL: uma conexão por thread (leituras em paralelo,
+    escritas serializadas pelo SQLite com busy timeout). handle() responde a
+    uma requisição do PostgREST; rpc_<função>() implementa as funções do banco
+    """
+
+    def __init__(self, path: str = SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._connections: List[sqlite3.Connection] = []
+        self._initialized = False
+        self._writes = 0
+        # tabela -> {coluna: tipo declarado}
+        self._columns: Dict[str, Dict[str, str]] = {}
+        # tabela -> {tabela referenciada: (coluna, coluna referenciada)}
+        self._foreign_keys: Dict[str, Dict[str, Tuple[str, str]]] = {}
+
+    # ----------------------------------------
+    # Conexões e transações
+    # ----------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, isolation_level=None, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000,
+                               check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.create_function("business_day", 1, lambda value: value and business_day(value), deterministic=True)
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA analysis_limit = 1000")
+        return conn
+
+    def _ensure_schema(self):
+        """Cria o schema (idempotente), liga o WAL e lê as colunas e chaves estrangeiras"""
+        with self._init_lock:
+            if self._initialized:
+                return
+            Path(self.path).resolve().parent.mkdir(parents=True, exist_ok=True)
+            conn = self._connect()
+            try:
+                conn.execute("PRAGMA journal_mode = WAL")
+                conn.executescript(SCHEMA_PATH.read_text(encoding="utf-8"))
+                tables = [row[0] for row in conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+                for table in tables:
+                    self._columns[table] = {
+                        row["name"]: (row["type"] or "").upper() for row in conn.execute(f'PRAGMA table_info("{table}")')
+                    }
+                    self._foreign_keys[table] = {
+                        row["table"]: (row["from"], row["to"]) for row in conn.execute(f'PRAGMA foreign_key_list("{table}")')
+                    }
+            finally:
+                conn.close()
+            self._initialized = True
+
+    def connection(self) -> sqlite3.Connection:
+        """Conexão da thread atual (criada no primeiro uso)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self._ensure_schema()
+            conn = self._connect()
+            self._local.conn = conn
+            with self._init_lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def transaction(self, write: bool = False) -> Iterator[sqlite3.Connection]:
+        """
+        Transação na conexão da thread: leituras veem um snapshot único (WAL);
+        escritas pegam o lock de escrita já no BEGIN (IMMEDIATE), sem deadlock
+        ao promover a leitura
+        """
+        conn = self.connection()
+        if not write:
+            conn.execute("BEGIN")
+            try:
+                yield conn
+            finally:
+                conn.execute("COMMIT")
+            return
+
+        # Escritas deste processo fazem fila num lock (sem o sleep do busy timeout
+        # do SQLite); o busy timeout fica para escritores de outros processos
+        with self._write_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            self._writes += 1
+            if self._writes % SQLITE_OPTIMIZE_EVERY == 0:
+                conn.execute("PRAGMA optimize")
+
+    def close(self):
+        """Fecha as conexões abertas (todas as threads)"""
+        with self._init_lock:
+            for conn in self._connections:
+                conn.execute("PRAGMA optimize")
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    # ----------------------------------------
+    # Requisições REST
+    # ----------------------------------------
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        """Responde a uma requisição do PostgREST (GET/POST/PATCH/DELETE em /<tabela>, POST em /rpc/<função>)"""
+        path = request.url.path.split("/rest/v1/", 1)[-1].strip("/")
+        try:
+            if path.startswith("rpc/"):
+                return _json_response(200, self.rpc(path[len("rpc/"):], json.loads(request.content or b"{}") or {}))
+
+            self.connection()
+            if path not in _REST_TABLES:
+                raise PostgRESTError(404, "PGRST205", f"Tabela não encontrada: {path}")
+            params = request.url.params.multi_items()
+            prefer = _parse_prefer(request.headers.get("prefer", ""))
+            if request.method == "GET":
+                return self._get(path, params, prefer)
+            body = json.loads(request.content) if request.content else None
+            if request.method == "POST":
+                return self._post(path, params, prefer, body)
+            if request.method == "PATCH":
+                return self._patch(path, params, prefer, body or {})
+            if request.method == "DELETE":
+                return self._delete(path, params, prefer)
+            raise PostgRESTError(405, "PGRST117", f"Método não suportado: {request.method}")
+        except PostgRESTError as e:
+            return _json_response(e.status, e.body())
+        except sqlite3.IntegrityError as e:
+            # Como o Postgres: CHECK/NOT NULL -> 400, UNIQUE/chave estrangeira -> 409
+            status = 400 if "CHECK" in str(e) or "NOT NULL" in str(e) else 409
+            return _json_response(status, PostgRESTError(status, "23000", str(e)).body())
+        except (ValueError, TypeError, sqlite3.InterfaceError, sqlite3.ProgrammingError) as e:
+            return _json_response(400, PostgRESTError(400, "PGRST100", str(e)).body())
+
+    def _check_column(self, table: str, column: str):
+        if column not in self._columns[table]:
+            raise PostgRESTError(400, "42703", f"column {table}.{column} does not exist")
+
+    def _value(self, table: str, column: str, raw: str) -> Any:
+        """Valor de filtro: sem aspas; true/false em colunas BOOLEAN viram 1/0 e
+        instantes com fuso em colunas TIMESTAMP viram texto UTC"""
+        value = _unquote(raw)
+        if self._columns[table][column] == "BOOLEAN" and value.lower() in ("true", "false"):
+            return 1 if value.lower() == "true" else 0
+        if self._columns[table][column] == "TIMESTAMP":
+            try:
+                return _utc_text(value)
+            except ValueError:
+                return value
+        return value
+
+    def _condition(self, table: str, column: str, condition: str) -> Tuple[str, List[Any]]:
+        """coluna + 'op.valor' do PostgREST -> (SQL, argumentos)"""
+        self._check_column(table, column)
+        negate = condition.startswith("not.")
+        if negate:
+            condition = condition[len("not."):]
+        operator, _, raw = condition.partition(".")
+        quoted = f'"{column}"'
+
+        if operator == "in":
+            values = [self._value(table, column, item) for item in _split_top(raw.strip()[1:-1])]
+            sql, args = (f"{quoted} IN ({','.join('?' * len(values))})", values) if values else ("0", [])
+        elif operator == "is":
+            if raw.lower() != "null":
+                raise PostgRESTError(400, "PGRST100", f"Valor inválido para is: {raw}")
+            sql, args = f"{quoted} IS NULL", []
+        elif operator in _COMPARISONS:
+            sql, args = f"{quoted} {_COMPARISONS[operator]} ?", [self._value(table, column, raw)]
+        else:
+            raise PostgRESTError(400, "PGRST100", f"Operador inválido: {operator}")
+        return (f"NOT ({sql})" if negate else sql), args
+
+    def _logic(self, table: str, expression: str) -> Tuple[str, List[Any]]:
+        """or(...)/and(...) com condições 'coluna.op.valor' e grupos aninhados"""
+        match = _LOGIC_RE.match(expression)
+        if not match:
+            raise PostgRESTError(400, "PGRST100", f"Filtro lógico inválido: {expression}")
+        operator, inner = match.groups()
+        clauses, args = [], []
+        for item in _split_top(inner):
+            if _LOGIC_RE.match(item):
+                sql, item_args = self._logic(table, item)
+            else:
+                column, _, condition = item.partition(".")
+                sql, item_args = self._condition(table, column, condition)
+            clauses.append(f"({sql})")
+            args.extend(item_args)
+        if not clauses:
+            raise PostgRESTError(400, "PGRST100", f"Filtro lógico vazio: {expression}")
+        sql = f" {operator.upper()} ".join(clauses)
+        if operator == "or":
+            # Limite comum a todos os ramos (keyset: created_at.lt.X ou created_at.eq.X
+            # -> created_at <= X) vira um intervalo que o SQLite busca pelo índice
+            for column, comparison, raw in self._implied_bounds(_split_top(inner)):
+                sql = f'({sql}) AND "{column}" {comparison} ?'
+                args.append(self._value(table, column, raw))
+        return f"({sql})", args
+
+    @staticmethod
+    def _implied_bounds(items: List[str]) -> List[Tuple[str, str, str]]:
+        """(coluna, <= ou >=, valor) que vale em todos os ramos de um or"""
+        common = None
+        for item in items:
+            match = _LOGIC_RE.match(item)
+            if match and match.group(1) != "and":
+                return []
+            bounds = set()
+            for condition in (_split_top(match.group(2)) if match else [item]):
+                column, _, rest = condition.partition(".")
+                operator, _, raw = rest.partition(".")
+                if operator in ("lt", "eq"):
+                    bounds.add((column, "<=", raw))
+                if operator in ("gt", "gte", "eq"):
+                    bounds.add((column, ">=", raw))
+            common = bounds if common is None else common & bounds
+        return sorted(common or [])
+
+    def _where(self, table: str, params: Sequence[Tuple[str, str]]) -> Tuple[str, List[Any]]:
+        """WHERE com todos os filtros da URL (a mesma coluna pode repetir: gte + lt)"""
+        clauses, args = [], []
+        for key, value in params:
+            if key in _RESERVED_PARAMS:
+                continue
+            if key == "or":
+                sql, item_args = self._logic(table, f"{key}{value}")
+            else:
+                sql, item_args = self._condition(table, key, value)
+            clauses.append(sql)
+            args.extend(item_args)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), args
+
+    def _order_by(self, table: str, order: Optional[str]) -> str:
+        """order=created_at.desc,id.desc -> ORDER BY "created_at" DESC NULLS FIRST, ...
+        (NULLs onde o Postgres põe, como o keyset_filter de database.py espera)"""
+        if not order:
+            return ""
+        terms = []
+        for column, desc, nulls_first in order_terms(order.split(",")):
+            self._check_column(table, column)
+            terms.append(f'"{column}" {"DESC" if desc else "ASC"} NULLS {"FIRST" if nulls_first else "LAST"}')
+        return " ORDER BY " + ", ".join(terms)
+
+    def _select_list(self, table: str, select: str) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str, str]]]:
+        """
+        select do PostgREST -> ([(nome na resposta, coluna)], [(nome, relação, select da relação)])
+        Aceita *, coluna, apelido:coluna e relação(colunas) (sem apelido)
+        """
+        columns, embeds = [], []
+        for item in _split_top(select or "*"):
+            embedded = _EMBED_RE.match(item)
+            if embedded:
+                relation, relation_select = embedded.groups()
+                if relation not in self._columns:
+                    raise PostgRESTError(400, "PGRST200", f"Relação não encontrada: {relation}")
+                embeds.append((relation, relation, relation_select))
+            elif item == "*":
+                columns.extend((column, column) for column in self._columns[table])
+            else:
+                alias, _, column = item.rpartition(":")
+                self._check_column(table, column)
+                columns.append((alias or column, column))
+        return columns, embeds
+
+    def _fetch(self, conn: sqlite3.Connection, table: str, select: str, where: str = "", args: Sequence[Any] = (),
+               order: str = "", limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """SELECT com projeção e relações embutidas; linhas no formato JSON do PostgREST"""
+        columns, embeds = self._select_list(table, select)
+        links = []
+        for name, relation, relation_select in embeds:
+            if relation not in self._foreign_keys[table]:
+                raise PostgRESTError(400, "PGRST200", f"Sem chave estrangeira de {table} para {relation}")
+            local, remote = self._foreign_keys[table][relation]
+            links.append((name, relation, relation_select, local, remote))
+
+        # Colunas de ligação entram na consulta mesmo se não foram pedidas
+        wanted = [column for _, column in columns]
+        fetched = list(dict.fromkeys(wanted + [link[3] for link in links]))
+        sql = f'SELECT {", ".join(f"{chr(34)}{c}{chr(34)}" for c in fetched) or "1"} FROM "{table}"{where}{order}'
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        raw_rows = conn.execute(sql, list(args)).fetchall()
+
+        booleans = {column for column, kind in self._columns[table].items() if kind == "BOOLEAN"}
+        rows = []
+        for raw in raw_rows:
+            row = {}
+            for name, column in columns:
+                value = raw[column]
+                row[name] = bool(value) if column in booleans and value is not None else value
+            rows.append(row)
+
+        for name, relation, relation_select, local, remote in links:
+            keys = list({raw[local] for raw in raw_rows if raw[local] is not None})
+            related: Dict[Any, Dict[str, Any]] = {}
+            key_alias = "__key__"
+            for start in range(0, len(keys), _IN_CHUNK):
+                chunk = keys[start:start + _IN_CHUNK]
+                found = self._fetch(conn, relation, f"{relation_select},{key_alias}:{remote}",
+                                    f' WHERE "{remote}" IN ({",".join("?" * len(chunk))})', chunk)
+                for item in found:
+                    related[item.pop(key_alias)] = item
+            for row, raw in zip(rows, raw_rows):
+                row[name] = related.get(raw[local])
+        return rows
+
+    def _get(self, table: str, params, prefer: Dict[str, str]) -> httpx.Response:
+        where, args = self._where(table, params)
+        select = _param(params, "select", "*")
+        limit = _param(params, "limit")
+        limit = None if limit is None else max(0, int(limit))
+        with self.transaction() as conn:
+            total = None
+            if "count" in prefer:
+                total = conn.execute(f'SELECT COUNT(*) FROM "{table}"{where}', args).fetchone()[0]
+            rows = self._fetch(conn, table, select, where, args, self._order_by(table, _param(params, "order")), limit)
+        return _json_response(200, rows, {"content-range": _content_range(len(rows), total)})
+
+    def _rows_by_rowid(self, conn: sqlite3.Connection, table: str, select: str, rowids: List[int]) -> List[Dict[str, Any]]:
+        rows = []
+        for start in range(0, len(rowids), _IN_CHUNK):
+            chunk = rowids[start:start + _IN_CHUNK]
+            rows.extend(self._fetch(conn, table, select, f' WHERE rowid IN ({",".join("?" * len(chunk))})', chunk,
+                                    ' ORDER BY rowid'))
+        return rows
+
+    def _columns_of(self, table: str, row: Dict[str, Any]) -> List[str]:
+        for column in row:
+            self._check_column(table, column)
+        return list(row)
+
+    def _post(self, table: str, params, prefer: Dict[str, str], body: Any) -> httpx.Response:
+        """INSERT de um objeto ou array (upsert não: o app não usa)"""
+        if "resolution" in prefer:
+            raise PostgRESTError(400, "PGRST100", f"Prefer resolution não suportado: {prefer['resolution']}")
+        rows = body if isinstance(body, list) else [body or {}]
+
+        def statement(columns: Sequence[str]) -> str:
+            if not columns:
+                return f'INSERT INTO "{table}" DEFAULT VALUES'
+            return (f'INSERT INTO "{table}" ({", ".join(f"{chr(34)}{c}{chr(34)}" for c in columns)}) '
+                    f'VALUES ({", ".join("?" * len(columns))})')
+
+        with self.transaction(write=True) as conn:
+            if prefer.get("return") != "representation":
+                # Lotes: linhas com as mesmas colunas vão num executemany
+                groups: Dict[Tuple[str, ...], List[List[Any]]] = {}
+                for row in rows:
+                    groups.setdefault(tuple(self._columns_of(table, row)), []).append(list(row.values()))
+                for columns, values in groups.items():
+                    conn.executemany(statement(columns), values)
+                return _json_response(201)
+
+            rowids = [conn.execute(statement(self._columns_of(table, row)), list(row.values())).lastrowid for row in rows]
+            result = self._rows_by_rowid(conn, table, _param(params, "select", "*"), rowids)
+        return _json_response(201, result)
+
+    def _patch(self, table: str, params, prefer: Dict[str, str], body: Dict[str, Any]) -> httpx.Response:
+        where, args = self._where(table, params)
+        representation = prefer.get("return") == "representation"
+        columns = self._columns_of(table, body)
+        if not columns:
+            return _json_response(200, [] if representation else None)
+        with self.transaction(write=True) as conn:
+            rowids = [row[0] for row in conn.execute(f'SELECT rowid FROM "{table}"{where}', args)] if representation else []
+            assignments = ", ".join(f'"{column}" = ?' for column in columns)
+            conn.execute(f'UPDATE "{table}" SET {assignments}{where}', [body[c] for c in columns] + args)
+            result = self._rows_by_rowid(conn, table, _param(params, "select", "*"), rowids) if representation else None
+        return _json_response(200, result)
+
+    def _delete(self, table: str, params, prefer: Dict[str, str]) -> httpx.Response:
+        where, args = self._where(table, params)
+        representation = prefer.get("return") == "representation"
+        with self.transaction(write=True) as conn:
+            result = None
+            if representation:
+                rowids = [row[0] for row in conn.execute(f'SELECT rowid FROM "{table}"{where}', args)]
+                result = self._rows_by_rowid(conn, table, _param(params, "select", "*"), rowids)
+            conn.execute(f'DELETE FROM "{table}"{where}', args)
+        return _json_response(200, result)
+
+    # ----------------------------------------
+    # Funções (rpc) do database_schema.sql
+    # ----------------------------------------
+
+    def rpc(self, function: str, params: Dict[str, Any]) -> Any:
+        method = getattr(self, f"rpc_{function}", None)
+        if method is None:
+            raise PostgRESTError(404, "PGRST202", f"Função não encontrada: {function}")
+        return method(**params)
+
+    def _client_row(self, conn: sqlite3.Connection, client_id: int) -> Optional[Dict[str, Any]]:
+        rows = self._fetch(conn, "clients", "*", ' WHERE "id" = ?', [client_id])
+        return rows[0] if rows else None
+
+    def _adjust_balance(self, conn: sqlite3.Connection, client_id: int, amount: float, operation: str) -> Optional[Dict[str, Any]]:
+        deposit = operation == "add"
+        conn.execute(
+            """UPDATE clients
+               SET saldo = ROUND(COALESCE(saldo, 0) + ?, 2),
+                   total_deposits = ROUND(COALESCE(total_deposits, 0) + ?, 2),
+                   total_withdrawals = ROUND(COALESCE(total_withdrawals, 0) + ?, 2)
+               WHERE id = ?""",
+            [amount if deposit else -amount, amount if deposit else 0, 0 if deposit else amount, client_id],
+        )
+        return self._client_row(conn, client_id)
+
+    def rpc_adjust_client_balance(self, p_client_id: int, p_amount: float, p_operation: str = "add") -> List[Dict[str, Any]]:
+        """Ajuste de saldo (add/subtract) numa transação; retorna [cliente] ou []
+        Gêmea de adjust_client_balance() em database_schema.sql"""
+        with self.transaction(write=True) as conn:
+            client = self._adjust_balance(conn, p_client_id, float(p_amount), p_operation)
+        return [client] if client else []
+
+    def rpc_credit_proof(self, p_proof_id: int) -> Dict[str, Any]:
+        """Cria o depósito do comprovante, ajusta o saldo e marca como depositado (uma transação)
+        Gêmea de credit_proof() em database_schema.sql"""
+        with self.transaction(write=True) as conn:
+            proof = conn.execute("SELECT * FROM proofs WHERE id = ?", [p_proof_id]).fetchone()
+            if proof is None:
+                return {"error": "Comprovante não encontrado", "status": 404}
+            if proof["deposited"]:
+                return {"error": "Este comprovante já foi creditado anteriormente", "status": 400}
+            if proof["extraction_status"] not in ("EXTRACTED", "EXTRACTED_WITH_ERROR"):
+                return {"error": "Comprovante não tem valor extraído", "status": 400}
+            if proof["extracted_value"] is None or proof["extracted_value"] <= 0:
+                return {"error": "Valor inválido", "status": 400}
+
+            # Mesma ordem do credit_proof do Postgres: saldo antes do lançamento
+            client = self._adjust_balance(conn, proof["client_id"], proof["extracted_value"], "add")
+            cursor = conn.execute(
+                "INSERT INTO transactions (client_id, amount, type, status, description, proof_id) "
+                "VALUES (?, ?, 'DEPOSIT', 'COMPLETED', ?, ?)",
+                [proof["client_id"], proof["extracted_value"], f"Depósito de {proof['filename']}", p_proof_id],
+            )
+            conn.execute("UPDATE proofs SET deposited = 1 WHERE id = ?", [p_proof_id])
+        return {
+            "transaction_id": cursor.lastrowid,
+            "client_id": proof["client_id"],
+            "amount": proof["extracted_value"],
+            "client_saldo": (client or {}).get("saldo") or 0,
+        }
+
+    def rpc_reverse_deposit(self, p_transaction_id: int) -> Dict[str, Any]:
+        """Remove um depósito e desconta o valor do saldo (uma transação)
+        Gêmea de reverse_deposit() em database_schema.sql"""
+        with self.transaction(write=True) as conn:
+            transaction = conn.execute(
+                "SELECT client_id, amount FROM transactions WHERE id = ? AND type = 'DEPOSIT'", [p_transaction_id]
+            ).fetchone()
+            if transaction is None:
+                return {"error": "Depósito não encontrado", "status": 404}
+            client = self._adjust_balance(conn, transaction["client_id"], transaction["amount"], "subtract")
+            conn.execute("DELETE FROM transactions WHERE id = ?", [p_transaction_id])
+        return {
+            "client_id": transaction["client_id"],
+            "amount": transaction["amount"],
+            "client_saldo": (client or {}).get("saldo") or 0,
+        }
+
+    def rpc_approve_withdrawal(self, p_withdrawal_id: int, p_client_id: int,
+                               p_admin_notes: Optional[str] = None) -> Dict[str, Any]:
+        """Conclui um saque pendente e desconta o valor do saldo (uma transação)
+        Gêmea de approve_withdrawal() em database_schema.sql"""
+        with self.transaction(write=True) as conn:
+            updated = conn.execute(
+                "UPDATE transactions SET status = 'COMPLETED', admin_notes = COALESCE(?, admin_notes) "
+                "WHERE id = ? AND client_id = ? AND type = 'WITHDRAWAL' AND status = 'PENDING'",
+                [p_admin_notes, p_withdrawal_id, p_client_id],
+            ).rowcount
+            rows = self._fetch(conn, "transactions", "*", ' WHERE "id" = ? AND "client_id" = ? AND "type" = ?',
+                               [p_withdrawal_id, p_client_id, "WITHDRAWAL"])
+            if not rows:
+                return {"error": "Saque não encontrado", "status": 404}
+            if not updated:
+                return {"error": "Saque não está pendente", "status": 409}
+            client = self._adjust_balance(conn, p_client_id, rows[0]["amount"], "subtract")
+        return {"withdrawal": rows[0], "client_saldo": (client or {}).get("saldo") or 0}
+
+    @staticmethod
+    def _stored_stats(conn: sqlite3.Connection) -> Dict[str, Any]:
+        row = conn.execute(
+            "SELECT total_clients, clientes_em_negativo, total_depositos, total_saques, total_comprovantes, total_operations "
+            "FROM global_stats WHERE id = 1"
+        ).fetchone()
+        return dict(row) if row else {}
+
+    @staticmethod
+    def _verify(conn: sqlite3.Connection) -> Dict[str, Any]:
+        """Armazenado x recalculado (views *_computed de database_schema_sqlite.sql)"""
+        stored = SQLiteStore._stored_stats(conn)
+        computed = dict(conn.execute("SELECT * FROM global_stats_computed").fetchone())
+        daily_mismatches = conn.execute("SELECT COUNT(*) FROM daily_stats_mismatches").fetchone()[0]
+        same = all(round(float(stored.get(key) or 0), 2) == round(float(value or 0), 2) for key, value in computed.items())
+        return {
+            "consistent": same and daily_mismatches == 0,
+            "stored": stored,
+            "computed": computed,
+            "daily_mismatches": daily_mismatches,
+        }
+
+    def rpc_get_global_statistics(self) -> Dict[str, Any]:
+        """Totais do dashboard lidos de global_stats (mantida pelos triggers)
+        Gêmea de get_global_statistics() em database_schema.sql"""
+        with self.transaction() as conn:
+            return self._stored_stats(conn)
+
+    def rpc_verify_global_stats(self) -> Dict[str, Any]:
+        """Gêmea de verify_global_stats() em database_schema.sql"""
+        with self.transaction() as conn:
+            return self._verify(conn)
+
+    def rpc_rebuild_global_stats(self) -> Dict[str, Any]:
+        """Reconstrói global_stats e daily_stats (escritas ficam bloqueadas durante o recálculo)
+        Gêmea de rebuild_global_stats() em database_schema.sql"""
+        with self.transaction(write=True) as conn:
+            before = self._verify(conn)
+            conn.execute("INSERT OR IGNORE INTO global_stats (id) VALUES (1)")
+            conn.execute(
+                """UPDATE global_stats
+                   SET (total_clients, clientes_em_negativo, total_depositos, total_saques, total_comprovantes,
+                        total_operations) = (SELECT * FROM global_stats_computed),
+                       updated_at = strftime('%Y-%m-%dT%H:%M:%f', 'now')
+                   WHERE id = 1"""
+            )
+            conn.execute("DELETE FROM daily_stats")
+            conn.execute("INSERT INTO daily_stats SELECT * FROM daily_stats_computed")
+            after = self._verify(conn)
+        return {"before": before, "after": after}
+
+    def rpc_get_history_totals(self, p_client_id: Optional[int] = None, p_date_from: Optional[str] = None,
+                               p_date_to: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Totais do histórico (COMPLETED) no período [p_date_from, p_date_to): o global
+        em dias inteiros (fuso do negócio) soma daily_stats, os demais usam os índices
+        de transactions. Gêmea de get_history_totals() em database_schema.sql
+        """
+        with self.transaction() as conn:
+            if p_client_id is None and _business_midnight(p_date_from) and _business_midnight(p_date_to):
+                day_from = business_day(p_date_from) if p_date_from else None
+                day_to = business_day(p_date_to) if p_date_to else None
+                row = conn.execute(
+                    """SELECT COALESCE(SUM(total_depositos), 0), COALESCE(SUM(total_saques), 0),
+                              COALESCE(SUM(deposit_count + withdrawal_count), 0)
+                       FROM daily_stats
+                       WHERE (? IS NULL OR day >= ?) AND (? IS NULL OR day < ?)""",
+                    [day_from, day_from, day_to, day_to],
+                ).fetchone()
+            else:
+                clauses, args = ["status = 'COMPLETED'"], []
+                if p_client_id is not None:
+                    clauses.append("client_id = ?")
+                    args.append(p_client_id)
+                if p_date_from:
+                    clauses.append("created_at >= ?")
+                    args.append(_utc_text(p_date_from))
+                if p_date_to:
+                    clauses.append("created_at < ?")
+                    args.append(_utc_text(p_date_to))
+                row = conn.execute(
+                    f"""SELECT COALESCE(SUM(CASE WHEN type = 'DEPOSIT' THEN amount END), 0),
+                               COALESCE(SUM(CASE WHEN type = 'WITHDRAWAL' THEN amount END), 0),
+                               COUNT(*)
+                        FROM transactions WHERE {' AND '.join(clauses)}""",
+                    args,
+                ).fetchone()
+        return {"total_deposits": round(row[0], 2), "total_withdrawals": round(row[1], 2), "total": row[2]}
+
+
+class SQLiteTransport(httpx.BaseTransport):
+    """Transport do SupabaseClient (síncrono): as requisições vão para o SQLite"""
+
+    def __init__(self, store: Optional[SQLiteStore] = None):
+        self.store = store or get_sqlite_store()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.read()
+        return self.store.handle(request)
+
+
+class AsyncSQLiteTransport(httpx.AsyncBaseTransport):
+    """
+    Transport do AsyncSupabaseClient: cada requisição roda numa thread do
+    executor (com a conexão SQLite dela), sem bloquear o event loop
+    """
+
+    def __init__(self, store: Optional[SQLiteStore] = None):
+        self.store = store or get_sqlite_store()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        return await asyncio.to_thread(self.store.handle, request)
+
+
+# Global store instance
+_store: Optional[SQLiteStore] = None
+_store_lock = threading.Lock()
+
+def get_sqlite_store() -> SQLiteStore:
+    """Get or create the SQLite store (SQLITE_PATH)"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SQLiteStore()
+        return _store
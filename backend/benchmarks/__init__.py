@@ -0,0 +1 @@
+"""Scripts de benchmark do backend (executar de dentro de backend/ com python -m)"""
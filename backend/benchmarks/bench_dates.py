@@ -0,0 +1,73 @@
+"""
+Microbenchmark da conversão de datas em ISO
+Compara date_to_iso (padrões pré-compilados) com o caminho anterior:
+import do dateutil + dateutil.parser.parse(dayfirst=True) por candidato
+
+Uso:
+    cd backend
+    python -m benchmarks.bench_dates [--dates 20000]
+"""
+import argparse
+import random
+import time
+
+from dateutil import parser as dateparser
+
+from app.extractors import date_to_iso
+
+
+def legacy_date_to_iso(date_str: str):
+    """Conversão usada antes (import dentro da função, dateutil genérico)"""
+    try:
+        from dateutil import parser as dateparser
+        parsed_date = dateparser.parse(date_str, dayfirst=True)
+        return parsed_date.date().isoformat() if parsed_date else None
+    except Exception:
+        return None
+
+
+def build_dates(rng: random.Random, count: int):
+    """Datas nos formatos numéricos que o scanner emitia antes"""
+    dates = []
+    for _ in range(count):
+        day, month, year = rng.randint(1, 28), rng.randint(1, 12), rng.randint(2020, 2026)
+        sep = rng.choice("/-")
+        if rng.random() < 0.8:
+            dates.append(f"{day:02d}{sep}{month:02d}{sep}{year}")
+        else:
+            dates.append(f"{year}{sep}{month:02d}{sep}{day:02d}")
+    return dates
+
+
+def bench(fn, dates) -> float:
+    start = time.perf_counter()
+    for date_str in dates:
+        fn(date_str)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark da conversão de datas")
+    parser.add_argument("--dates", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    dates = build_dates(random.Random(args.seed), args.dates)
+    dateparser.parse("01/01/2025")  # aquecimento do dateutil
+
+    print(f"🔍 {len(dates)} datas")
+    legacy = bench(legacy_date_to_iso, dates)
+    fast = bench(date_to_iso, dates)
+    print(f"   dateutil     {legacy:7.3f} s  ({legacy / len(dates) * 1e6:6.1f} µs/data)")
+    print(f"   date_to_iso  {fast:7.3f} s  ({fast / len(dates) * 1e6:6.1f} µs/data)")
+
+    # Divergências esperadas: AAAA-MM-DD com dia <= 12 (dayfirst invertia dia e mês)
+    diverging = [d for d in dates if date_to_iso(d) != legacy_date_to_iso(d)]
+    print(f"   divergências: {len(diverging)} (ex: {diverging[0]} -> {date_to_iso(diverging[0])} "
+          f"vs {legacy_date_to_iso(diverging[0])})" if diverging else "   divergências: 0")
+
+    print(f"\n✅ date_to_iso {legacy / fast:.1f}x mais rápido")
+
+
+if __name__ == "__main__":
+    main()
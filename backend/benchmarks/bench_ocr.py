@@ -0,0 +1,74 @@
+"""
+Benchmark de latência por imagem dos backends de OCR
+Compara pytesseract (um processo por chamada) com tesserocr (engine persistente)
+
+Uso:
+    cd backend
+    python -m benchmarks.bench_ocr [--iterations 20] [--image comprovante.png]
+"""
+import argparse
+import statistics
+import time
+
+from PIL import Image, ImageDraw
+
+from app.extractors import TESSEROCR_AVAILABLE, PytesseractEngine, TesserocrEngine
+
+SAMPLE_LINES = [
+    "Comprovante de Transferência PIX",
+    "Valor R$ 1.250,00",
+    "Data 03/11/2025",
+    "Favorecido Nome: JOAO DA SILVA CPF ***.123.456-**",
+    "ID da transação: E12345678202511031234abcdef12345",
+]
+
+
+def build_sample_image() -> Image.Image:
+    """Gera um 'print' de comprovante pequeno, como os enviados pelos clientes"""
+    image = Image.new("L", (900, 60 * len(SAMPLE_LINES) + 40), color=255)
+    draw = ImageDraw.Draw(image)
+    for i, line in enumerate(SAMPLE_LINES):
+        draw.text((30, 30 + i * 60), line, fill=0)
+    return image
+
+
+def bench_engine(engine, image: Image.Image, iterations: int):
+    """Retorna latências (ms) de cada chamada"""
+    # Aquecimento: primeira chamada carrega o modelo
+    engine.image_to_string(image)
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        engine.image_to_string(image)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos backends de OCR")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--image", help="Imagem a usar (padrão: comprovante sintético)")
+    args = parser.parse_args()
+
+    image = Image.open(args.image) if args.image else build_sample_image()
+
+    engines = [PytesseractEngine()]
+    if TESSEROCR_AVAILABLE:
+        engines.append(TesserocrEngine())
+    else:
+        print("⚠️  tesserocr não instalado: medindo só pytesseract (pip install tesserocr)")
+
+    print(f"🔍 {args.iterations} iterações por backend | imagem {image.size[0]}x{image.size[1]}")
+    results = {}
+    for engine in engines:
+        timings = bench_engine(engine, image, args.iterations)
+        results[engine.name] = statistics.median(timings)
+        print(f"   {engine.name:<12} mediana {statistics.median(timings):8.1f} ms | "
+              f"p95 {sorted(timings)[int(len(timings) * 0.95) - 1]:8.1f} ms")
+
+    if len(results) == 2:
+        print(f"\n✅ tesserocr {results['pytesseract'] / results['tesserocr']:.1f}x mais rápido por imagem")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Microbenchmark dos parsers de campos sobre dumps longos de OCR
+Compara o scanner único (find_fields) com as quatro varreduras
+independentes usadas antes (uma regex por campo, rótulos recompilados)
+
+Uso:
+    cd backend
+    python -m benchmarks.bench_parsers [--documents 200] [--pages 10]
+"""
+import argparse
+import random
+import re
+import time
+
+from app.extractors import find_fields
+
+# Padrões e fluxo da versão anterior (quatro varreduras), mantidos como referência
+LEGACY_AMOUNT_RE = re.compile(r"""
+(?:(?:valor|value|amount|total|quantia)\s*(?:R\$|BRL|USD|US\$)?\s*(\d{1,3}(?:\.\d{3})*,\d{2}))|
+(?:(?:R\$|BRL)\s*(\d{1,3}(?:\.\d{3})*,\d{2}))|
+(?:(?:US\$|\$)\s*(\d{1,3}(?:,\d{3})*\.\d{2}))|
+(?:\b(\d{1,3}(?:\.\d{3})*,\d{2})\b)
+""", re.IGNORECASE | re.VERBOSE)
+LEGACY_DATE_RE = re.compile(r'(\d{1,2}[\/\-]\d{1,2}[\/\-]\d{4})|(\d{4}[\/\-]\d{1,2}[\/\-]\d{1,2})')
+LEGACY_BENEFICIARY_RE = re.compile(r'''
+(?:Favorecido\s+Nome\s*[:\-]?\s*([A-Z][A-Za-z0-9\.\s\-&]+?)(?=\s+(?:CPF|CNPJ|Institui|Chave|Conta|Data)))|
+(?:(?:Beneficiário|Beneficiario|Para)\s*[:\-]?\s*([A-Z][A-Za-z0-9\.\s\-&]{2,80}))
+''', re.IGNORECASE | re.VERBOSE | re.MULTILINE)
+LEGACY_ENDTOEND_RE = re.compile(r'''
+(?:\b(E\d{11,20}[a-zA-Z0-9]{10,20})\b)|
+(?:(?:id\s*(?:da\s*)?transa[çc][ãa]o|end\s*to\s*end|endtoend|e2e)\s*[:\-]?\s*([A-Za-z0-9]{15,50}))
+''', re.IGNORECASE | re.VERBOSE)
+
+
+def legacy_find_fields(text: str):
+    """Quatro varreduras completas do texto, como antes do scanner único"""
+    amounts = LEGACY_AMOUNT_RE.findall(text)
+    dates = LEGACY_DATE_RE.findall(text)
+    beneficiary = LEGACY_BENEFICIARY_RE.search(text)
+    if beneficiary:
+        for group in beneficiary.groups():
+            if group:
+                cleaned = re.sub(r'\s+', ' ', group).strip()
+                for label in ['CNPJ', 'CPF', 'Valor', 'R$', 'Data', 'Conta', 'Agência']:
+                    cleaned = re.sub(r'\s+' + re.escape(label) + r'\s*$', '', cleaned, flags=re.IGNORECASE)
+    endtoends = LEGACY_ENDTOEND_RE.findall(text)
+    return amounts, dates, beneficiary, endtoends
+
+
+RECEIPT_LINES = [
+    "Comprovante de Transferência PIX",
+    "Valor R$ {amount}",
+    "Data {day:02d}/{month:02d}/2025",
+    "Favorecido Nome: {name} CPF ***.123.456-**",
+    "Instituição BANCO EXEMPLO S.A.",
+    "ID da transação: E{digits}abcdef1234567890",
+    "Tarifa R$ 0,00 | Saldo disponível 12.345,67",
+]
+NAMES = ["JOAO DA SILVA", "MARIA SOUZA LTDA", "ACME COMERCIO ME", "PEDRO HENRIQUE ALVES"]
+NOISE = "lorem ipsum 4512 xx-yy // |||| ~~ .. ,, 0O0 l1I "
+
+
+def build_document(rng: random.Random, pages: int) -> str:
+    """Dump de OCR de várias páginas com ruído entre os campos"""
+    parts = []
+    for _ in range(pages):
+        for line in RECEIPT_LINES:
+            parts.append(line.format(
+                amount=f"{rng.randint(1, 999)}.{rng.randint(0, 999):03d},{rng.randint(0, 99):02d}",
+                day=rng.randint(1, 28), month=rng.randint(1, 12),
+                name=rng.choice(NAMES), digits="".join(rng.choice("0123456789") for _ in range(18)),
+            ))
+            parts.append(NOISE * rng.randint(1, 6))
+    return "\n".join(parts)
+
+
+def bench(fn, corpus) -> float:
+    start = time.perf_counter()
+    for text in corpus:
+        fn(text)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark dos parsers de campos")
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpus = [build_document(rng, args.pages) for _ in range(args.documents)]
+    megabytes = sum(len(text) for text in corpus) / 1_000_000
+
+    print(f"🔍 {args.documents} documentos | {megabytes:.1f} MB de texto OCR")
+    legacy = bench(legacy_find_fields, corpus)
+    single = bench(find_fields, corpus)
+    print(f"   quatro varreduras  {legacy:7.3f} s  ({megabytes / legacy:6.1f} MB/s)")
+    print(f"   scanner único      {single:7.3f} s  ({megabytes / single:6.1f} MB/s)")
+    print(f"\n✅ scanner único {legacy / single:.2f}x a vazão anterior")
+
+
+if __name__ == "__main__":
+    main()
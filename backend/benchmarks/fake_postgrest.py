@@ -0,0 +1,161 @@
+"""
+PostgREST simulado em memória (httpx.MockTransport) para os benchmarks
+Entende o subconjunto que o app usa: select com colunas e relações embutidas
+(clients(name)), eq./in./gt./gte./lt., or= do keyset, order, limit, Range,
+count=exact e as funções get_history_totals/get_global_statistics. Conta as
+requisições e os bytes de resposta por tabela (e quantos seriam com select=*)
+latency simula o tempo de resposta do banco (cada requisição espera esse tempo)
+As tabelas ficam em ordem de id: order=id.asc e id=gt. usam essa ordem (como o
+índice da chave primária), sem copiar a tabela a cada página
+"""
+import asyncio
+import itertools
+import json
+import re
+from collections import Counter
+
+import httpx
+
+from app import database
+
+FAKE_REST_URL = "http://postgrest.local/rest/v1"
+
+_EMBED_RE = re.compile(r"^(\w+)\((.*)\)$")
+_KEYSET_RE = re.compile(r'^\(created_at\.(lt|gt)\."([^"]*)",and\(created_at\.eq\."[^"]*",id\.(?:lt|gt)\.(\d+)\)\)$')
+
+
+class FakePostgREST:
+    """PostgREST mínimo sobre listas de dicts; conta requisições e bytes por tabela"""
+
+    def __init__(self, tables, latency: float = 0.0):
+        self.tables = tables
+        self.latency = latency
+        self.requests = Counter()
+        self.bytes = Counter()
+        self.full_bytes = Counter()
+
+    def install(self):
+        """Aponta o cliente assíncrono do app para este fake (no event loop atual)"""
+        database.REST_URL = FAKE_REST_URL
+        handler = self.handle_with_latency if self.latency else self.handle
+        database._async_client = database.AsyncSupabaseClient(transport=httpx.MockTransport(handler))
+        database._async_client_loop = asyncio.get_running_loop()
+
+    def sync_client(self) -> database.SupabaseClient:
+        """SupabaseClient (síncrono, como nos scripts) apontando para este fake"""
+        database.REST_URL = FAKE_REST_URL
+        return database.SupabaseClient(transport=httpx.MockTransport(self.handle))
+
+    async def handle_with_latency(self, request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(self.latency)
+        return self.handle(request)
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        name = request.url.path.rsplit("/", 1)[-1]
+        self.requests[name] += 1
+        if "/rpc/" in request.url.path:
+            result = getattr(self, f"rpc_{name}")(json.loads(request.content or b"{}"))
+            self.full_bytes[name] += len(json.dumps(result).encode())
+            return self._respond(name, result)
+
+        params = request.url.params.multi_items()
+        options = dict(params)
+        matching = lambda: (row for row in self._candidates(name, params) if self._matches(row, params))
+        rows = matching()
+        if options.get("order", "id.asc") != "id.asc":
+            rows = list(rows)
+            for part in reversed(options["order"].split(",")):
+                column, _, direction = part.partition(".")
+                rows.sort(key=lambda row: row[column], reverse=direction == "desc")
+        offset, limit = 0, options.get("limit")
+        if "range" in request.headers:
+            first, _, last = request.headers["range"].partition("-")
+            offset, limit = int(first), int(last) - int(first) + 1
+        rows = list(itertools.islice(rows, offset, None if limit is None else offset + int(limit)))
+        self.full_bytes[name] += len(json.dumps(rows).encode())
+        rows = [self._project(row, options.get("select", "*")) for row in rows]
+
+        headers = {}
+        if "count=" in request.headers.get("prefer", ""):
+            total = sum(1 for _ in matching())
+            headers["content-range"] = f"{offset}-{offset + len(rows) - 1}/{total}" if rows else f"*/{total}"
+        return self._respond(name, rows, headers)
+
+    def _candidates(self, name, params):
+        """Linhas a partir do id=gt. (busca binária na tabela em ordem de id)"""
+        table = self.tables[name]
+        after = next((int(value[3:]) for column, value in params if column == "id" and value.startswith("gt.")), None)
+        lo, hi = 0, len(table)
+        while after is not None and lo < hi:
+            mid = (lo + hi) // 2
+            if table[mid]["id"] <= after:
+                lo = mid + 1
+            else:
+                hi = mid
+        return itertools.islice(table, lo, None)
+
+    def _respond(self, name, payload, headers=None) -> httpx.Response:
+        body = json.dumps(payload).encode()
+        self.bytes[name] += len(body)
+        return httpx.Response(200, content=body, headers={"content-type": "application/json", **(headers or {})})
+
+    def _project(self, row, select: str):
+        if select == "*":
+            return dict(row)
+        result = {}
+        for item in select.split(","):
+            embedded = _EMBED_RE.match(item)
+            if embedded:
+                relation, columns = embedded.groups()
+                related = next((r for r in self.tables[relation] if r["id"] == row[relation[:-1] + "_id"]), None)
+                result[relation] = self._project(related, columns) if related else None
+            else:
+                result[item] = row[item]
+        return result
+
+    @staticmethod
+    def _matches(row, params) -> bool:
+        for column, condition in params:
+            if column in ("select", "order", "limit"):
+                continue
+            if column == "or":
+                direction, created_at, row_id = _KEYSET_RE.match(condition).groups()
+                key, after = (row["created_at"], row["id"]), (created_at, int(row_id))
+                if (key >= after) if direction == "lt" else (key <= after):
+                    return False
+                continue
+            operator, _, value = condition.partition(".")
+            if operator == "eq" and str(row[column]) != value:
+                return False
+            if operator == "in" and str(row[column]) not in value.strip("()").split(","):
+                return False
+            if operator == "gt" and not row[column] > type(row[column])(value):
+                return False
+            if operator == "gte" and not row[column] >= value:
+                return False
+            if operator == "lt" and not row[column] < value:
+                return False
+        return True
+
+    def rpc_get_history_totals(self, params):
+        rows = [t for t in self.tables["transactions"] if t["status"] == "COMPLETED"
+                and params.get("p_client_id") in (None, t["client_id"])
+                and (not params.get("p_date_from") or t["created_at"] >= params["p_date_from"])
+                and (not params.get("p_date_to") or t["created_at"] < params["p_date_to"])]
+        return {
+            "total_deposits": sum(t["amount"] for t in rows if t["type"] == "DEPOSIT"),
+            "total_withdrawals": sum(t["amount"] for t in rows if t["type"] == "WITHDRAWAL"),
+            "total": len(rows),
+        }
+
+    def rpc_get_global_statistics(self, params):
+        transactions, clients = self.tables["transactions"], self.tables["clients"]
+        completed = [t for t in transactions if t["status"] == "COMPLETED"]
+        return {
+            "total_clients": len(clients),
+            "clientes_em_negativo": sum(1 for c in clients if c["saldo"] < 0),
+            "total_depositos": sum(t["amount"] for t in completed if t["type"] == "DEPOSIT"),
+            "total_saques": sum(t["amount"] for t in completed if t["type"] == "WITHDRAWAL"),
+            "total_comprovantes": len(self.tables["proofs"]),
+            "total_operations": len(transactions),
+        }
@@ -0,0 +1,152 @@
+"""
+Fuzz + tempo dos parsers de campos sobre textos OCR adversariais e muito grandes
+Para cada padrão adversarial, mede find_fields com tamanhos dobrando:
+em tempo linear, dobrar o texto deve (no máximo) dobrar o tempo
+Depois roda entradas aleatórias montadas com pedaços de comprovante e lixo
+de OCR, conferindo que nada lança exceção nem passa do orçamento por MB, e
+casos de regressão com o resultado esperado (ex: favorecido muito longo)
+
+Uso:
+    cd backend
+    python -m benchmarks.fuzz_extractors [--max-size 400000] [--iterations 300]
+"""
+import argparse
+import random
+import sys
+import time
+
+from app.extractors import FAVORECIDO_MAX_CHARS, find_fields
+
+# Padrões que fazem regexes com quantificadores ilimitados voltarem atrás:
+# (prefixo, unidade repetida) - cada início de match dentro da sequência
+# varre o resto do texto antes de falhar
+ADVERSARIAL = {
+    "milhares sem decimal": ("1", ".234"),
+    "milhares US sem decimal": ("$1", ",234"),
+    "rótulo de valor + espaços": ("valor R$", " "),
+    "favorecido sem CPF": ("", "Favorecido Nome ABC "),
+    "beneficiário sem fim": ("", "Para X "),
+    "rótulo EndToEnd + espaços": ("id da transação", " "),
+    "EndToEnd truncado": ("", "E" + "1" * 25 + " "),
+    "datas quebradas": ("", "12/12/12/"),
+    "dígitos": ("", "0123456789"),
+    "espaços": ("", " \n\t"),
+}
+
+FRAGMENTS = [
+    "Valor R$ ", "R$", "US$", "$", "BRL", "1.250,00", "12,34", "1,234.56", "03/11/2025",
+    "2025-11-03", "Favorecido Nome:", "Beneficiário:", "Para", "CPF", "CNPJ", "Data",
+    "ID da transação:", "E2E", "EndToEnd", "E12345678202511031234abcdef12345",
+    ".", ",", "-", "/", ":", " ", "  ", "\n", "\t", "ÃƒÂ¡", "0O0 l1I", "||||",
+]
+
+
+def long_name(size: int) -> str:
+    """Nome em maiúsculas com exatamente size caracteres"""
+    return ("SILVA " * (size // 6 + 1))[:size - 1] + "X"
+
+
+def favorecido_text(name: str) -> str:
+    return f"Comprovante PIX Favorecido Nome: {name} CPF ***.123.456-** Valor R$ 10,00"
+
+
+# (descrição, texto, beneficiário esperado): o nome do favorecido é lido até
+# FAVORECIDO_MAX_CHARS + 1 caracteres; mais longo é rejeitado, não truncado
+REGRESSIONS = [
+    ("favorecido curto", favorecido_text("JOAO DA SILVA"), "JOAO DA SILVA"),
+    ("favorecido no limite", favorecido_text(long_name(FAVORECIDO_MAX_CHARS + 1)), long_name(FAVORECIDO_MAX_CHARS + 1)),
+    ("favorecido acima do limite", favorecido_text(long_name(FAVORECIDO_MAX_CHARS + 2)), None),
+    ("favorecido de 200 caracteres", favorecido_text(long_name(200)), None),
+]
+
+
+def check_regressions() -> bool:
+    ok = True
+    for name, text, expected in REGRESSIONS:
+        found = find_fields(text)['beneficiary']
+        value = found.value if found else None
+        passed = value == expected
+        ok = ok and passed
+        shown = "None" if value is None else f"{len(value)} caracteres"
+        print(f"   {'✅' if passed else '❌'} {name:<30} -> {shown}")
+    return ok
+
+
+def time_scan(text: str) -> float:
+    start = time.perf_counter()
+    find_fields(text)
+    return time.perf_counter() - start
+
+
+def adversarial_text(prefix: str, unit: str, size: int) -> str:
+    return (prefix + unit * (size // len(unit) + 1))[:size]
+
+
+def check_growth(name: str, prefix: str, unit: str, max_size: int, max_ratio: float) -> bool:
+    """Dobra o texto até max_size e compara o tempo do maior com o do anterior"""
+    sizes = []
+    size = max(len(unit), max_size // 8)
+    while size <= max_size:
+        sizes.append(size)
+        size *= 2
+    timings = [time_scan(adversarial_text(prefix, unit, n)) for n in sizes]
+
+    ratio = timings[-1] / max(timings[-2], 1e-6)
+    ok = ratio <= max_ratio
+    print(f"   {'✅' if ok else '❌'} {name:<28} "
+          + " ".join(f"{n // 1000}k={t * 1000:.0f}ms" for n, t in zip(sizes, timings))
+          + f" | x{ratio:.1f} ao dobrar")
+    return ok
+
+
+def random_document(rng: random.Random, size: int) -> str:
+    parts = []
+    length = 0
+    while length < size:
+        fragment = rng.choice(FRAGMENTS)
+        if rng.random() < 0.2:
+            fragment *= rng.randint(2, 200)
+        parts.append(fragment)
+        length += len(fragment)
+    return "".join(parts)[:size]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fuzz e tempo dos parsers de campos")
+    parser.add_argument("--max-size", type=int, default=400_000, help="Maior texto adversarial (caracteres)")
+    parser.add_argument("--iterations", type=int, default=300, help="Documentos aleatórios")
+    parser.add_argument("--max-ratio", type=float, default=3.0,
+                        help="Crescimento máximo aceito ao dobrar o texto (linear ~2)")
+    parser.add_argument("--budget", type=float, default=2.0, help="Segundos máximos por MB de texto")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"🔍 Padrões adversariais (até {args.max_size // 1000}k caracteres)")
+    ok = all([check_growth(name, prefix, unit, args.max_size, args.max_ratio)
+              for name, (prefix, unit) in ADVERSARIAL.items()])
+
+    print(f"\n🔍 {args.iterations} documentos aleatórios")
+    rng = random.Random(args.seed)
+    worst = 0.0
+    for i in range(args.iterations):
+        text = random_document(rng, rng.randint(1_000, 200_000))
+        try:
+            per_mb = time_scan(text) / (len(text) / 1_000_000)
+        except Exception as e:
+            print(f"   ❌ documento {i}: {type(e).__name__}: {e}")
+            ok = False
+            continue
+        worst = max(worst, per_mb)
+    fuzz_ok = worst <= args.budget
+    ok = ok and fuzz_ok
+    print(f"   {'✅' if fuzz_ok else '❌'} pior caso {worst:.2f} s/MB (orçamento {args.budget:.2f} s/MB)")
+
+    print("\n🔍 Casos de regressão")
+    ok = check_regressions() and ok
+
+    print("\n✅ Parsers em tempo linear" if ok else "\n❌ Crescimento acima do linear ou do orçamento")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Orçamento de tempo de import do app (cold start serverless)
+Roda `python -X importtime -c "import <módulo>"` num processo novo, soma o tempo
+cumulativo do módulo e falha se passar do orçamento ou se alguma dependência
+pesada de extração (PIL, OpenCV, pdfplumber, Tesseract...) for importada
+
+Uso:
+    cd backend
+    python -m benchmarks.import_budget [--module app.main_supabase] [--budget-ms 1000]
+"""
+import argparse
+import subprocess
+import sys
+
+# Só devem ser importadas no primeiro uso da extração
+HEAVY_MODULES = ["PIL", "pytesseract", "cv2", "numpy", "pdfplumber", "pdf2image", "pypdfium2", "tesserocr", "dateutil"]
+
+
+def measure_imports(module: str):
+    """Retorna {módulo: (self_us, cumulative_us)} do import de module num processo novo"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Orçamento de tempo de import do app")
+    parser.add_argument("--module", default="app.main_supabase")
+    parser.add_argument("--budget-ms", type=float, default=1000.0)
+    parser.add_argument("--top", type=int, default=10, help="Quantos imports mais lentos listar")
+    args = parser.parse_args()
+
+    timings = measure_imports(args.module)
+    total_ms = timings[args.module][1] / 1000
+
+    print(f"🔍 import {args.module}: {total_ms:.0f} ms (orçamento {args.budget_ms:.0f} ms)")
+    top_level = {name: t for name, t in timings.items() if "." not in name or name.startswith("app.")}
+    for name, (_, cumulative) in sorted(top_level.items(), key=lambda item: -item[1][1])[:args.top]:
+        print(f"   {cumulative / 1000:8.1f} ms  {name}")
+
+    heavy = [name for name in HEAVY_MODULES if name in timings]
+    if heavy:
+        print(f"\n❌ Dependências pesadas importadas no cold start: {', '.join(heavy)}")
+    ok = not heavy and total_ms <= args.budget_ms
+    print("\n✅ Dentro do orçamento" if ok else f"\n❌ Fora do orçamento")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Tamanho das respostas por rota (PostgREST -> API e API -> navegador)
+Roda as rotas GET do app Supabase contra o PostgREST simulado com linhas
+largas (notas, caminhos, hashes, descrições longas) e mede os bytes de cada
+lado, comparando o PostgREST com o que select=* traria. Compara com o
+baseline versionado para que aumentos de payload apareçam no review
+
+Uso:
+    cd backend
+    python -m benchmarks.payload_sizes [--rows 500] [--tolerance 0.05] [--update-baseline]
+"""
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+
+from app import database
+from app import main_supabase
+from benchmarks.fake_postgrest import FakePostgREST
+
+BASELINE_PATH = Path(__file__).resolve().parent / "payload_baseline.json"
+
+ROUTES = {
+    "/clients": lambda: main_supabase.get_clients(),
+    "/clients/1": lambda: main_supabase.get_client(1),
+    "/proofs/clients/1": lambda: main_supabase.get_client_proofs_route(1),
+    "/proofs/1": lambda: main_supabase.get_proof(1),
+    "/clients/2/withdrawals": lambda: main_supabase.get_client_withdrawals(2),
+    "/global-withdrawals": lambda: main_supabase.get_global_withdrawals(Response()),
+    "/bank-simulation/withdrawals": lambda: main_supabase.get_bank_simulation_withdrawals(Response()),
+    "/clients/1/history": lambda: main_supabase.get_client_history(1),
+    "/bank/global/history": lambda: main_supabase.get_global_history(),
+    "/bank/global/history?limit=50": lambda: main_supabase.get_global_history(limit=50),
+    "/global-balance": lambda: main_supabase.get_global_balance(),
+}
+
+
+def build_tables(rows: int, clients: int = 20):
+    """Linhas com todas as colunas do schema, incluindo as que as telas não mostram"""
+    long_text = "Observação registrada pelo operador sobre o cliente e o comprovante. " * 4
+    return {
+        "clients": [
+            {
+                "id": i, "name": f"Cliente {i}", "email": f"cliente{i}@example.com", "phone": "+55 11 99999-0000",
+                "document": "123.456.789-00", "notes": long_text, "saldo": 100.0 * i,
+                "total_deposits": 200.0 * i, "total_withdrawals": 100.0 * i,
+                "created_at": "2025-01-01T00:00:00", "updated_at": "2025-01-02T00:00:00",
+            }
+            for i in range(1, clients + 1)
+        ],
+        "proofs": [
+            {
+                "id": i, "client_id": i % clients + 1, "filename": f"comprovante_{i}.pdf",
+                "file_path": f"/storage/v1/object/comprovantes/2025/01/{'a' * 40}/comprovante_{i}.pdf",
+                "file_type": "application/pdf", "file_size": 123456, "file_hash": f"{i:064x}",
+                "description": long_text, "is_duplicate": False, "original_proof_id": None,
+                "extracted_value": 10.0 * i, "extraction_confidence": 0.95, "extraction_status": "EXTRACTED",
+                "beneficiary": "FULANO DE TAL", "endtoend": f"E{i:031d}", "deposited": bool(i % 2),
+                "uploaded_at": "2025-01-01T00:00:00", "created_at": "2025-01-01T00:00:00",
+            }
+            for i in range(1, rows + 1)
+        ],
+        "transactions": [
+            {
+                "id": i, "client_id": i % clients + 1, "proof_id": i, "amount": 10.0 * i,
+                "type": "WITHDRAWAL" if i % 2 else "DEPOSIT", "status": "COMPLETED",
+                "description": f"Depósito de comprovante_{i}.pdf", "admin_notes": long_text,
+                "created_at": f"2025-01-{i % 28 + 1:02d}T00:00:{i % 60:02d}", "updated_at": "2025-02-01T00:00:00",
+            }
+            for i in range(1, rows + 1)
+        ],
+    }
+
+
+async def measure(route, rows: int):
+    """(bytes do PostgREST, bytes com select=*, bytes da resposta da API)"""
+    fake = FakePostgREST(build_tables(rows))
+    fake.install()
+    try:
+        result = await route()
+    finally:
+        await database.close_async_supabase_client()
+    if isinstance(result, tuple):
+        raise RuntimeError(f"rota retornou erro: {result}")
+    api_bytes = len(json.dumps(jsonable_encoder(result)).encode())
+    return sum(fake.bytes.values()), sum(fake.full_bytes.values()), api_bytes
+
+
+async def run(rows: int):
+    return {path: await measure(route, rows) for path, route in ROUTES.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tamanho das respostas por rota")
+    parser.add_argument("--rows", type=int, default=500, help="Comprovantes e transações no fake")
+    parser.add_argument("--tolerance", type=float, default=0.05, help="Aumento aceito sobre o baseline")
+    parser.add_argument("--update-baseline", action="store_true", help="Grava os tamanhos atuais como baseline")
+    args = parser.parse_args()
+
+    sizes = asyncio.run(run(args.rows))
+    baseline = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+    baseline_rows = baseline.pop("_rows", None)
+    if baseline and baseline_rows != args.rows and not args.update_baseline:
+        print(f"⚠️  Baseline gravado com --rows {baseline_rows}; comparação ignorada")
+        baseline = {}
+
+    print(f"🔍 Bytes por rota ({args.rows} linhas)")
+    print(f"   {'rota':<32} {'PostgREST':>10} {'select=*':>10} {'economia':>9} {'API':>10}  baseline")
+    ok = True
+    for path, (db_bytes, full_bytes, api_bytes) in sizes.items():
+        saved = 1 - db_bytes / full_bytes if full_bytes else 0.0
+        status = ""
+        if path in baseline:
+            limits = [b * (1 + args.tolerance) for b in baseline[path]]
+            grew = db_bytes > limits[0] or api_bytes > limits[1]
+            ok = ok and not grew
+            status = "❌ cresceu" if grew else "✅"
+        print(f"   {path:<32} {db_bytes:>10} {full_bytes:>10} {saved:>8.0%} {api_bytes:>10}  {status}")
+
+    if args.update_baseline:
+        data = {"_rows": args.rows, **{path: [db, api] for path, (db, _, api) in sizes.items()}}
+        BASELINE_PATH.write_text(json.dumps(data, indent=2) + "\n")
+        print(f"\n✅ Baseline gravado em {BASELINE_PATH.name}")
+        return
+    print("\n✅ Payloads dentro do baseline" if ok else "\n❌ Payload acima do baseline (rode com --update-baseline se for intencional)")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
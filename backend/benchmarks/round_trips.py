@@ -0,0 +1,81 @@
+"""
+Contador de round trips ao PostgREST nas rotas de listagem
+Roda as rotas contra um PostgREST simulado em memória (httpx.MockTransport)
+com cada vez mais saques/transações e confere que o número de requisições
+não cresce com o número de linhas (sem N+1 na busca dos nomes dos clientes)
+
+Uso:
+    cd backend
+    python -m benchmarks.round_trips [--rows 10 100 1000] [--clients 20]
+"""
+import argparse
+import asyncio
+import sys
+
+from fastapi import Response
+
+from app import database
+from app import main_supabase
+from benchmarks.fake_postgrest import FakePostgREST
+
+
+def build_tables(rows: int, clients: int):
+    return {
+        "clients": [{"id": i, "name": f"Cliente {i}", "saldo": 0.0} for i in range(1, clients + 1)],
+        "proofs": [],
+        "transactions": [
+            {
+                "id": i, "client_id": i % clients + 1, "amount": 10.0 * i,
+                "type": "WITHDRAWAL" if i % 2 else "DEPOSIT", "status": "COMPLETED",
+                "created_at": f"2025-01-01T00:00:{i % 60:02d}", "description": "",
+            }
+            for i in range(1, rows + 1)
+        ],
+    }
+
+
+ROUTES = {
+    "/global-withdrawals": lambda: main_supabase.get_global_withdrawals(Response()),
+    "/bank-simulation/withdrawals": lambda: main_supabase.get_bank_simulation_withdrawals(Response()),
+    "/bank/global/history": main_supabase.get_global_history,
+    "/bank/global/history?limit=50": lambda: main_supabase.get_global_history(limit=50),
+}
+
+
+async def count_round_trips(route, rows: int, clients: int) -> int:
+    fake = FakePostgREST(build_tables(rows, clients))
+    fake.install()
+    try:
+        result = await route()
+    finally:
+        await database.close_async_supabase_client()
+    if isinstance(result, tuple):
+        raise RuntimeError(f"rota retornou erro: {result}")
+    return sum(fake.requests.values())
+
+
+async def run(rows_list, clients: int) -> bool:
+    ok = True
+    for path, route in ROUTES.items():
+        counts = [await count_round_trips(route, rows, clients) for rows in rows_list]
+        constant = len(set(counts)) == 1
+        ok = ok and constant
+        print(f"   {'✅' if constant else '❌'} {path:<30} "
+              + "  ".join(f"{rows} linhas={count}" for rows, count in zip(rows_list, counts)))
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Round trips ao PostgREST por rota")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--clients", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"🔍 Requisições por chamada ({args.clients} clientes)")
+    ok = asyncio.run(run(args.rows, args.clients))
+    print("\n✅ Round trips constantes" if ok else "\n❌ Round trips crescem com o número de linhas")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
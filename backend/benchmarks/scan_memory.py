@@ -0,0 +1,87 @@
+"""
+Pico de memória ao percorrer a tabela de transações
+Compara, contra um PostgREST simulado em memória, o select() (uma resposta
+com a tabela inteira) e o iter_select() (páginas por keyset em id) com cada
+vez mais linhas: o pico do iter_select fica constante (uma página), o do
+select cresce com a tabela. O pico inclui o PostgREST simulado, que roda no
+mesmo processo (o JSON de cada resposta)
+
+Uso:
+    cd backend
+    python -m benchmarks.scan_memory [--rows 10000 50000 200000] [--page-size 1000]
+"""
+import argparse
+import gc
+import logging
+import sys
+import time
+import tracemalloc
+
+from benchmarks.fake_postgrest import FakePostgREST
+
+COLUMNS = ['id', 'client_id', 'amount', 'type', 'status', 'created_at']
+
+
+def build_transactions(rows: int):
+    return [
+        {
+            "id": i, "client_id": i % 50 + 1, "amount": 10.0 * i,
+            "type": "WITHDRAWAL" if i % 2 else "DEPOSIT", "status": "COMPLETED",
+            "created_at": f"2025-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}", "description": "",
+        }
+        for i in range(1, rows + 1)
+    ]
+
+
+def measure(scan):
+    """(linhas somadas, pico de memória em bytes, segundos) de uma varredura"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    total = 0.0
+    for row in scan():
+        total += row['amount']
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return total, peak, elapsed
+
+
+def run(rows_list, page_size: int) -> bool:
+    peaks = []
+    for rows in rows_list:
+        fake = FakePostgREST({"transactions": build_transactions(rows)})
+        # A tabela simulada mora neste processo: sem o freeze, o GC quase não faz
+        # coletas completas com tantos objetos vivos e as respostas já lidas
+        # (ciclos do httpx) se acumulam, o que não acontece no script real
+        gc.freeze()
+        gc.collect()
+        client = fake.sync_client()
+        full_total, full_peak, full_s = measure(lambda: client.select('transactions', columns=COLUMNS))
+        stream_total, stream_peak, stream_s = measure(
+            lambda: client.iter_select('transactions', columns=COLUMNS, page_size=page_size))
+        client.close()
+        gc.unfreeze()
+        if full_total != stream_total:
+            raise RuntimeError(f"somas diferentes: {full_total} x {stream_total}")
+        peaks.append(stream_peak)
+        print(f"   {rows:>8} linhas: select={full_peak / 2**20:7.1f} MiB ({full_s:.2f}s)"
+              f" | iter_select={stream_peak / 2**20:5.1f} MiB ({stream_s:.2f}s, {fake.requests['transactions'] - 1} req)")
+    # Constante: o pico da maior tabela não passa de 1,5x o da menor
+    return max(peaks) <= 1.5 * min(peaks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memória de select x iter_select")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 50000, 200000])
+    parser.add_argument("--page-size", type=int, default=1000)
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    print(f"🔍 Varredura de transações (páginas de {args.page_size})")
+    ok = run(args.rows, args.page_size)
+    print("\n✅ Memória do iter_select constante" if ok else "\n❌ Memória do iter_select cresce com a tabela")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Teste de carga do single-flight nas leituras quentes
+Dispara N chamadas simultâneas de /global-balance, /clients e
+/bank-simulation/global contra um PostgREST simulado com latência e conta
+as requisições ao banco: com single-flight o número fica constante (uma
+consulta por grupo de chamadas simultâneas); sem ele cresce com N
+
+Uso:
+    cd backend
+    python -m benchmarks.single_flight_load [--readers 1 10 100 500] [--latency 0.05]
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from contextlib import contextmanager
+
+from app import database
+from app import main_supabase
+from app.single_flight import get_single_flight
+from benchmarks.fake_postgrest import FakePostgREST
+from benchmarks.payload_sizes import build_tables
+
+
+ROUTES = {
+    "/global-balance": lambda: main_supabase.get_global_balance(),
+    "/clients": lambda: main_supabase.get_clients(),
+    "/bank-simulation/global": lambda: main_supabase.get_bank_simulation_global(),
+}
+
+# Dashboard + BankSummary abrindo juntos: as três rotas ao mesmo tempo
+ROUTES["(as três juntas)"] = lambda: asyncio.gather(*(route() for route in list(ROUTES.values())[:3]))
+
+
+@contextmanager
+def without_single_flight():
+    """Rotas chamando as funções originais (sem o decorator), para comparação"""
+    originals = {name: getattr(main_supabase, name) for name in ("get_all_clients", "get_global_statistics")}
+    try:
+        for name, fn in originals.items():
+            setattr(main_supabase, name, fn.__wrapped__)
+        yield
+    finally:
+        for name, fn in originals.items():
+            setattr(main_supabase, name, fn)
+
+
+async def load(route, readers: int, latency: float):
+    """N leitores simultâneos; retorna (requisições ao banco, segundos)"""
+    fake = FakePostgREST(build_tables(200, 20), latency=latency)
+    fake.install()
+    try:
+        started = time.perf_counter()
+        results = await asyncio.gather(*(route() for _ in range(readers)))
+        elapsed = time.perf_counter() - started
+    finally:
+        await database.close_async_supabase_client()
+    for result in results:
+        if isinstance(result, tuple):
+            raise RuntimeError(f"rota retornou erro: {result}")
+    return sum(fake.requests.values()), elapsed
+
+
+async def run(readers_list, latency: float) -> bool:
+    ok = True
+    for path, route in ROUTES.items():
+        print(f"\n📊 {path}")
+        counts = []
+        for readers in readers_list:
+            coalesced, coalesced_s = await load(route, readers, latency)
+            with without_single_flight():
+                direct, direct_s = await load(route, readers, latency)
+            counts.append(coalesced)
+            print(f"   {readers:>5} leitores: single-flight={coalesced:>3} req ({coalesced_s * 1000:.0f} ms)"
+                  f" | sem={direct:>5} req ({direct_s * 1000:.0f} ms)")
+        flat = len(set(counts)) == 1
+        ok = ok and flat
+        print(f"   {'✅' if flat else '❌'} requisições {'constantes' if flat else 'crescem'} com o número de leitores")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Requisições ao banco x leitores simultâneos")
+    parser.add_argument("--readers", type=int, nargs="+", default=[1, 10, 100, 500])
+    parser.add_argument("--latency", type=float, default=0.05, help="latência simulada por requisição (s)")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    print(f"🔍 Single-flight com latência simulada de {args.latency * 1000:.0f} ms")
+    ok = asyncio.run(run(args.readers, args.latency))
+    print(f"\n   {get_single_flight().stats()}")
+    print("\n✅ Consultas não crescem com leitores simultâneos" if ok else "\n❌ Consultas crescem com leitores simultâneos")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+App inteiro sobre o backend SQLite (DATABASE_BACKEND=sqlite), sem rede
+Roda as rotas do main_supabase e os db_helpers sem mudança contra um arquivo
+SQLite temporário: cria clientes, credita comprovantes em paralelo, aprova
+saques (cada um duas vezes ao mesmo tempo), remove depósitos, percorre os
+históricos por cursor, confere que o saldo não vem do cache do processo
+(escrita feita por "outro worker") e os totais (rotas x global_stats x verify_global_stats). Mostra o tempo de cada
+etapa; sai com erro se algum total não bater (serve de teste de fumaça em CI)
+
+Uso:
+    cd backend
+    python -m benchmarks.sqlite_app [--clients 50] [--proofs 20] [--concurrency 16]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+# O backend é escolhido na importação de app.database
+_tmpdir = tempfile.TemporaryDirectory(prefix="fluxo_sqlite_")
+os.environ["DATABASE_BACKEND"] = "sqlite"
+os.environ["SQLITE_PATH"] = os.path.join(_tmpdir.name, "fluxo_cash.sqlite3")
+
+import asyncio
+import logging
+
+from fastapi import Response
+
+from app import main_supabase
+from app.database import get_async_supabase_client, get_supabase_client
+
+
+class Checks:
+    def __init__(self):
+        self.failed = 0
+
+    def equal(self, label: str, got, expected):
+        ok = round(float(got), 2) == round(float(expected), 2)
+        self.failed += not ok
+        print(f"   {'✅' if ok else '❌'} {label}: {got} {'==' if ok else '!='} {expected}")
+
+
+async def gather_limited(coros, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(coro):
+        async with semaphore:
+            return await coro
+
+    return await asyncio.gather(*(run(coro) for coro in coros))
+
+
+async def walk_pages(fetch):
+    """Percorre todas as páginas de uma listagem por cursor; retorna as linhas"""
+    rows, cursor = [], None
+    while True:
+        page = await fetch(cursor)
+        rows.extend(page["transactions"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            return rows
+
+
+async def scenario(args, checks: Checks):
+    rng = random.Random(args.seed)
+    timings = {}
+
+    def timed(label):
+        class Timer:
+            def __enter__(self):
+                self.start = time.perf_counter()
+
+            def __exit__(self, *exc):
+                timings[label] = time.perf_counter() - self.start
+        return Timer()
+
+    with timed("criar clientes"):
+        created = await gather_limited(
+            (main_supabase.create_client({"name": f"Cliente {i}", "email": f"c{i}@example.com"}) for i in range(args.clients)),
+            args.concurrency,
+        )
+        client_ids = [result["client"]["id"] for result in created]
+
+    with timed("inserir comprovantes (lote)"):
+        proofs = [
+            {
+                "client_id": client_id,
+                "filename": f"comprovante_{client_id}_{n}.pdf",
+                "file_hash": f"{client_id:08d}{n:08d}",
+                "extracted_value": round(rng.uniform(10, 5000), 2),
+                "extraction_status": "EXTRACTED",
+            }
+            for client_id in client_ids for n in range(args.proofs)
+        ]
+        supabase = get_supabase_client()
+        supabase.insert_many("proofs", proofs)
+        proof_ids = [row["id"] for row in supabase.iter_select("proofs", columns="id")]
+
+    with timed("creditar comprovantes"):
+        credited = await gather_limited((main_supabase.create_deposit_from_proof(pid) for pid in proof_ids), args.concurrency)
+        again = await main_supabase.create_deposit_from_proof(proof_ids[0])
+
+    with timed("criar e aprovar saques"):
+        withdrawals = await gather_limited(
+            (main_supabase.create_withdrawal(client_id, {"valor": round(rng.uniform(1, 2000), 2), "descricao": "saque"})
+             for client_id in client_ids for _ in range(args.proofs // 2)),
+            args.concurrency,
+        )
+        approve = [w for i, w in enumerate(withdrawals) if i % 3]
+        # Cada saque aprovado duas vezes ao mesmo tempo: só uma aprovação desconta
+        await gather_limited(
+            (main_supabase.update_withdrawal(w["client_id"], w["withdrawal"]["id"], {"status": "APROVADO"})
+             for w in approve for _ in range(2)),
+            args.concurrency,
+        )
+
+    with timed("remover depósitos"):
+        removed = [c["transaction_id"] for c in credited[:: max(1, len(credited) // 10)]]
+        await gather_limited((main_supabase.remove_deposit(tid) for tid in removed), args.concurrency)
+
+    with timed("históricos por cursor"):
+        global_rows = await walk_pages(lambda cursor: main_supabase.get_global_history(limit=25, cursor=cursor))
+        client_rows = await walk_pages(
+            lambda cursor: main_supabase.get_client_history(client_ids[0], limit=7, cursor=cursor))
+        global_history = await main_supabase.get_global_history(period="today", limit=1)
+        client_history = await main_supabase.get_client_history(client_ids[0], limit=1)
+
+    with timed("saques globais por cursor"):
+        listed, cursor, total_withdrawals = [], None, None
+        while True:
+            response = Response()
+            listed.extend(await main_supabase.get_global_withdrawals(response, limit=40, cursor=cursor))
+            total_withdrawals = int(response.headers[main_supabase.TOTAL_COUNT_HEADER])
+            cursor = response.headers.get(main_supabase.NEXT_CURSOR_HEADER)
+            if not cursor:
+                break
+
+    with timed("saldo após escrita de outro worker"):
+        # Cliente no cache deste processo; outro worker ajusta o saldo direto no banco
+        await main_supabase.get_client_history(client_ids[1], limit=1)
+        before = (await main_supabase.get_client_balance(client_ids[1]))["balance"]["saldo_disponivel"]
+        get_supabase_client().rpc("adjust_client_balance", {
+            "p_client_id": client_ids[1], "p_amount": 123.45, "p_operation": "add"})
+        balance = (await main_supabase.get_client_balance(client_ids[1]))["balance"]["saldo_disponivel"]
+        shown = (await main_supabase.get_client(client_ids[1]))["client"]["saldo_atual"]
+        get_supabase_client().rpc("adjust_client_balance", {
+            "p_client_id": client_ids[1], "p_amount": 123.45, "p_operation": "subtract"})
+
+    with timed("estatísticas"):
+        stats = await main_supabase.get_global_balance()
+        clients = (await main_supabase.get_clients())["clients"]
+        verify = await get_async_supabase_client().rpc("verify_global_stats")
+
+    deposits = sum(c["amount"] for c in credited) - sum(c["amount"] for c in credited if c["transaction_id"] in removed)
+    approved = sum(w["withdrawal"]["amount"] for w in approve)
+
+    print(f"\n🔍 {args.clients} clientes, {len(proof_ids)} comprovantes, {len(withdrawals)} saques ({len(approve)} aprovados)")
+    for label, seconds in timings.items():
+        print(f"   {label:<28} {seconds * 1000:9.1f} ms")
+
+    print("\n🔍 Conferências")
+    checks.equal("comprovante creditado duas vezes -> 400", again[1], 400)
+    checks.equal("total_depositos (global_stats)", stats["total_depositos"], deposits)
+    checks.equal("total_saques (global_stats)", stats["total_saques"], approved)
+    checks.equal("total_operations", stats["total_operations"], len(proof_ids) - len(removed) + len(withdrawals))
+    checks.equal("soma dos saldos", sum(c["saldo"] for c in clients), deposits - approved)
+    checks.equal("histórico global (páginas)", len(global_rows), len(proof_ids) - len(removed) + len(approve))
+    checks.equal("histórico global de hoje (daily_stats)", global_history["total"], len(global_rows))
+    checks.equal("histórico global: depósitos do período", global_history["total_deposits"], deposits)
+    checks.equal("histórico do cliente (páginas)", len(client_rows), client_history["total"])
+    checks.equal("ids únicos no histórico", len({row["id"] for row in global_rows}), len(global_rows))
+    checks.equal("saques globais (páginas)", len(listed), total_withdrawals)
+    checks.equal("verify_global_stats consistente", verify["consistent"], True)
+    checks.equal("saldo (rota /balance) após escrita de outro worker", balance, before + 123.45)
+    checks.equal("saldo (rota /clients/{id}) após escrita de outro worker", shown, before + 123.45)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rotas do app sobre o backend SQLite")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--proofs", type=int, default=20, help="Comprovantes por cliente")
+    parser.add_argument("--concurrency", type=int, default=16, help="Requisições simultâneas")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    checks = Checks()
+    try:
+        asyncio.run(scenario(args, checks))
+    finally:
+        _tmpdir.cleanup()
+    print("\n✅ Totais conferem" if not checks.failed else f"\n❌ {checks.failed} conferência(s) falharam")
+    sys.exit(1 if checks.failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,11 @@
 """
 Script para limpar transações órfãs (sem cliente válido)
+
+Uso:
+    python clean_orphan_transactions.py [--batch-size 500]
 """
+import argparse
+
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -8,9 +13,17 @@ from pathlib import Path
 env_path = Path(__file__).parent / '.env'
 load_dotenv(dotenv_path=env_path)
 
-from app.database import get_supabase_client
+from app.database import get_supabase_client, BULK_BATCH_SIZE
+
+# Quantas órfãs listar antes de pedir confirmação
+MAX_LISTED = 20
 
-def clean_orphan_transactions():
+def print_progress(done: int, total: int):
+    """Progresso na mesma linha do terminal"""
+    percent = done * 100 // total if total else 100
+    print(f"\r   ⏳ {done}/{total} ({percent}%)", end="", flush=True)
+
+def clean_orphan_transactions(batch_size: int = BULK_BATCH_SIZE):
     """Remove transações sem cliente válido"""
     
     print("🔍 Procurando transações órfãs...")
@@ -18,25 +31,30 @@ def clean_orphan_transactions():
     try:
         client = get_supabase_client()
         
-        # Buscar todos os clientes válidos
-        clients = client.select('clients', columns='id')
-        valid_client_ids = [c['id'] for c in clients]
+        # Buscar todos os clientes válidos (só os ids)
+        valid_client_ids = {c['id'] for c in client.iter_select('clients', columns='id', page_size=batch_size)}
         print(f"✅ {len(valid_client_ids)} clientes válidos encontrados")
         
-        # Buscar todas as transações
-        transactions = client.select('transactions', columns='*')
-        print(f"📊 {len(transactions)} transações encontradas")
-        
-        # Encontrar órfãs
-        orphans = [t for t in transactions if t['client_id'] not in valid_client_ids]
+        # Percorrer as transações em páginas, guardando só os ids das órfãs
+        scanned = 0
+        orphan_ids, listed = [], []
+        for t in client.iter_select('transactions', columns=['id', 'client_id', 'type', 'amount'], page_size=batch_size):
+            scanned += 1
+            if t['client_id'] not in valid_client_ids:
+                orphan_ids.append(t['id'])
+                if len(listed) < MAX_LISTED:
+                    listed.append(t)
+        print(f"📊 {scanned} transações verificadas")
         
-        if not orphans:
+        if not orphan_ids:
             print("\n✅ Nenhuma transação órfã encontrada!")
             return
         
-        print(f"\n⚠️  {len(orphans)} transações órfãs encontradas:")
-        for t in orphans:
+        print(f"\n⚠️  {len(orphan_ids)} transações órfãs encontradas:")
+        for t in listed:
             print(f"   - ID: {t['id']} | Cliente: {t['client_id']} (não existe) | Tipo: {t['type']} | Valor: R$ {t['amount']:.2f}")
+        if len(orphan_ids) > MAX_LISTED:
+            print(f"   ... e mais {len(orphan_ids) - MAX_LISTED}")
         
         confirm = input("\nDeseja deletar estas transações? (SIM/não): ")
         
@@ -44,16 +62,18 @@ def clean_orphan_transactions():
             print("❌ Operação cancelada.")
             return
         
-        # Deletar órfãs
-        print("\n🗑️  Deletando transações órfãs...")
-        for t in orphans:
-            client.delete('transactions', filters={'id': f'eq.{t["id"]}'})
-            print(f"   ✅ Transação {t['id']} deletada")
+        # Deletar órfãs em lotes (id=in.(...))
+        print(f"\n🗑️  Deletando transações órfãs (lotes de {batch_size})...")
+        client.delete_many('transactions', orphan_ids, batch_size=batch_size, on_progress=print_progress)
+        print()
         
-        print(f"\n✅ {len(orphans)} transações órfãs removidas com sucesso!")
+        print(f"\n✅ {len(orphan_ids)} transações órfãs removidas com sucesso!")
         
     except Exception as e:
         print(f"\n❌ Erro: {e}")
 
 if __name__ == "__main__":
-    clean_orphan_transactions()
+    parser = argparse.ArgumentParser(description="Remove transações sem cliente válido")
+    parser.add_argument("--batch-size", type=int, default=BULK_BATCH_SIZE, help="linhas por página e ids por requisição DELETE")
+    args = parser.parse_args()
+    clean_orphan_transactions(batch_size=max(1, args.batch_size))
@@ -1,7 +1,12 @@
 """
 Script para limpar (zerar) todo o banco de dados Supabase
 ATENÇÃO: Isso vai deletar TODOS os dados!
+
+Uso:
+    python clear_database.py [--batch-size 500]
 """
+import argparse
+
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -9,9 +14,36 @@ from pathlib import Path
 env_path = Path(__file__).parent / '.env'
 load_dotenv(dotenv_path=env_path)
 
-from app.database import get_supabase_client
+from app.database import get_supabase_client, BULK_BATCH_SIZE
+
+def print_progress(done: int, total: int):
+    """Progresso na mesma linha do terminal"""
+    percent = done * 100 // total if total else 100
+    print(f"\r   ⏳ {done}/{total} ({percent}%)", end="", flush=True)
+
+def count_rows(supabase, table: str) -> int:
+    """Total de linhas da tabela (count=exact, sem baixar as linhas)"""
+    return supabase.table(table).select('id', count='exact').limit(0).execute().count or 0
+
+def delete_all(supabase, table: str, batch_size: int) -> int:
+    """
+    Deleta todas as linhas da tabela em lotes (id=in.(...)): busca um lote de
+    ids e deleta, até a tabela ficar vazia. Buscar lote a lote também respeita
+    o limite de linhas por resposta do PostgREST
+    """
+    total = count_rows(supabase, table)
+    deleted = 0
+    while True:
+        ids = [row['id'] for row in supabase.select(table, columns='id', filters={'order': 'id', 'limit': batch_size})]
+        if not ids:
+            break
+        deleted += supabase.delete_many(table, ids, batch_size=batch_size)
+        print_progress(deleted, max(total, deleted))
+    if deleted:
+        print()
+    return deleted
 
-def clear_database():
+def clear_database(batch_size: int = BULK_BATCH_SIZE):
     """Limpa todos os dados do banco de dados"""
     
     print("⚠️  ATENÇÃO: Isso vai deletar TODOS os dados do banco!")
@@ -32,24 +64,18 @@ def clear_database():
         
         # 1. Deletar transações
         print("🗑️  Deletando transações...")
-        transactions = supabase.select('transactions', columns='id')
-        for t in transactions:
-            supabase.delete('transactions', filters={'id': f'eq.{t["id"]}'})
-        print(f"   ✅ {len(transactions)} transações deletadas")
+        deleted = delete_all(supabase, 'transactions', batch_size)
+        print(f"   ✅ {deleted} transações deletadas")
         
         # 2. Deletar comprovantes
         print("🗑️  Deletando comprovantes...")
-        proofs = supabase.select('proofs', columns='id')
-        for p in proofs:
-            supabase.delete('proofs', filters={'id': f'eq.{p["id"]}'})
-        print(f"   ✅ {len(proofs)} comprovantes deletados")
+        deleted = delete_all(supabase, 'proofs', batch_size)
+        print(f"   ✅ {deleted} comprovantes deletados")
         
         # 3. Deletar clientes
         print("🗑️  Deletando clientes...")
-        clients = supabase.select('clients', columns='id')
-        for c in clients:
-            supabase.delete('clients', filters={'id': f'eq.{c["id"]}'})
-        print(f"   ✅ {len(clients)} clientes deletados")
+        deleted = delete_all(supabase, 'clients', batch_size)
+        print(f"   ✅ {deleted} clientes deletados")
         
         print("\n" + "=" * 60)
         print("✅ Banco de dados limpo com sucesso!")
@@ -57,19 +83,22 @@ def clear_database():
         
         # Verificar
         print("\n🔍 Verificando...")
-        clients_check = supabase.select('clients', columns='id')
-        proofs_check = supabase.select('proofs', columns='id')
-        transactions_check = supabase.select('transactions', columns='id')
+        clients_check = count_rows(supabase, 'clients')
+        proofs_check = count_rows(supabase, 'proofs')
+        transactions_check = count_rows(supabase, 'transactions')
         
-        print(f"   Clientes: {len(clients_check)}")
-        print(f"   Comprovantes: {len(proofs_check)}")
-        print(f"   Transações: {len(transactions_check)}")
+        print(f"   Clientes: {clients_check}")
+        print(f"   Comprovantes: {proofs_check}")
+        print(f"   Transações: {transactions_check}")
         
-        if len(clients_check) == 0 and len(proofs_check) == 0 and len(transactions_check) == 0:
+        if clients_check == 0 and proofs_check == 0 and transactions_check == 0:
             print("\n✅ Banco de dados completamente limpo!")
         
     except Exception as e:
         print(f"\n❌ Erro ao limpar banco de dados: {e}")
 
 if __name__ == "__main__":
-    clear_database()
+    parser = argparse.ArgumentParser(description="Deleta todos os dados do banco")
+    parser.add_argument("--batch-size", type=int, default=BULK_BATCH_SIZE, help="linhas por requisição DELETE")
+    args = parser.parse_args()
+    clear_database(batch_size=max(1, args.batch_size))
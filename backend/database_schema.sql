@@ -54,6 +54,46 @@ CREATE TABLE IF NOT EXISTS transactions (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Estatísticas globais (linha única) mantidas por triggers: leitura O(1) no dashboard
+CREATE TABLE IF NOT EXISTS global_stats (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    total_clients INTEGER NOT NULL DEFAULT 0,
+    clientes_em_negativo INTEGER NOT NULL DEFAULT 0,
+    total_depositos DECIMAL(15, 2) NOT NULL DEFAULT 0.00,
+    total_saques DECIMAL(15, 2) NOT NULL DEFAULT 0.00,
+    total_comprovantes INTEGER NOT NULL DEFAULT 0,
+    total_operations INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO global_stats (id) VALUES (TRUE) ON CONFLICT (id) DO NOTHING;
+
+-- Totais por dia (dia de negócio do created_at, ver business_day), mantidos pelos mesmos triggers
+CREATE TABLE IF NOT EXISTS daily_stats (
+    day DATE PRIMARY KEY,
+    total_depositos DECIMAL(15, 2) NOT NULL DEFAULT 0.00,
+    total_saques DECIMAL(15, 2) NOT NULL DEFAULT 0.00,
+    deposit_count INTEGER NOT NULL DEFAULT 0,
+    withdrawal_count INTEGER NOT NULL DEFAULT 0,
+    total_operations INTEGER NOT NULL DEFAULT 0
+);
+
+-- Variações pendentes de global_stats/daily_stats: os triggers só inserem aqui
+-- (append-only, sem disputar uma linha quente); rollup_stats_deltas() move as
+-- variações para global_stats/daily_stats e as leituras somam as que faltam
+CREATE TABLE IF NOT EXISTS stats_deltas (
+    id BIGSERIAL PRIMARY KEY,
+    day DATE,
+    total_clients INTEGER NOT NULL DEFAULT 0,
+    clientes_em_negativo INTEGER NOT NULL DEFAULT 0,
+    total_depositos DECIMAL(15, 2) NOT NULL DEFAULT 0.00,
+    total_saques DECIMAL(15, 2) NOT NULL DEFAULT 0.00,
+    total_comprovantes INTEGER NOT NULL DEFAULT 0,
+    total_operations INTEGER NOT NULL DEFAULT 0,
+    deposit_count INTEGER NOT NULL DEFAULT 0,
+    withdrawal_count INTEGER NOT NULL DEFAULT 0
+);
+
 -- Índices para melhor performance
 CREATE INDEX IF NOT EXISTS idx_proofs_client_id ON proofs(client_id);
 CREATE INDEX IF NOT EXISTS idx_proofs_file_hash ON proofs(file_hash);
@@ -61,7 +101,9 @@ CREATE INDEX IF NOT EXISTS idx_proofs_deposited ON proofs(deposited);
 CREATE INDEX IF NOT EXISTS idx_transactions_client_id ON transactions(client_id);
 CREATE INDEX IF NOT EXISTS idx_transactions_type ON transactions(type);
 CREATE INDEX IF NOT EXISTS idx_transactions_status ON transactions(status);
-CREATE INDEX IF NOT EXISTS idx_transactions_created_at ON transactions(created_at DESC);
+-- Listagens paginadas por keyset em (created_at, id), mais recentes primeiro
+CREATE INDEX IF NOT EXISTS idx_transactions_created_at ON transactions(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_transactions_client_created_at ON transactions(client_id, created_at DESC, id DESC);
 
 -- Trigger para atualizar updated_at automaticamente
 CREATE OR REPLACE FUNCTION update_updated_at_column()
@@ -78,6 +120,488 @@ CREATE TRIGGER update_clients_updated_at BEFORE UPDATE ON clients
 CREATE TRIGGER update_transactions_updated_at BEFORE UPDATE ON transactions
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+-- ============================================
+-- MANUTENÇÃO INCREMENTAL DE global_stats / daily_stats
+-- Cada linha alterada contribui com -OLD e +NEW: inserts, updates
+-- (ex: PENDING -> COMPLETED) e deletes registram só a diferença em stats_deltas,
+-- sem reler as tabelas e sem travar global_stats (todas as escritas do sistema
+-- esperariam pelo lock dessa linha, e a ordem dos locks com a linha do cliente
+-- variava entre as funções: deadlock)
+-- ============================================
+
+-- Dia de negócio (America/Sao_Paulo) de um created_at gravado em UTC; o mesmo
+-- fuso de BUSINESS_TIMEZONE em app/periods.py, que calcula os limites dos períodos
+-- Gêmea no SQLite: app/periods.business_day (registrada no SQLite por SQLiteStore._connect)
+CREATE OR REPLACE FUNCTION business_day(p_at TIMESTAMP)
+RETURNS DATE AS $$
+    SELECT (p_at AT TIME ZONE 'UTC' AT TIME ZONE 'America/Sao_Paulo')::date;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Registra (p_sign = 1) ou desfaz (p_sign = -1) a contribuição de uma transação
+-- Gêmea no SQLite: triggers transactions_stats_* em database_schema_sqlite.sql
+CREATE OR REPLACE FUNCTION apply_transaction_stats(t transactions, p_sign INTEGER)
+RETURNS VOID AS $$
+DECLARE
+    v_is_deposit INTEGER := CASE WHEN t.type = 'DEPOSIT' AND t.status = 'COMPLETED' THEN 1 ELSE 0 END;
+    v_is_withdrawal INTEGER := CASE WHEN t.type = 'WITHDRAWAL' AND t.status = 'COMPLETED' THEN 1 ELSE 0 END;
+BEGIN
+    INSERT INTO stats_deltas (day, total_depositos, total_saques, total_operations, deposit_count, withdrawal_count)
+    VALUES (
+        business_day(t.created_at),
+        p_sign * v_is_deposit * t.amount,
+        p_sign * v_is_withdrawal * t.amount,
+        p_sign,
+        p_sign * v_is_deposit,
+        p_sign * v_is_withdrawal
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION transactions_stats_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- Updates que não mexem em valor/tipo/status/data (ex: admin_notes) não mudam os totais
+    IF TG_OP = 'UPDATE' AND (OLD.amount, OLD.type, OLD.status, OLD.created_at)
+            IS NOT DISTINCT FROM (NEW.amount, NEW.type, NEW.status, NEW.created_at) THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM apply_transaction_stats(OLD, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM apply_transaction_stats(NEW, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS transactions_stats ON transactions;
+CREATE TRIGGER transactions_stats AFTER INSERT OR UPDATE OR DELETE ON transactions
+    FOR EACH ROW EXECUTE FUNCTION transactions_stats_trigger();
+
+-- Gêmea no SQLite: triggers clients_stats_* em database_schema_sqlite.sql
+CREATE OR REPLACE FUNCTION clients_stats_trigger()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_clients INTEGER := 0;
+    v_negative INTEGER := 0;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        v_clients := v_clients - 1;
+        v_negative := v_negative - (COALESCE(OLD.saldo, 0) < 0)::INTEGER;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        v_clients := v_clients + 1;
+        v_negative := v_negative + (COALESCE(NEW.saldo, 0) < 0)::INTEGER;
+    END IF;
+    -- Ajustes de saldo que não trocam o sinal não geram variação
+    IF v_clients <> 0 OR v_negative <> 0 THEN
+        INSERT INTO stats_deltas (total_clients, clientes_em_negativo) VALUES (v_clients, v_negative);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS clients_stats ON clients;
+CREATE TRIGGER clients_stats AFTER INSERT OR UPDATE OF saldo OR DELETE ON clients
+    FOR EACH ROW EXECUTE FUNCTION clients_stats_trigger();
+
+-- Gêmea no SQLite: triggers proofs_stats_* em database_schema_sqlite.sql
+CREATE OR REPLACE FUNCTION proofs_stats_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO stats_deltas (total_comprovantes) VALUES (CASE WHEN TG_OP = 'INSERT' THEN 1 ELSE -1 END);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS proofs_stats ON proofs;
+CREATE TRIGGER proofs_stats AFTER INSERT OR DELETE ON proofs
+    FOR EACH ROW EXECUTE FUNCTION proofs_stats_trigger();
+
+-- Move as variações pendentes para global_stats/daily_stats. Só um rollup por vez
+-- (advisory lock; quem não consegue segue sem esperar): o lock de global_stats fica
+-- fora do caminho das escritas. Variações de transações ainda não confirmadas não
+-- são visíveis e ficam para o próximo rollup. Retorna quantas variações moveu
+-- Sem gêmea no SQLite: lá (um escritor por vez) os triggers atualizam global_stats direto
+CREATE OR REPLACE FUNCTION rollup_stats_deltas()
+RETURNS INTEGER AS $$
+DECLARE
+    v_moved INTEGER;
+BEGIN
+    IF NOT pg_try_advisory_xact_lock(hashtext('rollup_stats_deltas')) THEN
+        RETURN 0;
+    END IF;
+
+    WITH moved AS (
+        DELETE FROM stats_deltas RETURNING *
+    ), totals AS (
+        UPDATE global_stats g
+        SET total_clients = g.total_clients + d.total_clients,
+            clientes_em_negativo = g.clientes_em_negativo + d.clientes_em_negativo,
+            total_depositos = g.total_depositos + d.total_depositos,
+            total_saques = g.total_saques + d.total_saques,
+            total_comprovantes = g.total_comprovantes + d.total_comprovantes,
+            total_operations = g.total_operations + d.total_operations,
+            updated_at = CURRENT_TIMESTAMP
+        FROM (
+            SELECT COUNT(*) AS moved,
+                   COALESCE(SUM(total_clients), 0) AS total_clients,
+                   COALESCE(SUM(clientes_em_negativo), 0) AS clientes_em_negativo,
+                   COALESCE(SUM(total_depositos), 0) AS total_depositos,
+                   COALESCE(SUM(total_saques), 0) AS total_saques,
+                   COALESCE(SUM(total_comprovantes), 0) AS total_comprovantes,
+                   COALESCE(SUM(total_operations), 0) AS total_operations
+            FROM moved
+        ) d
+        WHERE g.id AND d.moved > 0
+    ), days AS (
+        INSERT INTO daily_stats AS s (day, total_depositos, total_saques, deposit_count, withdrawal_count, total_operations)
+        SELECT day, SUM(total_depositos), SUM(total_saques), SUM(deposit_count), SUM(withdrawal_count), SUM(total_operations)
+        FROM moved
+        WHERE day IS NOT NULL
+        GROUP BY day
+        ON CONFLICT (day) DO UPDATE SET
+            total_depositos = s.total_depositos + EXCLUDED.total_depositos,
+            total_saques = s.total_saques + EXCLUDED.total_saques,
+            deposit_count = s.deposit_count + EXCLUDED.deposit_count,
+            withdrawal_count = s.withdrawal_count + EXCLUDED.withdrawal_count,
+            total_operations = s.total_operations + EXCLUDED.total_operations
+    )
+    SELECT COUNT(*) INTO v_moved FROM moved;
+
+    RETURN v_moved;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Totais atuais: global_stats + variações ainda não consolidadas
+CREATE OR REPLACE VIEW global_stats_current AS
+SELECT
+    g.total_clients + d.total_clients AS total_clients,
+    g.clientes_em_negativo + d.clientes_em_negativo AS clientes_em_negativo,
+    g.total_depositos + d.total_depositos AS total_depositos,
+    g.total_saques + d.total_saques AS total_saques,
+    g.total_comprovantes + d.total_comprovantes AS total_comprovantes,
+    g.total_operations + d.total_operations AS total_operations
+FROM global_stats g
+CROSS JOIN (
+    SELECT COALESCE(SUM(total_clients), 0) AS total_clients,
+           COALESCE(SUM(clientes_em_negativo), 0) AS clientes_em_negativo,
+           COALESCE(SUM(total_depositos), 0) AS total_depositos,
+           COALESCE(SUM(total_saques), 0) AS total_saques,
+           COALESCE(SUM(total_comprovantes), 0) AS total_comprovantes,
+           COALESCE(SUM(total_operations), 0) AS total_operations
+    FROM stats_deltas
+) d
+WHERE g.id;
+
+-- Totais por dia atuais: daily_stats + variações ainda não consolidadas
+CREATE OR REPLACE VIEW daily_stats_current AS
+SELECT day, SUM(total_depositos) AS total_depositos, SUM(total_saques) AS total_saques,
+       SUM(deposit_count) AS deposit_count, SUM(withdrawal_count) AS withdrawal_count,
+       SUM(total_operations) AS total_operations
+FROM (
+    SELECT day, total_depositos, total_saques, deposit_count, withdrawal_count, total_operations FROM daily_stats
+    UNION ALL
+    SELECT day, total_depositos, total_saques, deposit_count, withdrawal_count, total_operations
+    FROM stats_deltas WHERE day IS NOT NULL
+) u
+GROUP BY day;
+
+-- Totais por dia recalculados das transações (usado na reconstrução/verificação)
+-- Gêmea no SQLite: view daily_stats_computed em database_schema_sqlite.sql
+CREATE OR REPLACE VIEW daily_stats_computed AS
+SELECT
+    business_day(created_at) AS day,
+    COALESCE(SUM(amount) FILTER (WHERE type = 'DEPOSIT' AND status = 'COMPLETED'), 0) AS total_depositos,
+    COALESCE(SUM(amount) FILTER (WHERE type = 'WITHDRAWAL' AND status = 'COMPLETED'), 0) AS total_saques,
+    COUNT(*) FILTER (WHERE type = 'DEPOSIT' AND status = 'COMPLETED') AS deposit_count,
+    COUNT(*) FILTER (WHERE type = 'WITHDRAWAL' AND status = 'COMPLETED') AS withdrawal_count,
+    COUNT(*) AS total_operations
+FROM transactions
+WHERE created_at IS NOT NULL
+GROUP BY business_day(created_at);
+
+-- ============================================
+-- FUNÇÕES (chamadas via PostgREST: POST /rest/v1/rpc/<função>)
+-- ============================================
+
+-- Ajuste atômico de saldo: um único UPDATE relativo (saldo = saldo + valor).
+-- Chamadas concorrentes para o mesmo cliente são serializadas pelo lock da linha,
+-- sem perder atualizações. Retorna o cliente atualizado.
+-- Ordem dos locks nas funções abaixo: comprovante/transação -> cliente -> demais
+-- escritas em transactions (o saldo é ajustado antes de inserir/remover o lançamento)
+-- Gêmea no SQLite: SQLiteStore.rpc_adjust_client_balance (app/sqlite_backend.py)
+CREATE OR REPLACE FUNCTION adjust_client_balance(
+    p_client_id INTEGER,
+    p_amount DECIMAL,
+    p_operation TEXT DEFAULT 'add'
+)
+RETURNS SETOF clients AS $$
+    UPDATE clients
+    SET saldo = COALESCE(saldo, 0) + CASE WHEN p_operation = 'add' THEN p_amount ELSE -p_amount END,
+        total_deposits = COALESCE(total_deposits, 0) + CASE WHEN p_operation = 'add' THEN p_amount ELSE 0 END,
+        total_withdrawals = COALESCE(total_withdrawals, 0) + CASE WHEN p_operation = 'add' THEN 0 ELSE p_amount END
+    WHERE id = p_client_id
+    RETURNING *;
+$$ LANGUAGE sql;
+
+-- Crédito de um comprovante numa única transação: valida, lança o depósito,
+-- ajusta o saldo e marca o comprovante. O comprovante fica travado (FOR UPDATE)
+-- até o fim, então dois créditos simultâneos do mesmo comprovante não passam.
+-- Erros de validação voltam como {"error", "status"} sem alterar nada.
+-- Gêmea no SQLite: SQLiteStore.rpc_credit_proof (app/sqlite_backend.py)
+CREATE OR REPLACE FUNCTION credit_proof(p_proof_id INTEGER)
+RETURNS JSON AS $$
+DECLARE
+    v_proof proofs%ROWTYPE;
+    v_client clients%ROWTYPE;
+    v_transaction_id INTEGER;
+BEGIN
+    SELECT * INTO v_proof FROM proofs WHERE id = p_proof_id FOR UPDATE;
+    IF NOT FOUND THEN
+        RETURN json_build_object('error', 'Comprovante não encontrado', 'status', 404);
+    END IF;
+    IF v_proof.deposited THEN
+        RETURN json_build_object('error', 'Este comprovante já foi creditado anteriormente', 'status', 400);
+    END IF;
+    IF v_proof.extraction_status NOT IN ('EXTRACTED', 'EXTRACTED_WITH_ERROR') THEN
+        RETURN json_build_object('error', 'Comprovante não tem valor extraído', 'status', 400);
+    END IF;
+    IF v_proof.extracted_value IS NULL OR v_proof.extracted_value <= 0 THEN
+        RETURN json_build_object('error', 'Valor inválido', 'status', 400);
+    END IF;
+
+    SELECT * INTO v_client FROM adjust_client_balance(v_proof.client_id, v_proof.extracted_value, 'add');
+
+    INSERT INTO transactions (client_id, amount, type, status, description, proof_id)
+    VALUES (v_proof.client_id, v_proof.extracted_value, 'DEPOSIT', 'COMPLETED',
+            'Depósito de ' || v_proof.filename, p_proof_id)
+    RETURNING id INTO v_transaction_id;
+
+    UPDATE proofs SET deposited = TRUE WHERE id = p_proof_id;
+
+    RETURN json_build_object(
+        'transaction_id', v_transaction_id,
+        'client_id', v_proof.client_id,
+        'amount', v_proof.extracted_value,
+        'client_saldo', COALESCE(v_client.saldo, 0)
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+-- Reversão de um depósito numa única transação: remove o lançamento e
+-- desconta o valor do saldo. Retorna o novo saldo ou {"error", "status"}.
+-- Gêmea no SQLite: SQLiteStore.rpc_reverse_deposit (app/sqlite_backend.py)
+CREATE OR REPLACE FUNCTION reverse_deposit(p_transaction_id INTEGER)
+RETURNS JSON AS $$
+DECLARE
+    v_transaction transactions%ROWTYPE;
+    v_client clients%ROWTYPE;
+BEGIN
+    SELECT * INTO v_transaction FROM transactions
+    WHERE id = p_transaction_id AND type = 'DEPOSIT'
+    FOR UPDATE;
+    IF NOT FOUND THEN
+        RETURN json_build_object('error', 'Depósito não encontrado', 'status', 404);
+    END IF;
+
+    SELECT * INTO v_client FROM adjust_client_balance(v_transaction.client_id, v_transaction.amount, 'subtract');
+
+    DELETE FROM transactions WHERE id = p_transaction_id;
+
+    RETURN json_build_object(
+        'client_id', v_transaction.client_id,
+        'amount', v_transaction.amount,
+        'client_saldo', COALESCE(v_client.saldo, 0)
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+-- Aprovação de um saque numa única transação: a troca PENDING -> COMPLETED
+-- (com WHERE status = 'PENDING') trava o lançamento e só uma aprovação
+-- simultânea passa; a outra encontra o saque já concluído e não desconta de novo.
+-- Retorna o saque atualizado e o novo saldo, ou {"error", "status"}.
+-- Gêmea no SQLite: SQLiteStore.rpc_approve_withdrawal (app/sqlite_backend.py)
+CREATE OR REPLACE FUNCTION approve_withdrawal(
+    p_withdrawal_id INTEGER,
+    p_client_id INTEGER,
+    p_admin_notes TEXT DEFAULT NULL
+)
+RETURNS JSON AS $$
+DECLARE
+    v_withdrawal transactions%ROWTYPE;
+    v_client clients%ROWTYPE;
+BEGIN
+    UPDATE transactions
+    SET status = 'COMPLETED', admin_notes = COALESCE(p_admin_notes, admin_notes)
+    WHERE id = p_withdrawal_id AND client_id = p_client_id AND type = 'WITHDRAWAL' AND status = 'PENDING'
+    RETURNING * INTO v_withdrawal;
+    IF NOT FOUND THEN
+        IF EXISTS (SELECT 1 FROM transactions
+                   WHERE id = p_withdrawal_id AND client_id = p_client_id AND type = 'WITHDRAWAL') THEN
+            RETURN json_build_object('error', 'Saque não está pendente', 'status', 409);
+        END IF;
+        RETURN json_build_object('error', 'Saque não encontrado', 'status', 404);
+    END IF;
+
+    SELECT * INTO v_client FROM adjust_client_balance(p_client_id, v_withdrawal.amount, 'subtract');
+
+    RETURN json_build_object(
+        'withdrawal', row_to_json(v_withdrawal),
+        'client_saldo', COALESCE(v_client.saldo, 0)
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+-- Estatísticas globais recalculadas das tabelas-base (varre tudo;
+-- usada só para reconstruir/verificar global_stats)
+-- Gêmea no SQLite: view global_stats_computed em database_schema_sqlite.sql
+CREATE OR REPLACE FUNCTION compute_global_statistics()
+RETURNS JSON AS $$
+    SELECT json_build_object(
+        'total_clients', (SELECT COUNT(*) FROM clients),
+        'clientes_em_negativo', (SELECT COUNT(*) FROM clients WHERE saldo < 0),
+        'total_depositos', COALESCE(SUM(amount) FILTER (WHERE type = 'DEPOSIT' AND status = 'COMPLETED'), 0),
+        'total_saques', COALESCE(SUM(amount) FILTER (WHERE type = 'WITHDRAWAL' AND status = 'COMPLETED'), 0),
+        'total_comprovantes', (SELECT COUNT(*) FROM proofs),
+        'total_operations', COUNT(*)
+    )
+    FROM transactions;
+$$ LANGUAGE sql STABLE;
+
+-- Estatísticas globais (dashboard): global_stats + variações pendentes (consolidadas
+-- aqui antes da leitura, se nenhum outro rollup estiver rodando)
+-- Gêmea no SQLite: SQLiteStore.rpc_get_global_statistics (app/sqlite_backend.py)
+CREATE OR REPLACE FUNCTION get_global_statistics()
+RETURNS JSON AS $$
+BEGIN
+    PERFORM rollup_stats_deltas();
+    RETURN (
+        SELECT json_build_object(
+            'total_clients', total_clients,
+            'clientes_em_negativo', clientes_em_negativo,
+            'total_depositos', total_depositos,
+            'total_saques', total_saques,
+            'total_comprovantes', total_comprovantes,
+            'total_operations', total_operations
+        )
+        FROM global_stats_current
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+-- Compara global_stats/daily_stats com os valores recalculados
+-- Gêmea no SQLite: SQLiteStore.rpc_verify_global_stats (app/sqlite_backend.py)
+CREATE OR REPLACE FUNCTION verify_global_stats()
+RETURNS JSON AS $$
+DECLARE
+    v_stored JSON := get_global_statistics();
+    v_computed JSON := compute_global_statistics();
+    v_daily_mismatches INTEGER;
+BEGIN
+    SELECT COUNT(*) INTO v_daily_mismatches
+    FROM daily_stats_current s
+    FULL OUTER JOIN daily_stats_computed c ON c.day = s.day
+    WHERE (COALESCE(s.total_depositos, 0), COALESCE(s.total_saques, 0), COALESCE(s.deposit_count, 0),
+           COALESCE(s.withdrawal_count, 0), COALESCE(s.total_operations, 0))
+        IS DISTINCT FROM
+          (COALESCE(c.total_depositos, 0), COALESCE(c.total_saques, 0), COALESCE(c.deposit_count, 0),
+           COALESCE(c.withdrawal_count, 0), COALESCE(c.total_operations, 0));
+
+    RETURN json_build_object(
+        'consistent', v_stored::JSONB = v_computed::JSONB AND v_daily_mismatches = 0,
+        'stored', v_stored,
+        'computed', v_computed,
+        'daily_mismatches', v_daily_mismatches
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+-- Reconstrói global_stats e daily_stats do zero (escritas nas tabelas-base
+-- ficam bloqueadas durante o recálculo). Retorna a verificação de antes e depois.
+-- Gêmea no SQLite: SQLiteStore.rpc_rebuild_global_stats (app/sqlite_backend.py)
+CREATE OR REPLACE FUNCTION rebuild_global_stats()
+RETURNS JSON AS $$
+DECLARE
+    v_before JSON;
+BEGIN
+    LOCK TABLE clients, proofs, transactions IN SHARE MODE;
+    v_before := verify_global_stats();
+    DELETE FROM stats_deltas;
+
+    INSERT INTO global_stats (id) VALUES (TRUE) ON CONFLICT (id) DO NOTHING;
+    UPDATE global_stats
+    SET (total_clients, clientes_em_negativo, total_depositos, total_saques, total_comprovantes, total_operations) = (
+            SELECT (c->>'total_clients')::INTEGER, (c->>'clientes_em_negativo')::INTEGER,
+                   (c->>'total_depositos')::DECIMAL, (c->>'total_saques')::DECIMAL,
+                   (c->>'total_comprovantes')::INTEGER, (c->>'total_operations')::INTEGER
+            FROM (SELECT compute_global_statistics()::JSONB AS c) computed
+        ),
+        updated_at = CURRENT_TIMESTAMP
+    WHERE id;
+
+    DELETE FROM daily_stats;
+    INSERT INTO daily_stats (day, total_depositos, total_saques, deposit_count, withdrawal_count, total_operations)
+    SELECT day, total_depositos, total_saques, deposit_count, withdrawal_count, total_operations
+    FROM daily_stats_computed;
+
+    RETURN json_build_object('before', v_before, 'after', verify_global_stats());
+END;
+$$ LANGUAGE plpgsql;
+
+-- Totais do histórico (transações COMPLETED) de um cliente ou de todos (p_client_id NULL)
+-- no período [p_date_from, p_date_to) (NULL = sem limite): somados no banco para não
+-- dependerem da página retornada. Os limites chegam com fuso (TIMESTAMPTZ). O histórico
+-- global em dias inteiros do fuso do negócio soma o rollup
+-- daily_stats (uma linha por dia); os demais usam os índices (client_id, created_at)
+-- e (created_at, id), então períodos curtos leem proporcionalmente menos linhas
+-- Gêmea no SQLite: SQLiteStore.rpc_get_history_totals (app/sqlite_backend.py)
+DROP FUNCTION IF EXISTS get_history_totals(INTEGER);
+DROP FUNCTION IF EXISTS get_history_totals(INTEGER, TIMESTAMP, TIMESTAMP);
+CREATE OR REPLACE FUNCTION get_history_totals(
+    p_client_id INTEGER DEFAULT NULL,
+    p_date_from TIMESTAMPTZ DEFAULT NULL,
+    p_date_to TIMESTAMPTZ DEFAULT NULL
+)
+RETURNS JSON AS $$
+DECLARE
+    -- Limites no fuso do negócio (dias de daily_stats) e em UTC (created_at)
+    v_local_from TIMESTAMP := p_date_from AT TIME ZONE 'America/Sao_Paulo';
+    v_local_to TIMESTAMP := p_date_to AT TIME ZONE 'America/Sao_Paulo';
+    v_utc_from TIMESTAMP := p_date_from AT TIME ZONE 'UTC';
+    v_utc_to TIMESTAMP := p_date_to AT TIME ZONE 'UTC';
+BEGIN
+    IF p_client_id IS NULL
+            AND (p_date_from IS NULL OR v_local_from = date_trunc('day', v_local_from))
+            AND (p_date_to IS NULL OR v_local_to = date_trunc('day', v_local_to)) THEN
+        RETURN (
+            SELECT json_build_object(
+                'total_deposits', COALESCE(SUM(total_depositos), 0),
+                'total_withdrawals', COALESCE(SUM(total_saques), 0),
+                'total', COALESCE(SUM(deposit_count + withdrawal_count), 0)
+            )
+            FROM daily_stats_current
+            WHERE (p_date_from IS NULL OR day >= v_local_from::date)
+              AND (p_date_to IS NULL OR day < v_local_to::date)
+        );
+    END IF;
+
+    RETURN (
+        SELECT json_build_object(
+            'total_deposits', COALESCE(SUM(amount) FILTER (WHERE type = 'DEPOSIT'), 0),
+            'total_withdrawals', COALESCE(SUM(amount) FILTER (WHERE type = 'WITHDRAWAL'), 0),
+            'total', COUNT(*)
+        )
+        FROM transactions
+        WHERE status = 'COMPLETED'
+          AND (p_client_id IS NULL OR client_id = p_client_id)
+          AND (p_date_from IS NULL OR created_at >= v_utc_from)
+          AND (p_date_to IS NULL OR created_at < v_utc_to)
+    );
+END;
+$$ LANGUAGE plpgsql STABLE;
+
 -- Comentários nas tabelas
 COMMENT ON TABLE clients IS 'Tabela de clientes do sistema';
 COMMENT ON TABLE proofs IS 'Tabela de comprovantes enviados pelos clientes';
@@ -87,3 +611,15 @@ COMMENT ON COLUMN proofs.deposited IS 'Flag para indicar se o comprovante já fo
 COMMENT ON COLUMN proofs.extraction_status IS 'Status da extração: UPLOADED, EXTRACTING, EXTRACTED, FAILED, MANUAL_ENTRY';
 COMMENT ON COLUMN transactions.type IS 'Tipo da transação: DEPOSIT ou WITHDRAWAL';
 COMMENT ON COLUMN transactions.status IS 'Status da transação: PENDING, COMPLETED, REJECTED';
+COMMENT ON FUNCTION adjust_client_balance IS 'Soma (add) ou subtrai (subtract) valor do saldo e acumula em total_deposits/total_withdrawals';
+COMMENT ON FUNCTION credit_proof IS 'Cria o depósito de um comprovante extraído, ajusta o saldo e marca o comprovante como depositado (uma transação)';
+COMMENT ON FUNCTION reverse_deposit IS 'Remove um depósito e desconta o valor do saldo do cliente (uma transação)';
+COMMENT ON FUNCTION get_global_statistics IS 'Totais do dashboard (clientes, depósitos, saques, comprovantes, operações) lidos de global_stats';
+COMMENT ON FUNCTION get_history_totals IS 'Somas de depósitos/saques e contagem das transações COMPLETED do histórico (cliente ou global) num período';
+COMMENT ON TABLE global_stats IS 'Totais globais mantidos incrementalmente por triggers (reconstruir com rebuild_global_stats)';
+COMMENT ON TABLE daily_stats IS 'Totais de transações por dia mantidos incrementalmente por triggers';
+COMMENT ON TABLE stats_deltas IS 'Variações de global_stats/daily_stats ainda não consolidadas (rollup_stats_deltas)';
+COMMENT ON FUNCTION rollup_stats_deltas IS 'Consolida stats_deltas em global_stats/daily_stats (um rollup por vez, sem bloquear escritas)';
+
+-- Popular global_stats/daily_stats com os dados já existentes
+SELECT rebuild_global_stats();
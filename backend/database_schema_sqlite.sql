@@ -0,0 +1,286 @@
+-- ============================================
+-- FLUXO CASH - Database Schema para o backend local (SQLite)
+-- Mesmas tabelas, colunas e índices do database_schema.sql; os triggers
+-- mantêm global_stats/daily_stats como no Postgres. As funções (rpc) ficam
+-- em app/sqlite_backend.py
+-- Valores em REAL arredondados a 2 casas nos totais; datas em texto ISO
+-- (AAAA-MM-DDTHH:MM:SS.sss, UTC), comparáveis como texto
+-- ============================================
+
+-- Tabela de Clientes
+CREATE TABLE IF NOT EXISTS clients (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(255) NOT NULL,
+    email VARCHAR(255),
+    phone VARCHAR(50),
+    document VARCHAR(50),
+    notes TEXT,
+    saldo REAL DEFAULT 0.00,
+    total_deposits REAL DEFAULT 0.00,
+    total_withdrawals REAL DEFAULT 0.00,
+    created_at TIMESTAMP DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now')),
+    updated_at TIMESTAMP DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+);
+
+-- Tabela de Comprovantes
+CREATE TABLE IF NOT EXISTS proofs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    client_id INTEGER NOT NULL REFERENCES clients(id) ON DELETE CASCADE,
+    filename VARCHAR(500) NOT NULL,
+    file_path VARCHAR(1000),
+    file_type VARCHAR(100),
+    file_size INTEGER,
+    file_hash VARCHAR(64) UNIQUE NOT NULL,
+    description TEXT,
+    is_duplicate BOOLEAN DEFAULT FALSE,
+    original_proof_id INTEGER REFERENCES proofs(id),
+    extracted_value REAL,
+    extraction_confidence REAL DEFAULT 0.00,
+    extraction_status VARCHAR(50) DEFAULT 'UPLOADED',
+    beneficiary VARCHAR(255),
+    endtoend VARCHAR(255),
+    deposited BOOLEAN DEFAULT FALSE,
+    uploaded_at TIMESTAMP DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now')),
+    created_at TIMESTAMP DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+);
+
+-- Tabela de Transações (Depósitos e Saques)
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    client_id INTEGER NOT NULL REFERENCES clients(id) ON DELETE CASCADE,
+    proof_id INTEGER REFERENCES proofs(id) ON DELETE SET NULL,
+    amount REAL NOT NULL,
+    type VARCHAR(20) NOT NULL CHECK (type IN ('DEPOSIT', 'WITHDRAWAL')),
+    status VARCHAR(20) DEFAULT 'PENDING' CHECK (status IN ('PENDING', 'COMPLETED', 'REJECTED')),
+    description TEXT,
+    admin_notes TEXT,
+    created_at TIMESTAMP DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now')),
+    updated_at TIMESTAMP DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+);
+
+-- Estatísticas globais (linha única) mantidas por triggers: leitura O(1) no dashboard
+CREATE TABLE IF NOT EXISTS global_stats (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    total_clients INTEGER NOT NULL DEFAULT 0,
+    clientes_em_negativo INTEGER NOT NULL DEFAULT 0,
+    total_depositos REAL NOT NULL DEFAULT 0.00,
+    total_saques REAL NOT NULL DEFAULT 0.00,
+    total_comprovantes INTEGER NOT NULL DEFAULT 0,
+    total_operations INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+);
+
+INSERT OR IGNORE INTO global_stats (id) VALUES (1);
+
+-- Totais por dia (dia de negócio do created_at, ver business_day), mantidos pelos mesmos triggers
+CREATE TABLE IF NOT EXISTS daily_stats (
+    day TEXT PRIMARY KEY,
+    total_depositos REAL NOT NULL DEFAULT 0.00,
+    total_saques REAL NOT NULL DEFAULT 0.00,
+    deposit_count INTEGER NOT NULL DEFAULT 0,
+    withdrawal_count INTEGER NOT NULL DEFAULT 0,
+    total_operations INTEGER NOT NULL DEFAULT 0
+);
+
+-- Índices para melhor performance (os mesmos do Postgres)
+CREATE INDEX IF NOT EXISTS idx_proofs_client_id ON proofs(client_id);
+CREATE INDEX IF NOT EXISTS idx_proofs_file_hash ON proofs(file_hash);
+CREATE INDEX IF NOT EXISTS idx_proofs_deposited ON proofs(deposited);
+CREATE INDEX IF NOT EXISTS idx_transactions_client_id ON transactions(client_id);
+CREATE INDEX IF NOT EXISTS idx_transactions_type ON transactions(type);
+CREATE INDEX IF NOT EXISTS idx_transactions_status ON transactions(status);
+-- Listagens paginadas por keyset em (created_at, id), mais recentes primeiro
+CREATE INDEX IF NOT EXISTS idx_transactions_created_at ON transactions(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_transactions_client_created_at ON transactions(client_id, created_at DESC, id DESC);
+
+-- updated_at automático (o UPDATE interno não dispara o trigger de novo)
+CREATE TRIGGER IF NOT EXISTS update_clients_updated_at AFTER UPDATE ON clients
+FOR EACH ROW WHEN NEW.updated_at IS OLD.updated_at
+BEGIN
+    UPDATE clients SET updated_at = strftime('%Y-%m-%dT%H:%M:%f', 'now') WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS update_transactions_updated_at AFTER UPDATE ON transactions
+FOR EACH ROW WHEN NEW.updated_at IS OLD.updated_at
+BEGIN
+    UPDATE transactions SET updated_at = strftime('%Y-%m-%dT%H:%M:%f', 'now') WHERE id = NEW.id;
+END;
+
+-- ============================================
+-- MANUTENÇÃO INCREMENTAL DE global_stats / daily_stats
+-- Cada linha alterada contribui com -OLD e +NEW (como apply_transaction_stats)
+-- business_day() é registrada pelo SQLiteStore (app/periods.business_day); os
+-- triggers de transactions são recriados para bancos com o dia antigo (UTC)
+-- ============================================
+
+-- Gêmeas de apply_transaction_stats()/transactions_stats_trigger() em database_schema.sql
+DROP TRIGGER IF EXISTS transactions_stats_insert;
+CREATE TRIGGER transactions_stats_insert AFTER INSERT ON transactions
+BEGIN
+    UPDATE global_stats
+    SET total_depositos = ROUND(total_depositos + CASE WHEN NEW.type = 'DEPOSIT' AND NEW.status = 'COMPLETED' THEN NEW.amount ELSE 0 END, 2),
+        total_saques = ROUND(total_saques + CASE WHEN NEW.type = 'WITHDRAWAL' AND NEW.status = 'COMPLETED' THEN NEW.amount ELSE 0 END, 2),
+        total_operations = total_operations + 1,
+        updated_at = strftime('%Y-%m-%dT%H:%M:%f', 'now')
+    WHERE id = 1;
+    INSERT INTO daily_stats (day, total_depositos, total_saques, deposit_count, withdrawal_count, total_operations)
+    SELECT business_day(NEW.created_at),
+           CASE WHEN NEW.type = 'DEPOSIT' AND NEW.status = 'COMPLETED' THEN NEW.amount ELSE 0 END,
+           CASE WHEN NEW.type = 'WITHDRAWAL' AND NEW.status = 'COMPLETED' THEN NEW.amount ELSE 0 END,
+           NEW.type = 'DEPOSIT' AND NEW.status = 'COMPLETED',
+           NEW.type = 'WITHDRAWAL' AND NEW.status = 'COMPLETED',
+           1
+    WHERE NEW.created_at IS NOT NULL
+    ON CONFLICT (day) DO UPDATE SET
+        total_depositos = ROUND(total_depositos + excluded.total_depositos, 2),
+        total_saques = ROUND(total_saques + excluded.total_saques, 2),
+        deposit_count = deposit_count + excluded.deposit_count,
+        withdrawal_count = withdrawal_count + excluded.withdrawal_count,
+        total_operations = total_operations + excluded.total_operations;
+END;
+
+DROP TRIGGER IF EXISTS transactions_stats_delete;
+CREATE TRIGGER transactions_stats_delete AFTER DELETE ON transactions
+BEGIN
+    UPDATE global_stats
+    SET total_depositos = ROUND(total_depositos - CASE WHEN OLD.type = 'DEPOSIT' AND OLD.status = 'COMPLETED' THEN OLD.amount ELSE 0 END, 2),
+        total_saques = ROUND(total_saques - CASE WHEN OLD.type = 'WITHDRAWAL' AND OLD.status = 'COMPLETED' THEN OLD.amount ELSE 0 END, 2),
+        total_operations = total_operations - 1,
+        updated_at = strftime('%Y-%m-%dT%H:%M:%f', 'now')
+    WHERE id = 1;
+    UPDATE daily_stats
+    SET total_depositos = ROUND(total_depositos - CASE WHEN OLD.type = 'DEPOSIT' AND OLD.status = 'COMPLETED' THEN OLD.amount ELSE 0 END, 2),
+        total_saques = ROUND(total_saques - CASE WHEN OLD.type = 'WITHDRAWAL' AND OLD.status = 'COMPLETED' THEN OLD.amount ELSE 0 END, 2),
+        deposit_count = deposit_count - (OLD.type = 'DEPOSIT' AND OLD.status = 'COMPLETED'),
+        withdrawal_count = withdrawal_count - (OLD.type = 'WITHDRAWAL' AND OLD.status = 'COMPLETED'),
+        total_operations = total_operations - 1
+    WHERE day = business_day(OLD.created_at);
+END;
+
+-- Updates que não mexem em valor/tipo/status/data (ex: admin_notes) não mudam os totais
+DROP TRIGGER IF EXISTS transactions_stats_update;
+CREATE TRIGGER transactions_stats_update AFTER UPDATE OF amount, type, status, created_at ON transactions
+FOR EACH ROW WHEN OLD.amount IS NOT NEW.amount OR OLD.type IS NOT NEW.type
+    OR OLD.status IS NOT NEW.status OR OLD.created_at IS NOT NEW.created_at
+BEGIN
+    UPDATE global_stats
+    SET total_depositos = ROUND(total_depositos
+            - CASE WHEN OLD.type = 'DEPOSIT' AND OLD.status = 'COMPLETED' THEN OLD.amount ELSE 0 END
+            + CASE WHEN NEW.type = 'DEPOSIT' AND NEW.status = 'COMPLETED' THEN NEW.amount ELSE 0 END, 2),
+        total_saques = ROUND(total_saques
+            - CASE WHEN OLD.type = 'WITHDRAWAL' AND OLD.status = 'COMPLETED' THEN OLD.amount ELSE 0 END
+            + CASE WHEN NEW.type = 'WITHDRAWAL' AND NEW.status = 'COMPLETED' THEN NEW.amount ELSE 0 END, 2),
+        updated_at = strftime('%Y-%m-%dT%H:%M:%f', 'now')
+    WHERE id = 1;
+    UPDATE daily_stats
+    SET total_depositos = ROUND(total_depositos - CASE WHEN OLD.type = 'DEPOSIT' AND OLD.status = 'COMPLETED' THEN OLD.amount ELSE 0 END, 2),
+        total_saques = ROUND(total_saques - CASE WHEN OLD.type = 'WITHDRAWAL' AND OLD.status = 'COMPLETED' THEN OLD.amount ELSE 0 END, 2),
+        deposit_count = deposit_count - (OLD.type = 'DEPOSIT' AND OLD.status = 'COMPLETED'),
+        withdrawal_count = withdrawal_count - (OLD.type = 'WITHDRAWAL' AND OLD.status = 'COMPLETED'),
+        total_operations = total_operations - 1
+    WHERE day = business_day(OLD.created_at);
+    INSERT INTO daily_stats (day, total_depositos, total_saques, deposit_count, withdrawal_count, total_operations)
+    SELECT business_day(NEW.created_at),
+           CASE WHEN NEW.type = 'DEPOSIT' AND NEW.status = 'COMPLETED' THEN NEW.amount ELSE 0 END,
+           CASE WHEN NEW.type = 'WITHDRAWAL' AND NEW.status = 'COMPLETED' THEN NEW.amount ELSE 0 END,
+           NEW.type = 'DEPOSIT' AND NEW.status = 'COMPLETED',
+           NEW.type = 'WITHDRAWAL' AND NEW.status = 'COMPLETED',
+           1
+    WHERE NEW.created_at IS NOT NULL
+    ON CONFLICT (day) DO UPDATE SET
+        total_depositos = ROUND(total_depositos + excluded.total_depositos, 2),
+        total_saques = ROUND(total_saques + excluded.total_saques, 2),
+        deposit_count = deposit_count + excluded.deposit_count,
+        withdrawal_count = withdrawal_count + excluded.withdrawal_count,
+        total_operations = total_operations + excluded.total_operations;
+END;
+
+-- Gêmeas de clients_stats_trigger() em database_schema.sql
+CREATE TRIGGER IF NOT EXISTS clients_stats_insert AFTER INSERT ON clients
+BEGIN
+    UPDATE global_stats
+    SET total_clients = total_clients + 1,
+        clientes_em_negativo = clientes_em_negativo + (COALESCE(NEW.saldo, 0) < 0),
+        updated_at = strftime('%Y-%m-%dT%H:%M:%f', 'now')
+    WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS clients_stats_delete AFTER DELETE ON clients
+BEGIN
+    UPDATE global_stats
+    SET total_clients = total_clients - 1,
+        clientes_em_negativo = clientes_em_negativo - (COALESCE(OLD.saldo, 0) < 0),
+        updated_at = strftime('%Y-%m-%dT%H:%M:%f', 'now')
+    WHERE id = 1;
+END;
+
+-- Ajustes de saldo que não trocam o sinal não tocam na linha global
+CREATE TRIGGER IF NOT EXISTS clients_stats_update AFTER UPDATE OF saldo ON clients
+FOR EACH ROW WHEN (COALESCE(OLD.saldo, 0) < 0) <> (COALESCE(NEW.saldo, 0) < 0)
+BEGIN
+    UPDATE global_stats
+    SET clientes_em_negativo = clientes_em_negativo - (COALESCE(OLD.saldo, 0) < 0) + (COALESCE(NEW.saldo, 0) < 0),
+        updated_at = strftime('%Y-%m-%dT%H:%M:%f', 'now')
+    WHERE id = 1;
+END;
+
+-- Gêmeas de proofs_stats_trigger() em database_schema.sql
+CREATE TRIGGER IF NOT EXISTS proofs_stats_insert AFTER INSERT ON proofs
+BEGIN
+    UPDATE global_stats
+    SET total_comprovantes = total_comprovantes + 1, updated_at = strftime('%Y-%m-%dT%H:%M:%f', 'now')
+    WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS proofs_stats_delete AFTER DELETE ON proofs
+BEGIN
+    UPDATE global_stats
+    SET total_comprovantes = total_comprovantes - 1, updated_at = strftime('%Y-%m-%dT%H:%M:%f', 'now')
+    WHERE id = 1;
+END;
+
+-- ============================================
+-- VALORES RECALCULADOS (verificação e reconstrução de global_stats/daily_stats)
+-- Recriadas a cada abertura, como os triggers de transactions
+-- ============================================
+
+-- Gêmea de compute_global_statistics() em database_schema.sql
+DROP VIEW IF EXISTS global_stats_computed;
+CREATE VIEW global_stats_computed AS
+SELECT
+    (SELECT COUNT(*) FROM clients) AS total_clients,
+    (SELECT COUNT(*) FROM clients WHERE saldo < 0) AS clientes_em_negativo,
+    ROUND(COALESCE(SUM(CASE WHEN type = 'DEPOSIT' AND status = 'COMPLETED' THEN amount END), 0), 2) AS total_depositos,
+    ROUND(COALESCE(SUM(CASE WHEN type = 'WITHDRAWAL' AND status = 'COMPLETED' THEN amount END), 0), 2) AS total_saques,
+    (SELECT COUNT(*) FROM proofs) AS total_comprovantes,
+    COUNT(*) AS total_operations
+FROM transactions;
+
+-- Gêmea da view daily_stats_computed em database_schema.sql
+DROP VIEW IF EXISTS daily_stats_computed;
+CREATE VIEW daily_stats_computed AS
+SELECT
+    business_day(created_at) AS day,
+    ROUND(COALESCE(SUM(CASE WHEN type = 'DEPOSIT' AND status = 'COMPLETED' THEN amount END), 0), 2) AS total_depositos,
+    ROUND(COALESCE(SUM(CASE WHEN type = 'WITHDRAWAL' AND status = 'COMPLETED' THEN amount END), 0), 2) AS total_saques,
+    SUM(type = 'DEPOSIT' AND status = 'COMPLETED') AS deposit_count,
+    SUM(type = 'WITHDRAWAL' AND status = 'COMPLETED') AS withdrawal_count,
+    COUNT(*) AS total_operations
+FROM transactions
+WHERE created_at IS NOT NULL
+GROUP BY day;
+
+-- Dias em que daily_stats difere do recalculado (dia ausente = tudo zero),
+-- como o FULL OUTER JOIN de verify_global_stats() em database_schema.sql
+DROP VIEW IF EXISTS daily_stats_mismatches;
+CREATE VIEW daily_stats_mismatches AS
+SELECT day
+FROM (
+    SELECT day, total_depositos, total_saques, deposit_count, withdrawal_count, total_operations FROM daily_stats
+    UNION ALL
+    SELECT day, -total_depositos, -total_saques, -deposit_count, -withdrawal_count, -total_operations
+    FROM daily_stats_computed
+)
+GROUP BY day
+HAVING ROUND(SUM(total_depositos), 2) <> 0 OR ROUND(SUM(total_saques), 2) <> 0 OR SUM(deposit_count) <> 0
+    OR SUM(withdrawal_count) <> 0 OR SUM(total_operations) <> 0;
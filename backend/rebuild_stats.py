@@ -0,0 +1,79 @@
+"""
+Script para reconstruir e verificar as estatísticas globais (global_stats e daily_stats)
+Os triggers do banco mantêm as tabelas atualizadas; use este script após aplicar
+o schema num banco com dados ou se a verificação apontar divergência
+
+Uso:
+    python rebuild_stats.py            # verifica e, se confirmado, reconstrói
+    python rebuild_stats.py --verify   # só verifica (sai com código 1 se divergir)
+"""
+import argparse
+import sys
+
+from dotenv import load_dotenv
+from pathlib import Path
+
+# Carregar variáveis de ambiente
+env_path = Path(__file__).parent / '.env'
+load_dotenv(dotenv_path=env_path)
+
+from app.database import get_supabase_client
+
+STAT_FIELDS = [
+    'total_clients', 'clientes_em_negativo', 'total_depositos',
+    'total_saques', 'total_comprovantes', 'total_operations',
+]
+
+def print_report(report):
+    """Mostra os valores armazenados x recalculados"""
+    stored, computed = report['stored'] or {}, report['computed']
+    for field in STAT_FIELDS:
+        same = float(stored.get(field) or 0) == float(computed[field] or 0)
+        print(f"   {'✅' if same else '❌'} {field:<22} armazenado={stored.get(field)} | recalculado={computed[field]}")
+    print(f"   {'✅' if report['daily_mismatches'] == 0 else '❌'} dias divergentes em daily_stats: {report['daily_mismatches']}")
+
+def rebuild_stats(verify_only: bool = False) -> bool:
+    """Verifica as estatísticas e reconstrói se necessário; retorna se ficaram consistentes"""
+
+    print("🔍 Verificando estatísticas globais...")
+
+    try:
+        client = get_supabase_client()
+
+        report = client.rpc('verify_global_stats')
+        print_report(report)
+
+        if report['consistent']:
+            print("\n✅ Estatísticas consistentes!")
+            return True
+
+        if verify_only:
+            print("\n❌ Estatísticas divergentes. Rode sem --verify para reconstruir.")
+            return False
+
+        confirm = input("\nDeseja reconstruir global_stats e daily_stats? (SIM/não): ")
+
+        if confirm != "SIM":
+            print("❌ Operação cancelada.")
+            return False
+
+        print("\n🔄 Reconstruindo estatísticas (escritas ficam bloqueadas durante o recálculo)...")
+        result = client.rpc('rebuild_global_stats')
+        print_report(result['after'])
+
+        if not result['after']['consistent']:
+            print("\n❌ Estatísticas ainda divergentes após a reconstrução!")
+            return False
+
+        print("\n✅ Estatísticas reconstruídas com sucesso!")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ Erro: {e}")
+        return False
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconstrói e verifica global_stats/daily_stats")
+    parser.add_argument("--verify", action="store_true", help="Só verifica, sem reconstruir")
+    args = parser.parse_args()
+    sys.exit(0 if rebuild_stats(verify_only=args.verify) else 1)
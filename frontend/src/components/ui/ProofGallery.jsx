@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { Download, Trash2, AlertCircle, FileText, Image as ImageIcon, DollarSign, Check } from 'lucide-react';
 import { Button } from './Button';
 import { Badge } from './Badge';
@@ -8,6 +8,11 @@ import { getClientProofs, deleteProof } from '../../services/api';
 import api from '../../services/api';
 import showToast from '../../utils/toast';
 
+// Polling da extração em segundo plano: intervalo e tempo máximo (o backend marca
+// como EXTRACTED_WITH_ERROR as extrações abandonadas; depois disso basta recarregar a lista)
+const EXTRACTION_POLL_INTERVAL_MS = 3000;
+const EXTRACTION_POLL_MAX_MS = 5 * 60 * 1000;
+
 /**
  * ProofGallery - Galeria de comprovantes enviados
  * @param {string} clientId - ID do cliente
@@ -24,6 +29,30 @@ export const ProofGallery = ({ clientId, onRefresh = () => {}, onBalanceUpdate =
     loadProofs();
   }, [clientId]);
 
+  // Extração roda em segundo plano: recarregar enquanto houver comprovante em
+  // EXTRACTING, por no máximo EXTRACTION_POLL_MAX_MS
+  const hasExtracting = proofs.some(p => p.extraction_status === 'EXTRACTING');
+  const pollStartedAt = useRef(null);
+  useEffect(() => {
+    if (!hasExtracting) {
+      pollStartedAt.current = null;
+      return;
+    }
+    if (pollStartedAt.current === null) pollStartedAt.current = Date.now();
+    if (Date.now() - pollStartedAt.current > EXTRACTION_POLL_MAX_MS) return;
+    const timeout = setTimeout(refreshProofs, EXTRACTION_POLL_INTERVAL_MS);
+    return () => clearTimeout(timeout);
+  }, [proofs, hasExtracting]);
+
+  const refreshProofs = async () => {
+    try {
+      const response = await getClientProofs(clientId);
+      setProofs(response.data.proofs || []);
+    } catch (err) {
+      console.error(err);
+    }
+  };
+
   const loadProofs = async () => {
     try {
       // Proteger contra clientId undefined ou inválido
@@ -35,6 +64,7 @@ export const ProofGallery = ({ clientId, onRefresh = () => {}, onBalanceUpdate =
       }
       
       setLoading(true);
+      pollStartedAt.current = null;
       const response = await getClientProofs(clientId);
       setProofs(response.data.proofs || []);
       setError(null);